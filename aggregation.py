@@ -0,0 +1,56 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List
+
+
+def _local_date(dt: int, tz_offset: int) -> str:
+    return datetime.fromtimestamp(dt + tz_offset, tz=timezone.utc).date().isoformat()
+
+
+def daily_summary(forecast: dict) -> dict:
+    """
+    Group 3-hourly forecast items into per-day summaries.
+
+    Days follow the forecast location's local calendar (``city.timezone``).
+    Temperatures stay in Kelvin, like the rest of the upstream payload.
+    """
+    city = forecast.get("city") or {}
+    tz_offset = city.get("timezone") or 0
+
+    days: Dict[str, List[dict]] = {}
+    for item in forecast.get("list", []):
+        days.setdefault(_local_date(item["dt"], tz_offset), []).append(item)
+
+    summaries = []
+    for date, items in days.items():
+        temps = [item["main"]["temp"] for item in items]
+        conditions = [item["weather"][0] for item in items if item.get("weather")]
+        dominant = Counter(c["main"] for c in conditions).most_common(1)
+        condition = next(c for c in conditions if c["main"] == dominant[0][0]) if dominant else None
+        winds = [item["wind"] for item in items if item.get("wind")]
+        speeds = [w["speed"] for w in winds]
+        gusts = [w["gust"] for w in winds if w.get("gust") is not None]
+
+        summaries.append({
+            "date": date,
+            "dt": items[0]["dt"],
+            "slots": len(items),
+            "temp_min": min(item["main"]["temp_min"] for item in items),
+            "temp_max": max(item["main"]["temp_max"] for item in items),
+            "temp_mean": round(sum(temps) / len(temps), 2),
+            "humidity_mean": round(sum(item["main"]["humidity"] for item in items) / len(items), 1),
+            "condition": condition,
+            "pop": max((item.get("pop") or 0.0) for item in items),
+            "wind": {
+                "speed_mean": round(sum(speeds) / len(speeds), 2) if speeds else None,
+                "speed_max": max(speeds) if speeds else None,
+                "gust_max": max(gusts) if gusts else None,
+            },
+        })
+
+    return {
+        "cod": forecast.get("cod", "200"),
+        "cnt": len(summaries),
+        "list": summaries,
+        "city": city,
+    }
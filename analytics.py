@@ -0,0 +1,195 @@
+import warnings
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+
+# Numeric per-slot columns extracted from a forecast, all float64 with NaN for missing values
+FLOAT_COLUMNS = ("temp", "feels_like", "humidity", "pressure", "wind_speed", "wind_gust", "pop", "clouds")
+
+ColumnSet = Dict[str, np.ndarray]
+
+
+def forecast_columns(forecast: dict) -> ColumnSet:
+    """Convert an upstream forecast payload into NumPy column arrays."""
+    items = forecast["list"]
+    n = len(items)
+
+    def column(get) -> np.ndarray:
+        return np.fromiter((np.nan if (v := get(item)) is None else v for item in items), dtype=np.float64, count=n)
+
+    return {
+        "dt": np.fromiter((item["dt"] for item in items), dtype=np.int64, count=n),
+        "temp": column(lambda item: item["main"]["temp"]),
+        "feels_like": column(lambda item: item["main"].get("feels_like")),
+        "humidity": column(lambda item: item["main"].get("humidity")),
+        "pressure": column(lambda item: item["main"].get("pressure")),
+        "wind_speed": column(lambda item: (item.get("wind") or {}).get("speed")),
+        "wind_gust": column(lambda item: (item.get("wind") or {}).get("gust")),
+        "wind_deg": column(lambda item: (item.get("wind") or {}).get("deg")),
+        "pop": column(lambda item: item.get("pop")),
+        "clouds": column(lambda item: (item.get("clouds") or {}).get("all")),
+        "condition": np.fromiter(
+            (item["weather"][0]["id"] if item.get("weather") else 0 for item in items), dtype=np.int32, count=n
+        ),
+        "timezone": np.int64((forecast.get("city") or {}).get("timezone") or 0),
+    }
+
+
+class ForecastBatch:
+    """
+    Forecast columns for many locations stacked into 2-D arrays
+    (``locations x slots``), padded with NaN where a forecast is shorter.
+    """
+
+    def __init__(self, column_sets: Sequence[ColumnSet]):
+        self.size = len(column_sets)
+        self.width = max((len(c["dt"]) for c in column_sets), default=0)
+        self.valid = np.zeros((self.size, self.width), dtype=bool)
+        self.dt = np.zeros((self.size, self.width), dtype=np.int64)
+        self.timezone = np.array([c["timezone"] for c in column_sets], dtype=np.int64)
+        self.columns = {name: np.full((self.size, self.width), np.nan) for name in FLOAT_COLUMNS}
+        for row, columns in enumerate(column_sets):
+            n = len(columns["dt"])
+            self.valid[row, :n] = True
+            self.dt[row, :n] = columns["dt"]
+            for name in FLOAT_COLUMNS:
+                self.columns[name][row, :n] = columns[name]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+
+def _to_list(values: np.ndarray) -> list:
+    # Round and convert in bulk; converting element by element dominates otherwise
+    return [None if v != v else v for v in np.round(values, 2).tolist()]
+
+
+def _extreme(values: np.ndarray, dt: np.ndarray, use_max: bool) -> List[dict]:
+    filled = np.where(np.isnan(values), -np.inf if use_max else np.inf, values)
+    index = filled.argmax(axis=1) if use_max else filled.argmin(axis=1)
+    rows = np.arange(len(values))
+    return [
+        {"value": v, "dt": t if v is not None else None}
+        for v, t in zip(_to_list(values[rows, index]), dt[rows, index].tolist())
+    ]
+
+
+def daily_aggregates(batch: ForecastBatch) -> List[List[dict]]:
+    """Per-location, per-local-day aggregates computed in one pass over a (locations, days, slots) cube."""
+    local_day = (batch.dt + batch.timezone[:, None]) // SECONDS_PER_DAY
+    first_day = local_day[:, :1]
+    relative = np.where(batch.valid, local_day - first_day, -1)
+    days = int(relative.max()) + 1 if batch.width else 0
+    in_day = relative[:, None, :] == np.arange(days)[None, :, None]
+
+    def cube(name: str) -> np.ndarray:
+        return np.where(in_day, batch[name][:, None, :], np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        temp = cube("temp")
+        stats = {
+            "temp_min": np.nanmin(temp, axis=2),
+            "temp_max": np.nanmax(temp, axis=2),
+            "temp_mean": np.nanmean(temp, axis=2),
+            "humidity_mean": np.nanmean(cube("humidity"), axis=2),
+            "wind_speed_max": np.nanmax(cube("wind_speed"), axis=2),
+            "pop_max": np.nanmax(cube("pop"), axis=2),
+        }
+    slots = in_day.sum(axis=2).tolist()
+    first_days = first_day[:, 0].tolist()
+    names = list(stats)
+    rows = zip(*(_to_list(stats[name]) for name in names))
+
+    result = []
+    for row, values in enumerate(rows):
+        location_days = []
+        for day in range(days):
+            if not slots[row][day]:
+                continue
+            date = datetime.fromtimestamp((first_days[row] + day) * SECONDS_PER_DAY, tz=timezone.utc)
+            summary = {"date": date.date().isoformat(), "slots": slots[row][day]}
+            for name, column in zip(names, values):
+                summary[name] = column[day]
+            location_days.append(summary)
+        result.append(location_days)
+    return result
+
+
+def rolling_extremes(batch: ForecastBatch, window: int) -> List[Optional[dict]]:
+    """Warmest and coldest ``window``-slot periods by mean temperature."""
+    if window < 1 or window > batch.width:
+        return [None] * batch.size
+    temp = batch["temp"]
+    present = ~np.isnan(temp)
+    sums = np.concatenate([np.zeros((batch.size, 1)), np.cumsum(np.where(present, temp, 0.0), axis=1)], axis=1)
+    counts = np.concatenate([np.zeros((batch.size, 1)), np.cumsum(present, axis=1)], axis=1)
+    window_counts = counts[:, window:] - counts[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(window_counts == window, (sums[:, window:] - sums[:, :-window]) / window, np.nan)
+    starts = batch.dt[:, : means.shape[1]]
+    warmest = _extreme(means, starts, use_max=True)
+    coldest = _extreme(means, starts, use_max=False)
+    return [
+        {"window": window, "warmest": {"start": w["dt"], "mean": w["value"]}, "coldest": {"start": c["dt"], "mean": c["value"]}}
+        for w, c in zip(warmest, coldest)
+    ]
+
+
+def threshold_crossings(batch: ForecastBatch, thresholds: Dict[str, float]) -> List[dict]:
+    """
+    For each threshold (``temp_below``, ``temp_above``, ``wind_above``,
+    ``pop_above``) count matching slots, state changes and the first match.
+    """
+    conditions = {
+        "temp_below": lambda v: batch["temp"] < v,
+        "temp_above": lambda v: batch["temp"] > v,
+        "wind_above": lambda v: batch["wind_speed"] > v,
+        "pop_above": lambda v: batch["pop"] > v,
+    }
+    result: List[dict] = [{} for _ in range(batch.size)]
+    for name, value in thresholds.items():
+        if value is None:
+            continue
+        hits = conditions[name](value) & batch.valid
+        count = hits.sum(axis=1).tolist()
+        crossings = np.count_nonzero(np.diff(hits.astype(np.int8), axis=1), axis=1).tolist()
+        first = batch.dt[np.arange(batch.size), hits.argmax(axis=1)].tolist()
+        for row in range(batch.size):
+            result[row][name] = {
+                "threshold": value,
+                "slots": count[row],
+                "crossings": crossings[row],
+                "first": first[row] if count[row] else None,
+            }
+    return result
+
+
+def analyze(column_sets: Sequence[ColumnSet], window: int = 8, thresholds: Optional[Dict[str, float]] = None) -> List[dict]:
+    """Forecast analytics for many locations in a single vectorized call."""
+    if not column_sets:
+        return []
+    batch = ForecastBatch(column_sets)
+    daily = daily_aggregates(batch)
+    rolling = rolling_extremes(batch, window)
+    crossings = threshold_crossings(batch, thresholds or {})
+    extremes = {
+        "temp_max": _extreme(batch["temp"], batch.dt, use_max=True),
+        "temp_min": _extreme(batch["temp"], batch.dt, use_max=False),
+        "wind_speed_max": _extreme(batch["wind_speed"], batch.dt, use_max=True),
+        "wind_gust_max": _extreme(batch["wind_gust"], batch.dt, use_max=True),
+        "pop_max": _extreme(batch["pop"], batch.dt, use_max=True),
+    }
+    return [
+        {
+            "slots": int(batch.valid[row].sum()),
+            "extremes": {name: values[row] for name, values in extremes.items()},
+            "daily": daily[row],
+            "rolling": rolling[row],
+            "thresholds": crossings[row],
+        }
+        for row in range(batch.size)
+    ]
@@ -0,0 +1,79 @@
+from pathlib import Path
+from typing import Dict
+
+from fastapi import HTTPException, Request
+from starlette.responses import Response
+
+from compression import StaticPayload
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+STATIC_URL = "/static"
+
+# Asset URLs embed a content hash, so a given URL can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+MEDIA_TYPES = {
+    ".css": "text/css",
+    ".js": "application/javascript",
+}
+
+_assets_by_name: Dict[str, "StaticAsset"] = {}
+_assets_by_url_name: Dict[str, "StaticAsset"] = {}
+
+
+class StaticAsset:
+    """A file from the static directory, precompressed and addressed by content hash."""
+
+    def __init__(self, filename: str):
+        path = STATIC_DIR / filename
+        self.filename = filename
+        self.source = path.read_text(encoding="utf-8")
+        self.payload = StaticPayload(
+            self.source.encode("utf-8"),
+            MEDIA_TYPES.get(path.suffix, "application/octet-stream"),
+            IMMUTABLE_CACHE_CONTROL,
+        )
+        self.hashed_name = f"{path.stem}.{self.payload.digest[:10]}{path.suffix}"
+        self.url = f"{STATIC_URL}/{self.hashed_name}"
+
+
+def load_asset(filename: str) -> StaticAsset:
+    asset = _assets_by_name.get(filename)
+    if asset is None:
+        asset = StaticAsset(filename)
+        _assets_by_name[filename] = asset
+        _assets_by_url_name[asset.hashed_name] = asset
+    return asset
+
+
+def static_response(request: Request, hashed_name: str) -> Response:
+    asset = _assets_by_url_name.get(hashed_name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset.payload.response(request)
+
+
+class DemoPage:
+    """
+    An HTML shell with ``{{ styles }}`` and ``{{ scripts }}`` placeholders.
+
+    ``payload`` links the hashed stylesheet and script so repeat visits only
+    re-download the small HTML document; ``inline_html`` embeds them for
+    callers that still expect a single self-contained string.
+    """
+
+    def __init__(self, shell: str, stylesheet: str, script: str):
+        self.stylesheet = load_asset(stylesheet)
+        self.script = load_asset(script)
+        linked = (
+            shell.replace("{{ styles }}", f'<link rel="stylesheet" href="{self.stylesheet.url}" />')
+            .replace("{{ scripts }}", f'<script src="{self.script.url}"></script>')
+        )
+        self.payload = StaticPayload(linked.encode("utf-8"), "text/html")
+        self.inline_html = (
+            shell.replace("{{ styles }}", f"<style>\n{self.stylesheet.source}</style>")
+            .replace("{{ scripts }}", f"<script>\n{self.script.source}</script>")
+        )
+
+    def response(self, request: Request) -> Response:
+        return self.payload.response(request)
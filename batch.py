@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from cache import CacheEntry
+from models import BatchLocation
+from units import Units
+from views import encode
+
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "500"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+EntryLookup = Callable[[BatchLocation], Awaitable[CacheEntry]]
+
+
+def validate_batch(locations: List[BatchLocation]) -> None:
+    if not locations:
+        raise HTTPException(status_code=400, detail="At least one location is required")
+    if len(locations) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} locations per batch")
+    for location in locations:
+        if location.city is None and (location.lat is None or location.lon is None):
+            raise HTTPException(status_code=400, detail="Each location needs lat and lon, or city")
+
+
+async def _result_line(
+    index: int,
+    location: BatchLocation,
+    lookup: EntryLookup,
+    view: str,
+    units: Optional[Units],
+    fields: Optional[str],
+) -> bytes:
+    query = json.dumps(location.model_dump(exclude_none=True), separators=(",", ":"))
+    try:
+        body = encode(await lookup(location), view, units, fields)
+    except Exception as e:
+        # One failing location must not abort the rest of the batch
+        status, detail = (e.status_code, e.detail) if isinstance(e, HTTPException) else (500, str(e))
+        error = json.dumps({"status": status, "detail": detail}, separators=(",", ":"))
+        return f'{{"index":{index},"query":{query},"error":{error}}}\n'.encode("utf-8")
+    # Splice the memoized encoding in rather than decoding and re-encoding it
+    return f'{{"index":{index},"query":{query},"data":'.encode("utf-8") + body + b"}\n"
+
+
+async def _completed(
+    locations: List[BatchLocation],
+    lookup: EntryLookup,
+    view: str,
+    units: Optional[Units],
+    fields: Optional[str],
+    concurrency: int,
+) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Yield ``(index, line)`` pairs in completion order.
+
+    At most ``concurrency`` lookups run at once, and finished lines wait in a
+    queue of the same size, so workers stall when the consumer stops reading
+    instead of buffering the whole batch.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    pending = iter(enumerate(locations))
+
+    async def worker():
+        for index, location in pending:
+            line = await _result_line(index, location, lookup, view, units, fields)
+            await queue.put((index, line))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(locations)))]
+    try:
+        for _ in range(len(locations)):
+            yield await queue.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def stream_batch(
+    locations: List[BatchLocation],
+    lookup: EntryLookup,
+    view: str,
+    units: Optional[Units] = None,
+    fields: Optional[str] = None,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> AsyncIterator[bytes]:
+    """One NDJSON line per location, sent as soon as its lookup completes."""
+    async for _, line in _completed(locations, lookup, view, units, fields, concurrency):
+        yield line
+
+
+async def collect_batch(
+    locations: List[BatchLocation],
+    lookup: EntryLookup,
+    view: str,
+    units: Optional[Units] = None,
+    fields: Optional[str] = None,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> bytes:
+    """The whole batch as a JSON array, in request order."""
+    lines: List[bytes] = [b""] * len(locations)
+    async for index, line in _completed(locations, lookup, view, units, fields, concurrency):
+        lines[index] = line.rstrip(b"\n")
+    return b"[" + b",".join(lines) + b"]"
+
+
+async def gather_entries(
+    locations: List[BatchLocation],
+    lookup: EntryLookup,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> List[Union[CacheEntry, HTTPException]]:
+    """
+    Look up every location with bounded concurrency; failures are returned as
+    ``HTTPException`` (500 for anything unexpected), not raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(location: BatchLocation):
+        async with semaphore:
+            try:
+                return await lookup(location)
+            except HTTPException as e:
+                return e
+            except Exception as e:
+                # Reported like the per-line errors of the other batch endpoints
+                return HTTPException(status_code=500, detail=str(e))
+
+    return await asyncio.gather(*(one(location) for location in locations))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare the vectorized forecast analytics engine with per-item pydantic iteration.
+
+Both sides compute the same extremes and per-day min/max/mean temperature for
+N synthetic 40-slot forecasts. Column extraction is timed separately because
+in the service it is memoized on the cache entry.
+
+    python benchmarks/forecast_analytics.py --locations 5000
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import analyze, forecast_columns  # noqa: E402
+from models import ForecastResponse  # noqa: E402
+
+START = 1760000400
+
+
+def synthetic_forecast(seed: int) -> dict:
+    items = []
+    for i in range(40):
+        temp = 280 + 8 * math.sin((i + seed) / 8 * 2 * math.pi) + seed % 13
+        items.append({
+            "dt": START + i * 10800,
+            "main": {"temp": temp, "feels_like": temp - 1, "temp_min": temp - 0.5, "temp_max": temp + 0.5,
+                     "pressure": 1012, "humidity": 40 + (i * 7 + seed) % 50},
+            "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+            "clouds": {"all": (i * 11) % 100},
+            "wind": {"speed": 1 + (i + seed) % 9, "deg": 180, "gust": 3 + (i + seed) % 5},
+            "visibility": 10000,
+            "pop": ((i + seed) % 10) / 10,
+            "dt_txt": "",
+        })
+    return {"cod": "200", "message": 0, "cnt": 40, "list": items, "city": {"timezone": 3600 * (seed % 5)}}
+
+
+def pydantic_iteration(forecasts):
+    results = []
+    for data in forecasts:
+        forecast = ForecastResponse.model_validate(data)
+        tz = forecast.city.get("timezone") or 0
+        days = defaultdict(list)
+        temp_max = max(forecast.list, key=lambda item: item.main.temp)
+        temp_min = min(forecast.list, key=lambda item: item.main.temp)
+        wind_max = max(forecast.list, key=lambda item: item.wind.speed)
+        pop_max = max(forecast.list, key=lambda item: item.pop or 0)
+        for item in forecast.list:
+            days[(item.dt + tz) // 86400].append(item.main.temp)
+        results.append({
+            "extremes": (temp_max.main.temp, temp_min.main.temp, wind_max.wind.speed, pop_max.pop),
+            "daily": [(min(t), max(t), sum(t) / len(t)) for t in days.values()],
+        })
+    return results
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main(locations: int) -> None:
+    forecasts = [synthetic_forecast(seed) for seed in range(locations)]
+
+    pydantic_s, _ = timed(pydantic_iteration, forecasts)
+    extract_s, columns = timed(lambda: [forecast_columns(f) for f in forecasts])
+    vector_s, _ = timed(analyze, columns, 8, {"temp_below": 273.15, "wind_above": 8.0})
+
+    print(f"locations:                      {locations}")
+    print(f"pydantic per-item iteration:    {pydantic_s * 1000:9.1f} ms  {locations / pydantic_s:10,.0f} loc/s")
+    print(f"column extraction (memoized):   {extract_s * 1000:9.1f} ms")
+    print(f"vectorized analytics:           {vector_s * 1000:9.1f} ms  {locations / vector_s:10,.0f} loc/s")
+    print(f"speed-up (cached columns):      {pydantic_s / vector_s:9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=2000)
+    main(parser.parse_args().locations)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Compare the memory held by the forecast cache in "dict" and "columnar" format.
+
+Fills the service's forecast cache with N synthetic 40-slot forecasts shaped
+like OWM's /data/2.5/forecast response (parsed from JSON, as the service
+does), then serves each one once through GET /api/forecast. Reports the
+traced allocation growth and deep size per entry for both formats, before
+and after serving, since serving memoizes derived data on the entry.
+
+    python benchmarks/forecast_cache_memory.py --locations 2000
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Serving must not record observations on disk
+os.environ["HISTORY_DIR"] = ""
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from columnar import CompactForecast, deep_sizeof, pack_forecast  # noqa: E402
+from main import app  # noqa: E402
+from services import _coord_key, forecast_cache  # noqa: E402
+
+START = 1760000400
+CONDITIONS = [
+    {"id": 800, "main": "Clear", "description": "clear sky", "icon": "01{}"},
+    {"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04{}"},
+    {"id": 500, "main": "Rain", "description": "light rain", "icon": "10{}"},
+]
+
+
+def synthetic_forecast(seed: int) -> dict:
+    items = []
+    for i in range(40):
+        dt = START + i * 10800
+        temp = round(280 + 8 * math.sin((i + seed) / 8 * 2 * math.pi) + seed % 13, 2)
+        pod = "d" if 6 <= (i * 3) % 24 < 18 else "n"
+        condition = dict(CONDITIONS[(i + seed) % 3])
+        condition["icon"] = condition["icon"].format(pod)
+        item = {
+            "dt": dt,
+            "main": {"temp": temp, "feels_like": round(temp - 1.3, 2), "temp_min": round(temp - 0.4, 2),
+                     "temp_max": round(temp + 0.6, 2), "pressure": 1012 + i % 5, "sea_level": 1012 + i % 5,
+                     "grnd_level": 1008 + i % 4, "humidity": 40 + (i * 7 + seed) % 50, "temp_kf": 0},
+            "weather": [condition],
+            "clouds": {"all": (i * 11) % 100},
+            "wind": {"speed": round(1 + ((i + seed) % 90) / 10, 2), "deg": (i * 37 + seed) % 360,
+                     "gust": round(3 + ((i + seed) % 50) / 10, 2)},
+            "visibility": 10000,
+            "pop": ((i + seed) % 10) / 10,
+        }
+        if condition["main"] == "Rain":
+            item["rain"] = {"3h": round(0.1 + (i % 7) / 10, 2)}
+        item["sys"] = {"pod": pod}
+        item["dt_txt"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(dt))
+        items.append(item)
+    city = {"id": seed, "name": f"City {seed}", "coord": {"lat": 51.5, "lon": -0.12}, "country": "GB",
+            "population": 1000, "timezone": 3600 * (seed % 5), "sunrise": START, "sunset": START + 40000}
+    # Round-trip through JSON so the dicts look exactly like parsed upstream responses
+    return json.loads(json.dumps({"cod": "200", "message": 0, "cnt": 40, "list": items, "city": city}))
+
+
+def coordinate(seed: int):
+    # Half a degree apart, far outside the nearby-hit radius
+    return -45 + seed // 200 * 0.5, -50 + seed % 200 * 0.5
+
+
+def traced(action) -> int:
+    gc.collect()
+    tracemalloc.start()
+    action()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained
+
+
+def run(client: TestClient, locations: int, pack) -> dict:
+    forecast_cache._entries.clear()
+    forecast_cache.pack = pack
+    forecast_cache.max_entries = locations + 1
+
+    def fill():
+        for seed in range(locations):
+            forecast_cache.set(_coord_key(*coordinate(seed)), synthetic_forecast(seed))
+
+    def serve():
+        for seed in range(locations):
+            lat, lon = coordinate(seed)
+            assert client.get("/api/forecast", params={"lat": lat, "lon": lon}).status_code == 200
+
+    cached = traced(fill)
+    entry = forecast_cache.get(_coord_key(*coordinate(0)))
+    deep_cached = deep_sizeof(entry.stored)
+    served = traced(serve)
+    # Timed again outside tracemalloc, which slows allocation-heavy code down
+    start = time.perf_counter()
+    serve()
+    request_s = (time.perf_counter() - start) / locations
+    return {
+        "entries": list(forecast_cache._entries.values()),
+        "cached": cached,
+        "served": cached + served,
+        "deep_cached": deep_cached,
+        "deep_served": deep_sizeof(entry.stored) + deep_sizeof(entry.derived),
+        "request_s": request_s,
+    }
+
+
+def main(locations: int) -> None:
+    # Warm the intern tables and the app so they are not charged to either run
+    pack_forecast(synthetic_forecast(0))
+    client = TestClient(app)
+    run(client, 1, None)
+    plain = run(client, locations, None)
+    compact = run(client, locations, pack_forecast)
+
+    packed = sum(isinstance(e.stored, CompactForecast) for e in compact["entries"])
+    assert compact["entries"][0].data == plain["entries"][0].data
+
+    start = time.perf_counter()
+    for entry in compact["entries"]:
+        entry.data
+    materialize_s = time.perf_counter() - start
+
+    print(f"locations:                     {locations}  ({packed} packed)")
+    for label, stage in (("cached", "cached"), ("after one GET", "served")):
+        print(f"{label + ':':<31}dict {plain[stage] / locations:9,.0f} B/entry   "
+              f"columnar {compact[stage] / locations:9,.0f} B/entry   "
+              f"{plain[stage] / compact[stage]:5.1f}x (traced)")
+    print(f"deep size of one entry:        cached {plain['deep_cached']:,} B -> {compact['deep_cached']:,} B, "
+          f"served {plain['deep_served']:,} B -> {compact['deep_served']:,} B")
+    print(f"materialize on access:         {materialize_s / locations * 1e6:9.1f} us/entry")
+    print(f"GET /api/forecast:             dict {plain['request_s'] * 1e6:9.1f} us   "
+          f"columnar {compact['request_s'] * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=2000)
+    main(parser.parse_args().locations)
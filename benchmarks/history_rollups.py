@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Build a synthetic observation history and time rollup queries against it.
+
+Writes CITIES locations x DAYS days of 10-minute observations into a
+temporary history store (so most rows sit in sealed segments with
+materialized hourly rollups), then times day/week rollups for every city
+and checks a sample against a naive per-bucket computation.
+
+    python benchmarks/history_rollups.py --cities 50 --days 90
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import HistoryStore  # noqa: E402
+from rollups import Aggregate, Interval, bucket_start  # noqa: E402
+
+START = 1735689600  # 2025-01-01 00:00 UTC
+STEP = 600
+
+
+def ingest(store: HistoryStore, cities: int, days: int) -> int:
+    rows = 0
+    for t in range(START, START + days * 86400, STEP):
+        batch = []
+        for city in range(cities):
+            temp = 280 + 10 * math.sin((t / 86400 + city) * 2 * math.pi) + city % 7
+            batch.append((f"coord:{city}:0", (t, temp, 50 + city % 40, 1010 + city % 9, (t // STEP + city) % 12, 180, 800)))
+        store._write(batch)
+        rows += len(batch)
+    return rows
+
+
+def naive(store: HistoryStore, key, start, end, interval, aggregate):
+    raw = store.query(key, start, end)
+    buckets = defaultdict(list)
+    for dt, temp in zip(raw["dt"].tolist(), raw["temp"].tolist()):
+        buckets[int(bucket_start(np.int64(dt), interval))].append(temp)
+    reduce = {
+        Aggregate.min: min,
+        Aggregate.max: max,
+        Aggregate.mean: lambda v: sum(v) / len(v),
+        Aggregate.p95: lambda v: sorted(v)[max(math.ceil(0.95 * len(v)) - 1, 0)],
+    }[aggregate]
+    return {b: reduce(v) for b, v in buckets.items()}
+
+
+def main(cities: int, days: int, segment_rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(directory, segment_rows=segment_rows)
+        store._load()
+        start = time.perf_counter()
+        rows = ingest(store, cities, days)
+        ingest_s = time.perf_counter() - start
+        end = START + days * 86400 - 1
+        print(f"rows: {rows:,}  cities: {cities}  days: {days}  segments: {store.stats()['segments']}  ingest: {ingest_s:.1f}s")
+
+        key = ("coord", 3, 0)
+        for aggregate in Aggregate:
+            got = store.rollup(key, START, end, Interval.day, aggregate)
+            expected = naive(store, key, START, end, Interval.day, aggregate)
+            assert all(abs(v - expected[b]) < 1e-3 for b, v in zip(got["dt"].tolist(), got["temp"].tolist())), aggregate
+
+        for interval in (Interval.hour, Interval.day, Interval.week):
+            for aggregate in Aggregate:
+                start = time.perf_counter()
+                for city in range(cities):
+                    store.rollup(("coord", city, 0), START, end, interval, aggregate)
+                elapsed = time.perf_counter() - start
+                print(f"{interval.value:>5} {aggregate.value:>4}: {elapsed * 1000:8.1f} ms for {cities} cities ({elapsed / cities * 1000:.2f} ms/city)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--segment-rows", type=int, default=65536)
+    args = parser.parse_args()
+    main(args.cities, args.days, args.segment_rows)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Serve one of the apps in this repository with its upstream calls sent to
+the mock upstream (``benchmarks/mock_upstream.py``).
+
+``main.py`` reads ``OPENWEATHER_BASE_URL`` / ``OPEN_METEO_BASE_URL`` /
+``IP_API_BASE_URL``; ``app/`` and ``api/`` hard-code the real hosts, so every
+``httpx.AsyncClient`` created in this process gets a transport that rewrites
+those hosts to the mock.
+
+    python benchmarks/load_target.py main --port 8100 --upstream http://127.0.0.1:9100
+    python benchmarks/load_target.py api/main.py --port 8100 --upstream http://127.0.0.1:9100
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = {"main": "main.py", "app": "app/main.py", "api": "api/main.py"}
+UPSTREAM_HOSTS = {"api.openweathermap.org", "api.open-meteo.com", "ip-api.com"}
+
+
+class RedirectTransport(httpx.AsyncHTTPTransport):
+    """Sends requests for the real upstream hosts to ``upstream`` instead."""
+
+    def __init__(self, upstream: httpx.URL, **kwargs):
+        super().__init__(**kwargs)
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host in UPSTREAM_HOSTS:
+            request.url = request.url.copy_with(scheme=self.upstream.scheme, host=self.upstream.host, port=self.upstream.port)
+            request.headers["Host"] = self.upstream.netloc.decode()
+        return await super().handle_async_request(request)
+
+
+def redirect_httpx(upstream: str) -> None:
+    url = httpx.URL(upstream)
+    original = httpx.AsyncClient.__init__
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("transport", RedirectTransport(url))
+        original(self, *args, **kwargs)
+
+    httpx.AsyncClient.__init__ = __init__
+
+
+def load_app(target: str):
+    path = os.path.join(ROOT, TARGETS.get(target, target))
+    # Each app imports its sibling modules (models, services, ...) by name
+    sys.path[:0] = [os.path.dirname(path), ROOT]
+    spec = importlib.util.spec_from_file_location("load_target_app", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", help="main, app, api or a path to a module defining ``app``")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--upstream", default="http://127.0.0.1:9100")
+    args = parser.parse_args()
+    os.environ.setdefault("OPENWEATHER_BASE_URL", args.upstream)
+    os.environ.setdefault("IP_API_BASE_URL", args.upstream)
+    os.environ.setdefault("OPEN_METEO_BASE_URL", args.upstream)
+    redirect_httpx(args.upstream)
+    uvicorn.run(load_app(args.target), host=args.host, port=args.port, log_level="warning", access_log=False)
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Load-test an app in this repository against the local mock upstream.
+
+Starts ``benchmarks/mock_upstream.py`` and the target app (through
+``benchmarks/load_target.py``, so it never calls the real services), then
+runs each scenario for ``--duration`` seconds with ``--concurrency``
+closed-loop clients against a freshly started target:
+
+    hot-key     every client asks for the current weather at one point
+    long-tail   weather/forecast over thousands of points, Zipf popularity
+    city-mix    weather/forecast by city name, with a few unknown cities
+    batch       POST /api/weather/batch with 25 locations (main.py only)
+    demo        the demo page: HTML, its static assets, location, weather
+                and forecast, from a pool of client IPs
+
+Reports requests per second, p50/p95/p99 latency, status codes, upstream
+calls and the target's resident memory (peak), and compares them with the
+stored baseline (``benchmarks/baselines/<target>.json``), flagging changes
+beyond ``--threshold``. Numbers are only comparable between runs on the
+same machine with the same settings; ``--save-baseline`` records a new one.
+
+    python benchmarks/load_test.py --target main --duration 10 --concurrency 32
+    python benchmarks/load_test.py --target main --latency-ms 80 --error-rate 0.02 --scenario long-tail
+    python benchmarks/load_test.py --target api --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINES = os.path.join(HERE, "baselines")
+
+# Per target: where the demo page gets its forecast, and whether batch exists
+TARGETS = {
+    "main": {"forecast": "/api/forecast/daily", "batch": True},
+    "app": {"forecast": "/api/forecast", "batch": False},
+    "api": {"forecast": "/api/forecast", "batch": False},
+}
+CITIES = [
+    "London", "Paris", "Berlin", "Madrid", "Rome", "Lisbon", "Dublin", "Amsterdam", "Brussels", "Vienna",
+    "Prague", "Warsaw", "Oslo", "Stockholm", "Helsinki", "Athens", "Istanbul", "Cairo", "Lagos", "Nairobi",
+    "Accra", "Johannesburg", "Dubai", "Mumbai", "Delhi", "Bangkok", "Singapore", "Jakarta", "Tokyo", "Seoul",
+    "Beijing", "Sydney", "Auckland", "Toronto", "Chicago", "Denver", "Seattle", "Mexico City", "Lima", "Santiago",
+]
+UNKNOWN_CITY_RATE = 0.02
+BATCH_SIZE = 25
+STATIC_ASSET = re.compile(r"""(?:href|src)=["'](/static/[^"']+)["']""")
+
+Request = Tuple[str, str, dict]  # method, path, httpx request kwargs
+
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1 / (rank + 1) ** s for rank in range(n)]
+
+
+class Workload:
+    """Request generators for the scenarios; each call returns the requests of one client step."""
+
+    def __init__(self, target: str, points: int, seed: int):
+        self.profile = TARGETS.get(target, TARGETS["app"])
+        rng = random.Random(seed)
+        self.points = [(round(rng.uniform(-60, 65), 4), round(rng.uniform(-170, 175), 4)) for _ in range(points)]
+        self.point_weights = zipf_weights(points)
+        self.city_weights = zipf_weights(len(CITIES))
+        self.ips = [f"198.51.{rng.randrange(256)}.{rng.randrange(1, 255)}" for _ in range(500)]
+        self.assets: Optional[List[str]] = None
+
+    def hot_key(self, rng: random.Random) -> List[Request]:
+        return [("GET", "/api/weather", {"params": {"lat": 51.5085, "lon": -0.1257}})]
+
+    def long_tail(self, rng: random.Random) -> List[Request]:
+        lat, lon = rng.choices(self.points, self.point_weights)[0]
+        path = "/api/weather" if rng.random() < 0.5 else "/api/forecast"
+        return [("GET", path, {"params": {"lat": lat, "lon": lon}})]
+
+    def city_mix(self, rng: random.Random) -> List[Request]:
+        city = "Nowhere" if rng.random() < UNKNOWN_CITY_RATE else rng.choices(CITIES, self.city_weights)[0]
+        path = "/api/weather-by-city" if rng.random() < 0.6 else "/api/forecast-by-city"
+        return [("GET", path, {"params": {"city": city}})]
+
+    def batch(self, rng: random.Random) -> List[Request]:
+        locations = [{"lat": lat, "lon": lon} for lat, lon in rng.choices(self.points, self.point_weights, k=BATCH_SIZE)]
+        return [("POST", "/api/weather/batch", {"json": {"locations": locations}})]
+
+    def demo(self, rng: random.Random) -> List[Request]:
+        headers = {"X-Forwarded-For": rng.choice(self.ips)}
+        steps: List[Request] = [("GET", "/", {"headers": headers})]
+        steps += [("GET", asset, {}) for asset in self.assets or []]
+        steps.append(("GET", "/api/location", {"headers": headers}))
+        # The page asks for the weather at the location it was given
+        steps.append(("GET", "/api/weather", {"params": "location", "headers": headers}))
+        steps.append(("GET", self.profile["forecast"], {"params": "location", "headers": headers}))
+        return steps
+
+
+SCENARIOS: Dict[str, Callable[[Workload, random.Random], List[Request]]] = {
+    "hot-key": Workload.hot_key,
+    "long-tail": Workload.long_tail,
+    "city-mix": Workload.city_mix,
+    "batch": Workload.batch,
+    "demo": Workload.demo,
+}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not start within {timeout:.0f}s")
+
+
+def stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def run_scenario(base_url: str, pid: int, workload: Workload, scenario: str, args) -> dict:
+    make = SCENARIOS[scenario]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    rss_peak = 0.0
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        if scenario == "demo":
+            page = await client.get("/")
+            workload.assets = list(dict.fromkeys(STATIC_ASSET.findall(page.text)))
+
+        measure_from = time.perf_counter() + args.warmup
+        stop_at = measure_from + args.duration
+
+        async def user(seed: int) -> None:
+            rng = random.Random(seed)
+            while time.perf_counter() < stop_at:
+                location = None
+                for method, path, kwargs in make(workload, rng):
+                    if kwargs.get("params") == "location":
+                        kwargs = dict(kwargs, params={"lat": (location or {}).get("lat", 51.5), "lon": (location or {}).get("lon", -0.12)})
+                    start = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, **kwargs)
+                        status = str(response.status_code)
+                    except httpx.HTTPError as exc:
+                        response, status = None, type(exc).__name__
+                    end = time.perf_counter()
+                    if start >= measure_from and end <= stop_at:
+                        latencies.append(end - start)
+                        statuses[status] += 1
+                    if path == "/api/location" and response is not None and response.status_code == 200:
+                        location = response.json()
+
+        async def sample_memory() -> None:
+            nonlocal rss_peak
+            while time.perf_counter() < stop_at:
+                rss_peak = max(rss_peak, rss_mb(pid) or 0.0)
+                await asyncio.sleep(0.25)
+
+        await asyncio.gather(sample_memory(), *(user(args.seed * 1000 + i) for i in range(args.concurrency)))
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status[0] in "23")
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / args.duration,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "ok_rate": ok / len(latencies) if latencies else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "rss_peak_mb": rss_peak,
+        "rss_end_mb": rss_mb(pid),
+    }
+
+
+def run(args) -> dict:
+    mock_port, target_port = free_port(), free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    target_url = f"http://127.0.0.1:{target_port}"
+    mock = subprocess.Popen([
+        sys.executable, os.path.join(HERE, "mock_upstream.py"), "--port", str(mock_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), "--seed", str(args.seed),
+    ])
+    results = {}
+    try:
+        wait_ready(f"{mock_url}/__stats", mock)
+        workload = Workload(args.target, args.points, args.seed)
+        for scenario in args.scenario:
+            if scenario == "batch" and not workload.profile["batch"]:
+                print(f"{scenario:>10}: skipped, {args.target} has no batch endpoint")
+                continue
+            with tempfile.TemporaryDirectory() as history_dir:
+                env = dict(os.environ, HISTORY_DIR=history_dir)
+                target = subprocess.Popen([
+                    sys.executable, os.path.join(HERE, "load_target.py"), args.target,
+                    "--port", str(target_port), "--upstream", mock_url,
+                ], env=env)
+                try:
+                    wait_ready(f"{target_url}/api/health", target)
+                    httpx.post(f"{mock_url}/__reset")
+                    result = asyncio.run(run_scenario(target_url, target.pid, workload, scenario, args))
+                    result["upstream"] = httpx.get(f"{mock_url}/__stats").json()
+                finally:
+                    stop(target)
+            results[scenario] = result
+            print_result(scenario, result)
+    finally:
+        stop(mock)
+    return results
+
+
+def print_result(scenario: str, r: dict) -> None:
+    upstream = sum(count for kind, count in r["upstream"].items() if kind != "errors")
+    print(
+        f"{scenario:>10}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f}  p95 {r['p95_ms']:7.1f}  p99 {r['p99_ms']:7.1f} ms  "
+        f"ok {r['ok_rate']:6.1%}  upstream {upstream:6d}  rss {r['rss_peak_mb']:6.1f} MB  {r['statuses']}"
+    )
+
+
+# (metric, higher is better)
+COMPARED = [("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("upstream_calls", False), ("rss_peak_mb", False)]
+
+
+def metrics(result: dict) -> dict:
+    values = {name: result.get(name) for name, _ in COMPARED}
+    values["upstream_calls"] = sum(count for kind, count in result["upstream"].items() if kind != "errors")
+    return values
+
+
+def compare(results: dict, baseline: dict, config: dict, threshold: float) -> List[str]:
+    """Print the change of every metric against the baseline; return the regressions."""
+    regressions = []
+    if baseline["config"] != config:
+        print("note: baseline was recorded with different settings:", baseline["config"])
+    print(f"\nvs baseline ({baseline['recorded']}), threshold {threshold:.0%}:")
+    for scenario, result in results.items():
+        if scenario not in baseline["scenarios"]:
+            continue
+        now, then = metrics(result), metrics(baseline["scenarios"][scenario])
+        cells = []
+        for name, higher_is_better in COMPARED:
+            if not then[name]:
+                continue
+            change = (now[name] - then[name]) / then[name]
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = " REGRESSION"
+                regressions.append(f"{scenario} {name} {change:+.0%}")
+            cells.append(f"{name} {change:+.0%}{flag}")
+        print(f"{scenario:>10}: " + "  ".join(cells))
+    return regressions
+
+
+def config_of(args) -> dict:
+    return {name: getattr(args, name) for name in ("concurrency", "duration", "points", "latency_ms", "jitter_ms", "error_rate", "seed")}
+
+
+def main(args) -> int:
+    path = args.baseline or os.path.join(BASELINES, f"{args.target}.json")
+    print(f"target: {args.target}  concurrency: {args.concurrency}  duration: {args.duration}s  "
+          f"upstream latency: {args.latency_ms}±{args.jitter_ms} ms  error rate: {args.error_rate:.1%}")
+    results = run(args)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"recorded": time.strftime("%Y-%m-%d"), "config": config_of(args), "scenarios": results}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {os.path.relpath(path)}")
+        return 0
+    if os.path.exists(path):
+        with open(path) as f:
+            regressions = compare(results, json.load(f), config_of(args), args.threshold)
+        if regressions and args.fail_on_regression:
+            print("regressions:", ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="main", help="main, app, api or a path to a module defining ``app``")
+    parser.add_argument("--scenario", nargs="*", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of load before measuring")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--points", type=int, default=5000, help="distinct coordinates in the long-tail and batch scenarios")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="baseline file (default benchmarks/baselines/<target>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative change flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    sys.exit(main(parser.parse_args()))
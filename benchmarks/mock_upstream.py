@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for OpenWeatherMap, Open-Meteo and ip-api used by the load tests.
+
+Serves the recorded payloads in ``benchmarks/payloads`` (coordinates, city
+name and client IP filled in from the request) on the same paths as the
+real services, with optional latency and error injection:
+
+    /data/2.5/weather    current weather, by lat/lon or q=city
+    /data/2.5/forecast   5-day / 3-hour forecast, by lat/lon or q=city
+    /data/3.0/onecall    One Call current, hourly and daily data, by lat/lon
+    /v1/forecast         Open-Meteo current and hourly data, by latitude/longitude
+    /json/{ip}           ip-api geolocation
+    /__stats             upstream call counts (POST /__reset clears them)
+
+Cities starting with "Nowhere" answer 404, like an unknown city upstream.
+
+    python benchmarks/mock_upstream.py --port 9100 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+from collections import Counter
+from typing import Optional, Set
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+PAYLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+
+
+def load_payload(name: str) -> dict:
+    with open(os.path.join(PAYLOADS, f"{name}.json")) as f:
+        return json.load(f)
+
+
+class Upstream:
+    """Recorded payloads plus the injected latency/errors and call counters."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, error_status: int = 500, seed: int = 0, fail_kinds: Optional[Set[str]] = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Endpoints errors are injected into (weather, forecast, onecall, openmeteo, location); None is all of them
+        self.fail_kinds = fail_kinds
+        self.rng = random.Random(seed)
+        self.payloads = {name: load_payload(name) for name in ("weather", "forecast", "onecall", "openmeteo", "location")}
+        self.calls = Counter()
+
+    async def delay(self) -> None:
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+
+    def failed(self, kind: str):
+        if self.fail_kinds is not None and kind not in self.fail_kinds:
+            return None
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.calls["errors"] += 1
+            return JSONResponse({"cod": self.error_status, "message": "injected upstream error"}, status_code=self.error_status)
+        return None
+
+    def owm(self, kind: str, request: Request) -> Response:
+        query = request.query_params
+        doc = self.payloads[kind]
+        if kind == "openmeteo":
+            try:
+                return JSONResponse(dict(doc, latitude=float(query["latitude"]), longitude=float(query["longitude"])))
+            except (KeyError, ValueError):
+                return JSONResponse({"error": True, "reason": "Parameter 'latitude' is missing"}, status_code=400)
+        if kind == "onecall":
+            try:
+                return JSONResponse(dict(doc, lat=float(query["lat"]), lon=float(query["lon"])))
+            except (KeyError, ValueError):
+                return JSONResponse({"cod": "400", "message": "wrong latitude"}, status_code=400)
+        # Only the top level and the parts that are templated are copied
+        doc = dict(doc, coord=dict(doc["coord"])) if kind == "weather" else dict(doc, city=copy.deepcopy(doc["city"]))
+        coord = doc["coord"] if kind == "weather" else doc["city"]["coord"]
+        target = doc if kind == "weather" else doc["city"]
+        if "q" in query:
+            city, _, country = query["q"].partition(",")
+            if city.lower().startswith("nowhere"):
+                return JSONResponse({"cod": "404", "message": "city not found"}, status_code=404)
+            target["name"] = city
+            if country:
+                (doc["sys"] if kind == "weather" else target)["country"] = country.upper()
+        else:
+            try:
+                coord["lat"], coord["lon"] = float(query["lat"]), float(query["lon"])
+            except (KeyError, ValueError):
+                return JSONResponse({"cod": "400", "message": "wrong latitude"}, status_code=400)
+        return JSONResponse(doc)
+
+    async def weather(self, request: Request) -> Response:
+        return await self.handle("weather", request)
+
+    async def forecast(self, request: Request) -> Response:
+        return await self.handle("forecast", request)
+
+    async def onecall(self, request: Request) -> Response:
+        return await self.handle("onecall", request)
+
+    async def openmeteo(self, request: Request) -> Response:
+        return await self.handle("openmeteo", request)
+
+    async def location(self, request: Request) -> Response:
+        return await self.handle("location", request)
+
+    async def handle(self, kind: str, request: Request) -> Response:
+        self.calls[kind] += 1
+        await self.delay()
+        failure = self.failed(kind)
+        if failure is not None:
+            return failure
+        if kind == "location":
+            return JSONResponse(dict(self.payloads["location"], query=request.path_params.get("ip") or "203.0.113.10"))
+        return self.owm(kind, request)
+
+    async def stats(self, request: Request) -> Response:
+        return JSONResponse(dict(self.calls))
+
+    async def reset(self, request: Request) -> Response:
+        self.calls.clear()
+        return JSONResponse({})
+
+
+def create_app(upstream: Upstream) -> Starlette:
+    return Starlette(routes=[
+        Route("/data/2.5/weather", upstream.weather),
+        Route("/data/2.5/forecast", upstream.forecast),
+        Route("/data/3.0/onecall", upstream.onecall),
+        Route("/v1/forecast", upstream.openmeteo),
+        Route("/json/", upstream.location),
+        Route("/json/{ip}", upstream.location),
+        Route("/__stats", upstream.stats),
+        Route("/__reset", upstream.reset, methods=["POST"]),
+    ])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean injected latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="standard deviation of the injected latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fail-kinds", help="comma-separated endpoints errors are limited to, e.g. weather,forecast to take down OWM only")
+    args = parser.parse_args()
+    fail_kinds = set(args.fail_kinds.split(",")) if args.fail_kinds else None
+    upstream = Upstream(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed, fail_kinds)
+    uvicorn.run(create_app(upstream), host=args.host, port=args.port, log_level="warning", access_log=False)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Replay a request trace against the weather cache with and without the
+geohash nearby-hit fallback and compare the effective hit rate.
+
+The trace is a CSV of ``t,lat,lon`` rows (seconds from the start), or a
+synthetic one: users scattered a few kilometres around popular places with
+Zipf-distributed popularity. Time is virtual, so TTL expiry plays out at
+trace speed and no upstream calls are made.
+
+    python benchmarks/nearby_cache_trace.py --requests 50000 --radius 250 500 1000 2000
+    python benchmarks/nearby_cache_trace.py --trace access.csv
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import sys
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache  # noqa: E402
+from cache import TTLCache  # noqa: E402
+from services import WEATHER_CACHE_TTL, _coord_key, nearby_entry  # noqa: E402
+from spatial import SpatialIndex  # noqa: E402
+
+Trace = List[Tuple[float, float, float]]
+
+
+class VirtualClock:
+    """Stands in for the ``time`` module used by the cache so TTLs follow trace time."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+def synthetic_trace(requests: int, places: int, hours: float, spread_km: float, seed: int) -> Trace:
+    rng = random.Random(seed)
+    centres = [(rng.uniform(-50, 60), rng.uniform(-120, 140)) for _ in range(places)]
+    weights = [1 / (rank + 1) for rank in range(places)]
+    spread = spread_km / 111.0
+    trace = []
+    for _ in range(requests):
+        lat, lon = rng.choices(centres, weights)[0]
+        trace.append((rng.uniform(0, hours * 3600), lat + rng.gauss(0, spread), lon + rng.gauss(0, spread)))
+    return sorted(trace)
+
+
+def load_trace(path: str) -> Trace:
+    with open(path, newline="") as f:
+        return sorted((float(row[0]), float(row[1]), float(row[2])) for row in csv.reader(f) if row and row[0] != "t")
+
+
+async def replay(trace: Trace, radius_m: float, ttl: float) -> dict:
+    clock = VirtualClock()
+    cache.time = clock
+    weather_cache = TTLCache(ttl=ttl)
+    index = SpatialIndex(weather_cache, radius_m)
+    fetches = 0
+    distances = []
+
+    async def upstream():
+        nonlocal fetches
+        fetches += 1
+        return {"cod": 200}
+
+    async def fetch(lat: float, lon: float):
+        entry = await weather_cache.get_or_fetch(_coord_key(lat, lon), upstream)
+        index.add(entry.key)
+        return entry
+
+    for t, lat, lon in trace:
+        clock.now = t
+        _, distance = await nearby_entry(index, lat, lon, fetch)
+        if distance is not None:
+            distances.append(distance)
+    return {
+        "radius": radius_m,
+        "hit_rate": 1 - fetches / len(trace),
+        "upstream": fetches,
+        "nearby": len(distances),
+        "mean_distance": sum(distances) / len(distances) if distances else 0.0,
+    }
+
+
+def main(args) -> None:
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(
+        args.requests, args.places, args.hours, args.spread_km, args.seed
+    )
+    real_time = cache.time
+    try:
+        results = [asyncio.run(replay(trace, radius, args.ttl)) for radius in [0.0] + args.radius]
+    finally:
+        cache.time = real_time
+
+    baseline = results[0]["hit_rate"]
+    print(f"requests: {len(trace)}  ttl: {args.ttl:.0f}s")
+    print(f"{'radius m':>9} {'hit rate':>9} {'gain':>8} {'upstream':>9} {'nearby hits':>12} {'mean dist m':>12}")
+    for r in results:
+        print(
+            f"{r['radius']:9.0f} {r['hit_rate']:9.1%} {r['hit_rate'] - baseline:+8.1%} "
+            f"{r['upstream']:9d} {r['nearby']:12d} {r['mean_distance']:12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", help="CSV file of t,lat,lon rows")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--places", type=int, default=200)
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--spread-km", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--ttl", type=float, default=WEATHER_CACHE_TTL)
+    parser.add_argument("--radius", type=float, nargs="*", default=[250, 500, 1000, 2000])
+    main(parser.parse_args())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Measure the hub's memory cost per idle subscriber.
+
+Opens N in-process SSE subscribers spread over M locations against a stub
+fetch (no network), and reports upstream fetches and tracemalloc growth.
+
+    python benchmarks/subscription_fanout.py --connections 20000 --locations 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import CacheEntry  # noqa: E402
+from subscriptions import SubscriptionHub, sse_events  # noqa: E402
+
+
+async def main(connections: int, locations: int) -> None:
+    fetches = 0
+
+    async def fetch(location):
+        nonlocal fetches
+        fetches += 1
+        return CacheEntry(location, {"dt": 1, "main": {"temp": 280.0}}, ttl=600)
+
+    hub = SubscriptionHub(fetch, interval=3600)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    streams = []
+    for i in range(connections):
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ("coord", str(i % locations), "0"))
+        stream = sse_events(hub, subscriber)
+        streams.append(asyncio.ensure_future(stream.__anext__()))
+    await asyncio.sleep(0.1)
+
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    print(f"connections:        {connections}")
+    print(f"locations:          {len(hub.pollers)}")
+    print(f"upstream fetches:   {fetches}")
+    print(f"bytes/connection:   {used / connections:,.0f} (including the waiting stream coroutine)")
+
+    for future in streams:
+        future.cancel()
+    await hub.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--locations", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.connections, args.locations))
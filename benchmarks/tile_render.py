@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measure weather tile rendering: per-tile render time, throughput inline and
+through a process pool, and the tile cache hit ratio for a panning session.
+
+Grid values are synthetic, so no upstream calls are made.
+
+    python benchmarks/tile_render.py --tiles 200 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid import GridSpec  # noqa: E402
+from tiles import LAYERS, TileService, render_tile, tile_bounds, tile_resolution  # noqa: E402
+
+
+def tile_args(z: int, x: int, y: int):
+    resolution = tile_resolution(tile_bounds(z, x, y))
+    west, south, east, north = tile_bounds(z, x, y)
+    spec = GridSpec((west - resolution, south - resolution, east + resolution, north + resolution), resolution)
+    rng = np.random.default_rng(x * 31 + y)
+    values = 263 + rng.random(spec.shape) * 40
+    return (z, x, y, np.array(spec.lats), np.array(spec.lons), values, resolution, LAYERS["temperature"].stops)
+
+
+def viewport(z: int, centre_x: int, centre_y: int, width: int = 4, height: int = 3):
+    return [(z, x, y) for x in range(centre_x - width // 2, centre_x + width - width // 2)
+            for y in range(centre_y - height // 2, centre_y + height - height // 2)]
+
+
+class SyntheticEntry:
+    def __init__(self, lat: float):
+        self.lat = lat
+
+    def derive(self, name, factory):
+        return factory({"main": {"temp": 280 + self.lat / 10}, "clouds": {"all": 50}})
+
+
+async def panning(steps: int) -> dict:
+    async def fetch(lat, lon):
+        return SyntheticEntry(lat)
+
+    source = (lambda lat, lon: SyntheticEntry(lat), fetch)
+    service = TileService({"weather": source, "forecast": source}, workers=0)
+    # Pan east one tile at a time across a 4x3 tile viewport at zoom 7
+    for step in range(steps):
+        for z, x, y in viewport(7, 63 + step, 42):
+            await service.tile("temperature", z, x, y)
+    return service.stats()
+
+
+def main(tiles: int, workers: int) -> None:
+    jobs = [tile_args(7, 60 + i % 16, 40 + i // 16 % 8) for i in range(tiles)]
+
+    start = time.perf_counter()
+    sizes = [len(render_tile(*args)) for args in jobs]
+    inline_s = time.perf_counter() - start
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(render_tile, *zip(*jobs[:workers])))  # warm the workers
+        start = time.perf_counter()
+        list(pool.map(render_tile, *zip(*jobs)))
+        pool_s = time.perf_counter() - start
+
+    stats = asyncio.run(panning(10))
+    print(f"tiles:                    {tiles}  (mean PNG {sum(sizes) / len(sizes) / 1024:.1f} KiB)")
+    print(f"inline render:            {inline_s / tiles * 1000:8.2f} ms/tile  {tiles / inline_s:8.1f} tiles/s")
+    print(f"process pool ({workers} workers): {pool_s / tiles * 1000:8.2f} ms/tile  {tiles / pool_s:8.1f} tiles/s")
+    print(f"panning 10 steps:         hit ratio {stats['hit_ratio']}, {stats['renders']} renders")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    main(args.tiles, args.workers)
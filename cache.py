@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from timing import phase
+
+
+class Packed:
+    """Base for compact stored payloads that are rebuilt into plain JSON data on access."""
+
+    __slots__ = ()
+
+    def materialize(self) -> Any:
+        raise NotImplementedError
+
+
+def unpack(stored: Any) -> Any:
+    return stored.materialize() if isinstance(stored, Packed) else stored
+
+
+class CacheEntry:
+    """
+    A cached upstream payload plus anything derived from it.
+
+    Derived views (aggregates, projections, encodings...) are memoized in
+    ``derived`` so they are computed at most once per upstream fetch and are
+    dropped together with the payload when it expires.
+
+    ``stored`` is either the payload itself or a ``Packed`` form of it;
+    ``data`` always returns the plain payload.
+    """
+
+    __slots__ = ("key", "stored", "fetched_at", "expires_at", "derived")
+
+    def __init__(self, key: Hashable, data: Any, ttl: float):
+        self.key = key
+        self.stored = data
+        self.fetched_at = time.time()
+        self.expires_at = time.monotonic() + ttl
+        self.derived: Dict[Hashable, Any] = {}
+
+    @property
+    def data(self) -> Any:
+        return unpack(self.stored)
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def derive(self, name: Hashable, factory: Callable[[Any], Any]) -> Any:
+        try:
+            return self.derived[name]
+        except KeyError:
+            value = self.derived[name] = factory(self.data)
+            return value
+
+
+class TTLCache:
+    """
+    Bounded LRU cache of ``CacheEntry`` objects with a fixed time-to-live.
+
+    Concurrent misses for the same key share a single fetch. An optional
+    ``pack`` function converts payloads to a compact stored form, and an
+    optional ``ttl_for`` gives some payloads a time-to-live other than ``ttl``.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 10000,
+        pack: Optional[Callable[[Any], Any]] = None,
+        ttl_for: Optional[Callable[[Any], float]] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.pack = pack
+        self.ttl_for = ttl_for
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        # Expired entries found on lookup, and misses that joined a fetch already in flight
+        self.stale = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def fetching(self) -> int:
+        """Keys with an upstream fetch in flight."""
+        return len(self._inflight)
+
+    def is_fetching(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.fresh:
+            self.stale += 1
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """The fresh entry for ``key`` without touching LRU order or the lookup counters."""
+        entry = self._entries.get(key)
+        return entry if entry is not None and entry.fresh else None
+
+    def set(self, key: Hashable, data: Any) -> CacheEntry:
+        ttl = self.ttl_for(data) if self.ttl_for else self.ttl
+        entry = CacheEntry(key, self.pack(data) if self.pack else data, ttl)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> CacheEntry:
+        with phase("cache"):
+            entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            with phase("coalesced-wait"):
+                return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = self.set(key, await fetch())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            del self._inflight[key]
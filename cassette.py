@@ -0,0 +1,159 @@
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+# "record" saves every upstream response, "replay" answers from the saved ones; empty disables
+CASSETTE_MODE = os.environ.get("CASSETTE_MODE", "")
+CASSETTE_PATH = os.environ.get("CASSETTE_PATH", "data/cassette.jsonl")
+# Replayed responses wait their recorded latency times this factor (0 answers immediately)
+CASSETTE_LATENCY_SCALE = float(os.environ.get("CASSETTE_LATENCY_SCALE", "1.0"))
+
+MODES = ("record", "replay")
+# Left out of the key so a cassette is independent of the API key it was recorded with
+IGNORED_PARAMS = {"appid"}
+KEPT_HEADERS = ("content-type",)
+
+
+class CassetteMiss(httpx.TransportError):
+    """Replay found no recorded response for a request."""
+
+
+def request_key(method: str, url: httpx.URL) -> str:
+    """Method, host, path and sorted query parameters, without the API key."""
+    params = sorted((k, v) for k, v in parse_qsl(url.query.decode(), keep_blank_values=True) if k not in IGNORED_PARAMS)
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{method.upper()} {url.host.lower()}{url.path}{query}"
+
+
+class Recording:
+    __slots__ = ("status", "headers", "content", "elapsed")
+
+    def __init__(self, status: int, headers: Dict[str, str], content: bytes, elapsed: float):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+
+    def to_json(self, key: str) -> dict:
+        try:
+            body = {"body": self.content.decode()}
+        except UnicodeDecodeError:
+            body = {"body_b64": base64.b64encode(self.content).decode()}
+        return {"key": key, "status": self.status, "headers": self.headers, "elapsed": round(self.elapsed, 6), **body}
+
+    @classmethod
+    def from_json(cls, doc: dict) -> "Recording":
+        content = base64.b64decode(doc["body_b64"]) if "body_b64" in doc else doc["body"].encode()
+        return cls(doc["status"], doc.get("headers", {}), content, doc.get("elapsed", 0.0))
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    Records upstream responses (body, status, content type and latency) to a
+    JSON-lines cassette, or replays them offline. A key recorded several times
+    replays its responses in order, then starts over, so repeated polls see
+    the same sequence of observations as the recorded run.
+    """
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"CASSETTE_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.recordings: Dict[str, List[Recording]] = defaultdict(list)
+        self._next: Dict[str, int] = defaultdict(int)
+        self._inner: Optional[httpx.AsyncHTTPTransport] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            if self.mode == "replay":
+                raise FileNotFoundError(f"No cassette at {self.path}; record one with CASSETTE_MODE=record")
+            return
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    doc = json.loads(line)
+                    self.recordings[doc["key"]].append(Recording.from_json(doc))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request.method, request.url)
+        if self.mode == "replay":
+            return await self._replay(key, request)
+        return await self._record(key, request)
+
+    async def _replay(self, key: str, request: httpx.Request) -> httpx.Response:
+        recordings = self.recordings.get(key)
+        if not recordings:
+            self.misses += 1
+            raise CassetteMiss(f"No recorded response for {key}", request=request)
+        self.hits += 1
+        index = self._next[key]
+        self._next[key] = (index + 1) % len(recordings)
+        recording = recordings[index]
+        if self.latency_scale > 0 and recording.elapsed > 0:
+            await asyncio.sleep(recording.elapsed * self.latency_scale)
+        return httpx.Response(recording.status, headers=recording.headers, content=recording.content, request=request)
+
+    async def _record(self, key: str, request: httpx.Request) -> httpx.Response:
+        if self._inner is None:
+            self._inner = httpx.AsyncHTTPTransport()
+        start = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        elapsed = time.perf_counter() - start
+        # ``aread`` has already decoded any content-encoding, so only the content type is kept
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        recording = Recording(response.status_code, headers, content, elapsed)
+        self.recordings[key].append(recording)
+        self._append(key, recording)
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def _append(self, key: str, recording: Recording) -> None:
+        # One short line per upstream call; only in record mode, which is not a serving setup
+        line = json.dumps(recording.to_json(key), separators=(",", ":")) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line)
+            self.recorded += 1
+
+    async def aclose(self) -> None:
+        if self._inner is not None:
+            await self._inner.aclose()
+            self._inner = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "keys": len(self.recordings),
+            "responses": sum(len(r) for r in self.recordings.values()),
+            "recorded": self.recorded,
+            "replayed": self.hits,
+            "misses": self.misses,
+            "latency_scale": self.latency_scale,
+        }
+
+
+cassette: Optional[CassetteTransport] = (
+    CassetteTransport(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_LATENCY_SCALE) if CASSETTE_MODE else None
+)
@@ -0,0 +1,197 @@
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from cache import Packed
+
+# Numeric leaf fields of a forecast item, in upstream key order: (parent key or None, key)
+NUMERIC_FIELDS: Tuple[Tuple[Optional[str], str], ...] = (
+    ("main", "temp"),
+    ("main", "feels_like"),
+    ("main", "temp_min"),
+    ("main", "temp_max"),
+    ("main", "pressure"),
+    ("main", "sea_level"),
+    ("main", "grnd_level"),
+    ("main", "humidity"),
+    ("main", "temp_kf"),
+    ("clouds", "all"),
+    ("wind", "speed"),
+    ("wind", "deg"),
+    ("wind", "gust"),
+    (None, "visibility"),
+    (None, "pop"),
+    ("rain", "3h"),
+    ("snow", "3h"),
+)
+ITEM_KEYS = ("dt", "main", "weather", "clouds", "wind", "visibility", "pop", "rain", "snow", "sys", "dt_txt")
+NESTED_KEYS = {parent for parent, _ in NUMERIC_FIELDS if parent}
+# OWM reports at most a few decimals, so numbers are kept as exact fixed-point integers
+SCALES = (1, 10, 100, 1000, 10000)
+MISSING = -(2**31)
+# Intern indices are stored as uint16; the largest one is reserved for items without "sys"
+NO_SYS = 0xFFFF
+
+# Process-wide intern table: a few hundred distinct field layouts, condition lists and "sys" dicts cover every forecast
+_interned: Dict[tuple, int] = {}
+_interned_values: List[tuple] = []
+
+
+def _intern(value: tuple) -> Optional[int]:
+    """Index of ``value`` in the intern table, or None once the table is full."""
+    index = _interned.get(value)
+    if index is None:
+        if len(_interned_values) >= NO_SYS:
+            return None
+        index = _interned[value] = len(_interned_values)
+        _interned_values.append(value)
+    return index
+
+
+def _scale(column: List[Any]) -> Optional[int]:
+    """Smallest power-of-ten scale that stores every value of a column exactly in int32."""
+    present = [v for v in column if v is not None]
+    if any(type(v) not in (int, float) for v in present):
+        return None
+    for scale in SCALES:
+        scaled = [v * scale for v in present]
+        if all(abs(x) < 2**31 - 1 and round(x) / scale == v for x, v in zip(scaled, present)):
+            return scale
+    return None
+
+
+def _freeze(value: Union[dict, list]) -> tuple:
+    if isinstance(value, list):
+        return ("list",) + tuple(_freeze(item) for item in value)
+    return ("dict",) + tuple(value.items())
+
+
+def _thaw(value: tuple) -> Union[dict, list]:
+    if value[0] == "list":
+        return [_thaw(item) for item in value[1:]]
+    return dict(value[1:])
+
+
+class CompactForecast(Packed):
+    """
+    A forecast stored as struct-of-arrays.
+
+    Numeric fields live in one ``int32`` matrix (one row per present field,
+    decimals kept as exact fixed-point with a per-field scale), the field
+    layout, condition lists and ``sys`` dicts are interned process-wide and
+    referenced by index, and ``dt_txt`` is recomputed from ``dt``.
+    ``materialize()`` rebuilds the upstream JSON byte for byte.
+    """
+
+    __slots__ = ("cod", "message", "city", "dt", "schema", "values", "ints", "weather", "sys")
+
+    @classmethod
+    def pack(cls, forecast: dict) -> Optional["CompactForecast"]:
+        """Pack an upstream forecast, or return None if it has a shape or values we do not model."""
+        if set(forecast) - {"cod", "message", "cnt", "list", "city"}:
+            return None
+        items = forecast["list"]
+        for item in items:
+            if set(item) - set(ITEM_KEYS) or any(
+                not isinstance(item.get(parent, {}), dict) for parent in NESTED_KEYS
+            ):
+                return None
+
+        schema, rows, ints = [], [], []
+        for parent, key in NUMERIC_FIELDS:
+            column = [(item.get(parent) or {}).get(key) if parent else item.get(key) for item in items]
+            if all(v is None for v in column):
+                continue
+            scale = _scale(column)
+            if scale is None:
+                return None
+            schema.append((parent, key, scale))
+            rows.append([MISSING if v is None else round(v * scale) for v in column])
+            ints.append([type(v) is int for v in column])
+
+        layout = _intern(tuple(schema))
+        weather = [_intern(_freeze(item.get("weather", []))) for item in items]
+        sys_dicts = [_intern(_freeze(item["sys"])) if "sys" in item else NO_SYS for item in items]
+        if layout is None or None in weather or None in sys_dicts:
+            return None
+
+        self = cls.__new__(cls)
+        self.cod = forecast.get("cod")
+        self.message = forecast.get("message")
+        self.city = forecast.get("city")
+        self.dt = np.fromiter((item["dt"] for item in items), dtype=np.int64, count=len(items))
+        self.schema = layout
+        self.values = np.array(rows, dtype=np.int32).reshape(len(rows), len(items))
+        self.ints = np.packbits(np.array(ints, dtype=bool).reshape(len(rows), len(items)), axis=1)
+        self.weather = np.array(weather, dtype=np.uint16)
+        self.sys = np.array(sys_dicts, dtype=np.uint16)
+
+        # Only keep the compact form when it round-trips exactly, including int/float spelling
+        if json.dumps(self.materialize()) != json.dumps(forecast):
+            return None
+        return self
+
+    def materialize(self) -> dict:
+        schema = _interned_values[self.schema]
+        slots = len(self.dt)
+        ints = np.unpackbits(self.ints, axis=1, count=slots).astype(bool).tolist()
+        columns = [
+            [None if v == MISSING else (v // scale if is_int else v / scale) for v, is_int in zip(row, flags)]
+            for row, flags, (_, _, scale) in zip(self.values.tolist(), ints, schema)
+        ]
+        items = []
+        for slot, dt in enumerate(self.dt.tolist()):
+            item: Dict[str, Any] = {"dt": dt}
+            nested: Dict[str, dict] = {}
+            top: Dict[str, Any] = {}
+            for (parent, key, _), column in zip(schema, columns):
+                value = column[slot]
+                if value is None:
+                    continue
+                if parent:
+                    nested.setdefault(parent, {})[key] = value
+                else:
+                    top[key] = value
+            sys_index = int(self.sys[slot])
+            for key in ITEM_KEYS[1:]:
+                if key == "weather":
+                    item["weather"] = _thaw(_interned_values[self.weather[slot]])
+                elif key == "sys":
+                    if sys_index != NO_SYS:
+                        item["sys"] = _thaw(_interned_values[sys_index])
+                elif key == "dt_txt":
+                    item["dt_txt"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(dt))
+                elif key in nested:
+                    item[key] = nested[key]
+                elif key in top:
+                    item[key] = top[key]
+            items.append(item)
+        return {"cod": self.cod, "message": self.message, "cnt": len(items), "list": items, "city": self.city}
+
+
+def pack_forecast(forecast: dict) -> Union[CompactForecast, dict]:
+    return CompactForecast.pack(forecast) or forecast
+
+
+def deep_sizeof(value: Any, seen: Optional[set] = None) -> int:
+    """Approximate retained size of an object graph in bytes (shared objects counted once)."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        return size if value.base is None else size + value.nbytes
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    elif hasattr(value, "__slots__"):
+        for cls in type(value).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(value, name):
+                    size += deep_sizeof(getattr(value, name), seen)
+    return size
@@ -0,0 +1,259 @@
+import hashlib
+import os
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # installed from requirements.txt; without it only gzip is offered
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", "500"))
+GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Server preference when the client accepts several encodings with the same q-value
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Content that is already compressed, or must reach the client unbuffered
+UNCOMPRESSIBLE_TYPES = ("image/png", "image/jpeg", "image/webp", "application/gzip", "text/event-stream")
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    """Pick the best encoding from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    available = tuple(available)
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Incremental compressor for a single response body."""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY if level is None else level)
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream
+            self._zlib = zlib.compressobj(GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress_bytes(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    compressor = _Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    The strong validator of the compressed representation: the encoding is
+    appended, as ``StaticPayload.etag`` does. Weak validators already allow
+    different encodings and are kept.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _decode_if_none_match(value: str, encoding: str) -> Tuple[str, bool]:
+    """``If-None-Match`` with ``encoded_etag`` suffixes removed, and whether there were any."""
+    suffix = f'-{encoding}"'
+    tags = [tag.strip() for tag in value.split(",")]
+    decoded = [tag[: -len(suffix)] + '"' if tag.endswith(suffix) and not tag.startswith("W/") else tag for tag in tags]
+    return ", ".join(decoded), decoded != tags
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with gzip or brotli, negotiated via Accept-Encoding.
+
+    Bodies smaller than ``minimum_size`` are sent as-is. Responses that already
+    carry a Content-Encoding (e.g. precompressed static payloads) pass through
+    untouched, and streamed bodies are compressed chunk by chunk.
+
+    A strong ``ETag`` on a compressed body gets the encoding appended, and the
+    suffix is stripped from ``If-None-Match`` again before the app sees it, so
+    the app keeps comparing its own validators.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        # The client revalidated the compressed representation
+        self.revalidating_encoded = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        request_headers = MutableHeaders(scope=scope)
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            request_headers["if-none-match"], self.revalidating_encoded = _decode_if_none_match(if_none_match, self.encoding)
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or content_type.startswith(UNCOMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                if message["status"] == 304 and self.revalidating_encoded and "etag" in headers:
+                    response_headers = MutableHeaders(raw=message["headers"])
+                    response_headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+                await self.send(message)
+            else:
+                # Hold the start message until we know how large the body is
+                self.start_message = message
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            await self.send(start)
+
+        if more_body:
+            chunk = self.compressor.compress(body) + self.compressor.flush()
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            chunk = self.compressor.compress(body) + self.compressor.finish()
+            await self.send({"type": "http.response.body", "body": chunk})
+
+
+class StaticPayload:
+    """
+    A response body that is compressed once, up front, for every supported
+    encoding and then served from memory with an ETag.
+    """
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str = "no-cache"):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants: Dict[str, bytes] = {}
+        for encoding in SUPPORTED_ENCODINGS:
+            level = 11 if encoding == "br" else 9
+            compressed = compress_bytes(body, encoding, level)
+            if len(compressed) < len(body):
+                self.variants[encoding] = compressed
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            # Any representation of the same content is still fresh
+            if tag.strip('"').split("-", 1)[0] == self.digest:
+                return True
+        return False
+
+    def response(self, request: Request) -> Response:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        headers = {
+            "ETag": self.etag(encoding),
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self.matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
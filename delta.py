@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from cache import CacheEntry, unpack
+from projection import compile_fields, field_key
+from services import FORECAST_CACHE_TTL
+from units import Units, convert_forecast
+from views import render, view_data
+
+# Forecasts (cache keys) whose current and previous version are kept as delta bases
+FORECAST_VERSION_HISTORY = int(os.environ.get("FORECAST_VERSION_HISTORY", "2000"))
+
+
+def forecast_version(entry: CacheEntry) -> str:
+    """
+    Content hash of the upstream forecast, used as its ETag and delta base id.
+    Only the hash is memoized, not the encoding it was computed from.
+    """
+    return entry.derive(
+        "version", lambda data: hashlib.sha256(json.dumps(data, separators=(",", ":")).encode("utf-8")).hexdigest()[:20]
+    )
+
+
+def _flatten(value: Any, prefix: str = "", out: Optional[dict] = None) -> Dict[str, Any]:
+    # Lists (e.g. "weather") are compared as a whole
+    out = {} if out is None else out
+    if isinstance(value, dict):
+        for key, child in value.items():
+            _flatten(child, f"{prefix}{key}.", out)
+    else:
+        out[prefix[:-1]] = value
+    return out
+
+
+def forecast_delta(old: dict, new: dict) -> dict:
+    """
+    Describe how to turn forecast ``old`` into ``new``.
+
+    Slots are matched by ``dt``: slots that fell off are listed in
+    ``dropped``, new slots are sent whole in ``added``, and common slots only
+    carry the leaf fields that changed (``set``) or disappeared (``unset``).
+    """
+    old_items = {item["dt"]: item for item in old["list"]}
+    new_items = {item["dt"]: item for item in new["list"]}
+
+    changed = []
+    for dt, item in new_items.items():
+        previous = old_items.get(dt)
+        if previous is None or previous == item:
+            continue
+        before, after = _flatten(previous), _flatten(item)
+        change: Dict[str, Any] = {"dt": dt}
+        updated = {path: value for path, value in after.items() if before.get(path, object()) != value}
+        removed = [path for path in before if path not in after]
+        if updated:
+            change["set"] = updated
+        if removed:
+            change["unset"] = removed
+        changed.append(change)
+
+    delta: Dict[str, Any] = {
+        "dropped": [dt for dt in old_items if dt not in new_items],
+        "added": [item for dt, item in new_items.items() if dt not in old_items],
+        "changed": changed,
+    }
+    for key in ("cod", "message", "cnt", "city"):
+        if old.get(key) != new.get(key):
+            delta[key] = new.get(key)
+    return delta
+
+
+class _Versions(NamedTuple):
+    version: str
+    stored: Any
+    previous_version: Optional[str]
+    previous_stored: Any
+    # When the previous version was replaced, and when the key was last served (monotonic)
+    replaced_at: float
+    served_at: float
+
+
+class ForecastHistory:
+    """
+    The served and the previous forecast version of each key, so a client's
+    version can be used as a delta base after the cache entry holding it has
+    been replaced.
+
+    The served version shares its stored payload with the cache entry.
+    Previous versions are only usable for ``ttl`` seconds after they were
+    replaced, and keys not served for ``ttl`` seconds are dropped, so the
+    history holds about one extra payload per forecast served within one
+    cache lifetime, and never more than ``max_keys``.
+    """
+
+    def __init__(self, max_keys: int = FORECAST_VERSION_HISTORY, ttl: float = FORECAST_CACHE_TTL):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self._keys: "OrderedDict[Hashable, _Versions]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def remember(self, entry: CacheEntry) -> str:
+        version = forecast_version(entry)
+        now = time.monotonic()
+        known = self._keys.get(entry.key)
+        if known is None:
+            self._keys[entry.key] = _Versions(version, entry.stored, None, None, now, now)
+        elif known.version != version:
+            self._keys[entry.key] = _Versions(version, entry.stored, known.version, known.stored, now, now)
+        else:
+            self._keys[entry.key] = known._replace(served_at=now)
+        self._keys.move_to_end(entry.key)
+        while self._keys and (
+            len(self._keys) > self.max_keys or now - next(iter(self._keys.values())).served_at > self.ttl
+        ):
+            self._keys.popitem(last=False)
+        return version
+
+    def get(self, key: Hashable, version: str) -> Optional[dict]:
+        known = self._keys.get(key)
+        if known is None:
+            return None
+        if known.version == version:
+            return unpack(known.stored)
+        if known.previous_version == version and time.monotonic() - known.replaced_at <= self.ttl:
+            return unpack(known.previous_stored)
+        return None
+
+
+forecast_history = ForecastHistory()
+
+
+def delta_document(base: str, version: str, old: dict, new: dict) -> bytes:
+    document = {"base": base, "version": version, **forecast_delta(old, new)}
+    return json.dumps(document, separators=(",", ":")).encode("utf-8")
+
+
+def _strip_etag(value: str) -> str:
+    value = value.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    return value.strip('"')
+
+
+def representation_etag(version: str, units: Optional[Units] = None, fields: Optional[str] = None) -> str:
+    """
+    ``ETag`` of one representation of a forecast version: the units and the
+    normalized field list are mixed in, so a cache never serves a metric or
+    projected body for another one.
+    """
+    tag = version
+    if units is not None:
+        tag += f"-{units.value}"
+    if fields:
+        tag += "-" + hashlib.sha256(field_key(fields).encode("utf-8")).hexdigest()[:8]
+    return f'"{tag}"'
+
+
+def versioned_forecast(
+    request: Request,
+    response: Response,
+    entry: CacheEntry,
+    view: str = "forecast",
+    units: Optional[Units] = None,
+    fields: Optional[str] = None,
+    since: Optional[str] = None,
+) -> Any:
+    """
+    Serve a forecast with an ``ETag`` made of its version and representation.
+
+    A matching ``If-None-Match`` gets ``304``. ``since=<version>`` (or a
+    previous ``ETag``) asks for a delta against an older version; when that version is unknown the full
+    forecast is returned instead, so clients can always resynchronise. With
+    ``fields`` the delta compares the projected documents, always keeping
+    ``list.dt`` to match slots by.
+    """
+    version = forecast_history.remember(entry)
+    etag = representation_etag(version, units, fields)
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag.strip('"') in (_strip_etag(tag) for tag in if_none_match.split(",") if tag.strip()):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # The version is the part of an ETag before the representation suffix
+    since = _strip_etag(since).split("-", 1)[0] if since else None
+    if since and view == "forecast":
+        if since == version:
+            return Response(status_code=304, headers={"ETag": etag})
+        old = forecast_history.get(entry.key, since)
+        if old is not None:
+            units = units or Units.standard
+            old, new = convert_forecast(old, units), view_data(entry, "forecast", units)
+            if fields:
+                project = compile_fields(f"{fields},list.dt")
+                old, new = project(old), project(new)
+            body = delta_document(since, version, old, new)
+            return Response(body, media_type="application/json", headers={"ETag": etag, "Delta-Base": f'"{since}"'})
+
+    result = render(entry, view, units, fields)
+    if isinstance(result, Response):
+        result.headers["ETag"] = etag
+        return result
+    response.headers["ETag"] = etag
+    return result
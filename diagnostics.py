@@ -0,0 +1,222 @@
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Deque, List, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Report event-loop stalls longer than this many milliseconds (0 disables the watchdog)
+STALL_THRESHOLD_MS = float(os.environ.get("STALL_THRESHOLD_MS", "0"))
+STALL_HISTORY = int(os.environ.get("STALL_HISTORY", "50"))
+# Required in X-Admin-Token by the /api/admin endpoints; empty disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+PROFILER_INTERVAL_MS = 10.0
+PROFILER_MAX_SECONDS = 300.0
+# Distinct stacks kept by the profiler; further ones are counted under OTHER_STACK
+PROFILER_MAX_STACKS = 20000
+OTHER_STACK = "[other]"
+
+
+def check_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+
+def collapse(frame) -> str:
+    """A thread's stack as ``root;...;leaf`` (the collapsed-stack flamegraph format)."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StallWatchdog:
+    """
+    Detects event-loop stalls from a separate thread.
+
+    The loop bumps a heartbeat every quarter threshold; when the watchdog
+    thread sees the heartbeat older than the threshold, the loop is blocked
+    and the loop thread's current stack (the code that is blocking it) is
+    captured. The stall's full duration is filled in once the loop beats again.
+    """
+
+    def __init__(self, threshold_ms: float = STALL_THRESHOLD_MS, history: int = STALL_HISTORY):
+        self.threshold = threshold_ms / 1000
+        self.interval = max(self.threshold / 4, 0.005)
+        self.stalls: Deque[dict] = deque(maxlen=history)
+        self.count = 0
+        self._beat = 0.0
+        self._open: Optional[dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._handle.cancel()
+        self._thread.join()
+        self._thread = None
+
+    def _heartbeat(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._open is not None:
+                self._open["duration_ms"] = round((now - self._open["beat"]) * 1000, 1)
+                del self._open["beat"]
+                self._open = None
+            self._beat = now
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                beat = self._beat
+                if self._open is not None or time.monotonic() - beat < self.threshold:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+                task = asyncio.current_task(self._loop)
+                self._open = {
+                    "at": round(time.time(), 3),
+                    "beat": beat,
+                    "duration_ms": None,
+                    "task": task.get_name() if task is not None else None,
+                    "coroutine": getattr(task.get_coro(), "__qualname__", None) if task is not None else None,
+                    "stack": traceback.format_stack(frame) if frame is not None else [],
+                }
+                self.stalls.append(self._open)
+                self.count += 1
+                stall = self._open
+            # Logged from this thread so reporting a stall never blocks the loop itself
+            logger.warning(
+                "event loop blocked for over %.0f ms in task %s:\n%s",
+                self.threshold * 1000, stall["task"], "".join(stall["stack"][-8:]),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent = [{k: v for k, v in stall.items() if k != "beat"} for stall in reversed(self.stalls)]
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.count,
+            "recent": recent,
+        }
+
+
+class SamplingProfiler:
+    """
+    Samples the event-loop thread's stack every ``interval`` from a background
+    thread and counts collapsed stacks. Time the loop spends idle shows up
+    under the selector's ``select``.
+    """
+
+    def __init__(self):
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.interval = PROFILER_INTERVAL_MS / 1000
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._target = 0
+        self._deadline = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = PROFILER_INTERVAL_MS, seconds: float = 30.0) -> dict:
+        """Start sampling the calling (event-loop) thread; clears the previous profile."""
+        if self.running:
+            raise HTTPException(status_code=409, detail="Profiler is already running")
+        if not 1 <= interval_ms <= 1000:
+            raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+        if not 0 < seconds <= PROFILER_MAX_SECONDS:
+            raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILER_MAX_SECONDS:.0f}")
+        self.stacks = Counter()
+        self.samples = 0
+        self.interval = interval_ms / 1000
+        self.started_at, self.stopped_at = time.time(), None
+        self._target = threading.get_ident()
+        self._deadline = time.monotonic() + seconds
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self.stats()
+
+    def stop(self) -> dict:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.stats()
+
+    def _run(self) -> None:
+        stacks = self.stacks
+        while not self._stop.wait(self.interval) and time.monotonic() < self._deadline:
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                break
+            stack = collapse(frame)
+            del frame
+            if stack in stacks or len(stacks) < PROFILER_MAX_STACKS:
+                stacks[stack] += 1
+            else:
+                stacks[OTHER_STACK] += 1
+            self.samples += 1
+        self.stopped_at = time.time()
+
+    def collapsed(self) -> str:
+        """One ``stack count`` line per distinct stack, for flamegraph.pl or speedscope."""
+        lines: List[str] = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+
+watchdog = StallWatchdog()
+profiler = SamplingProfiler()
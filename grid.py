@@ -0,0 +1,155 @@
+import asyncio
+import json
+import math
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from cache import CacheEntry
+from units import SPEED, TEMPERATURE, Units
+
+# Allowed cell sizes in degrees; each divides 180 so the global grid is the same for every viewport
+GRID_RESOLUTIONS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+MAX_GRID_CELLS = int(os.environ.get("MAX_GRID_CELLS", "400"))
+GRID_CONCURRENCY = int(os.environ.get("GRID_CONCURRENCY", "16"))
+
+# Values kept per cell, in payload order
+GRID_FIELDS = ("temp", "feels_like", "humidity", "pressure", "wind_speed", "wind_deg", "clouds", "condition", "dt")
+CONVERTED_FIELDS = {"temp": TEMPERATURE, "feels_like": TEMPERATURE, "wind_speed": SPEED}
+
+BBox = Tuple[float, float, float, float]
+
+
+def parse_bbox(bbox: str) -> BBox:
+    """``west,south,east,north`` in degrees, as produced by Leaflet's ``toBBoxString()``."""
+    try:
+        west, south, east, north = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise HTTPException(status_code=400, detail="bbox must satisfy -180 <= west < east <= 180 and -90 <= south < north <= 90")
+    return west, south, east, north
+
+
+def validate_resolution(resolution: float) -> float:
+    if resolution not in GRID_RESOLUTIONS:
+        allowed = ", ".join(str(r) for r in GRID_RESOLUTIONS)
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {allowed}")
+    return resolution
+
+
+def _centres(low: float, high: float, origin: float, limit: float, resolution: float) -> List[float]:
+    # Cells are indexed from the global origin so overlapping viewports pick identical centres
+    first = max(math.floor((low - origin) / resolution), 0)
+    last = min(math.ceil((high - origin) / resolution), round((limit - origin) / resolution))
+    return [round(origin + (i + 0.5) * resolution, 4) for i in range(first, last)]
+
+
+class GridSpec:
+    """The cells of the global ``resolution``-degree grid that intersect a bounding box."""
+
+    def __init__(self, bbox: BBox, resolution: float):
+        self.bbox = bbox
+        self.resolution = resolution
+        west, south, east, north = bbox
+        self.lats = _centres(south, north, -90.0, 90.0, resolution)
+        self.lons = _centres(west, east, -180.0, 180.0, resolution)
+        if len(self.lats) * len(self.lons) > MAX_GRID_CELLS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"bbox covers {len(self.lats) * len(self.lons)} cells at this resolution; at most {MAX_GRID_CELLS} allowed",
+            )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.lats), len(self.lons)
+
+    def cells(self) -> List[Tuple[float, float]]:
+        """Cell centres in row-major order, south to north then west to east."""
+        return [(lat, lon) for lat in self.lats for lon in self.lons]
+
+
+def weather_cell(data: dict) -> Tuple[Optional[float], ...]:
+    """The grid values of one current-weather payload, in ``GRID_FIELDS`` order."""
+    main = data.get("main") or {}
+    wind = data.get("wind") or {}
+    weather = data.get("weather") or [{}]
+    return (
+        main.get("temp"),
+        main.get("feels_like"),
+        main.get("humidity"),
+        main.get("pressure"),
+        wind.get("speed"),
+        wind.get("deg"),
+        (data.get("clouds") or {}).get("all"),
+        weather[0].get("id"),
+        data.get("dt"),
+    )
+
+
+async def sample_grid(
+    spec: GridSpec,
+    peek: Callable[[float, float], Optional[CacheEntry]],
+    fetch: Callable[[float, float], Awaitable[CacheEntry]],
+    concurrency: int = GRID_CONCURRENCY,
+) -> Tuple[List[Optional[CacheEntry]], int]:
+    """
+    Entries for every cell of ``spec`` (None where the upstream failed), and
+    how many were already cached. Cached cells are read without waiting;
+    only missing cells are fetched, at most ``concurrency`` at a time.
+    """
+    cells = spec.cells()
+    entries: List[Optional[CacheEntry]] = [peek(lat, lon) for lat, lon in cells]
+    cached = sum(entry is not None for entry in entries)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        async with semaphore:
+            try:
+                entries[index] = await fetch(*cells[index])
+            except HTTPException:
+                pass
+
+    await asyncio.gather(*(one(i) for i, entry in enumerate(entries) if entry is None))
+    return entries, cached
+
+
+def grid_values(entries: List[Optional[CacheEntry]]) -> np.ndarray:
+    """A ``cells x GRID_FIELDS`` float matrix with NaN for missing cells and values."""
+    rows = [
+        entry.derive("cell", weather_cell) if entry is not None else (None,) * len(GRID_FIELDS)
+        for entry in entries
+    ]
+    return np.array(rows, dtype=np.float64).reshape(len(rows), len(GRID_FIELDS))
+
+
+def grid_payload(spec: GridSpec, entries: List[Optional[CacheEntry]], cached: int, units: Units = Units.standard) -> bytes:
+    """
+    Column-oriented JSON: one flat row-major list per field, ``shape`` giving
+    ``[rows, cols]`` with rows from south to north.
+    """
+    values = grid_values(entries)
+    columns = {}
+    for index, name in enumerate(GRID_FIELDS):
+        column = values[:, index]
+        if name in CONVERTED_FIELDS:
+            scale, offset = CONVERTED_FIELDS[name][units]
+            column = np.round(column * scale + offset, 2)
+        columns[name] = [None if v != v else (int(v) if v.is_integer() else v) for v in column.tolist()]
+    failed = sum(entry is None for entry in entries)
+    document = {
+        "bbox": list(spec.bbox),
+        "resolution": spec.resolution,
+        "units": units.value,
+        "shape": list(spec.shape),
+        "lat": spec.lats,
+        "lon": spec.lons,
+        "cells": len(entries),
+        "cached": cached,
+        "fetched": len(entries) - cached - failed,
+        "failed": failed,
+        "fields": columns,
+    }
+    return json.dumps(document, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,427 @@
+import json
+import os
+import queue
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from rollups import Aggregate, Interval, INTERVAL_SECONDS, bucket_start, combine, hourly_rollup, percentile, rollup_dtype
+from units import SPEED, TEMPERATURE, Units
+
+# Empty disables recording
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "data/history")
+HISTORY_SEGMENT_ROWS = int(os.environ.get("HISTORY_SEGMENT_ROWS", "65536"))
+HISTORY_QUEUE_SIZE = int(os.environ.get("HISTORY_QUEUE_SIZE", "10000"))
+
+# Fixed-width columns, one file per column per segment; NaN / 0 mark missing values
+COLUMNS: Dict[str, np.dtype] = {
+    "location": np.dtype(np.uint32),
+    "dt": np.dtype(np.int64),
+    "temp": np.dtype(np.float32),
+    "humidity": np.dtype(np.float32),
+    "pressure": np.dtype(np.float32),
+    "wind_speed": np.dtype(np.float32),
+    "wind_deg": np.dtype(np.float32),
+    "condition": np.dtype(np.uint16),
+}
+VALUE_COLUMNS = tuple(name for name in COLUMNS if name != "location")
+CONVERTED_FIELDS = {"temp": TEMPERATURE, "wind_speed": SPEED}
+# Columns with meaningful min/max/mean/p95 (not direction or condition codes)
+ROLLUP_COLUMNS = ("temp", "humidity", "pressure", "wind_speed")
+
+Observation = Tuple[int, Optional[float], Optional[float], Optional[float], Optional[float], Optional[float], int]
+
+
+def location_name(key: Hashable) -> str:
+    """Stable text form of a cache key: ``coord:51.5:-0.1`` or ``city:london,gb``."""
+    return ":".join(str(part) for part in key)
+
+
+def observation(data: dict) -> Optional[Observation]:
+    """The stored fields of a current-weather payload, in ``VALUE_COLUMNS`` order."""
+    if data.get("dt") is None:
+        return None
+    main = data.get("main") or {}
+    wind = data.get("wind") or {}
+    weather = data.get("weather") or [{}]
+    return (
+        data["dt"],
+        main.get("temp"),
+        main.get("humidity"),
+        main.get("pressure"),
+        wind.get("speed"),
+        wind.get("deg"),
+        weather[0].get("id") or 0,
+    )
+
+
+class Segment:
+    """
+    One directory of column files holding up to ``capacity`` rows.
+
+    The active segment is written through read-write memory maps. A full
+    segment is sealed: its rows get a location-sorted offset index
+    (``order`` plus per-location ``starts``/``ends``) so a location's rows
+    are found without scanning.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        else:
+            os.makedirs(path, exist_ok=True)
+            meta = {"rows": 0, "sealed": False, "capacity": capacity, "dt_min": None, "dt_max": None}
+            for name, dtype in COLUMNS.items():
+                with open(self._column_path(name), "wb") as f:
+                    f.truncate(capacity * dtype.itemsize)
+        self.capacity = meta["capacity"]
+        self.rows = meta["rows"]
+        self.sealed = meta["sealed"]
+        self.dt_min = meta["dt_min"]
+        self.dt_max = meta["dt_max"]
+        self._columns: Dict[str, np.memmap] = {}
+        self._index: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        self._rollup: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        # Rows per location of the active segment, kept in memory until sealing
+        self._active_rows: Dict[int, List[int]] = {}
+        if not self.sealed and self.rows:
+            locations = self.column("location")[: self.rows]
+            for row, location in enumerate(locations.tolist()):
+                self._active_rows.setdefault(location, []).append(row)
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.col")
+
+    def column(self, name: str) -> np.memmap:
+        mapped = self._columns.get(name)
+        if mapped is None:
+            mode = "r" if self.sealed else "r+"
+            mapped = self._columns[name] = np.memmap(
+                self._column_path(name), dtype=COLUMNS[name], mode=mode, shape=(self.capacity,)
+            )
+        return mapped
+
+    @property
+    def full(self) -> bool:
+        return self.rows >= self.capacity
+
+    def append(self, rows: List[Tuple[int, Observation]]) -> int:
+        """Write as many rows as fit; returns how many were written."""
+        count = min(len(rows), self.capacity - self.rows)
+        if count <= 0:
+            return 0
+        start = self.rows
+        batch = rows[:count]
+        self.column("location")[start : start + count] = [location for location, _ in batch]
+        values = list(zip(*(values for _, values in batch)))
+        for name, column in zip(VALUE_COLUMNS, values):
+            fill = 0 if COLUMNS[name].kind == "u" else np.nan
+            self.column(name)[start : start + count] = [fill if v is None else v for v in column]
+        dts = values[0]
+        self.dt_min = min(dts) if self.dt_min is None else min(self.dt_min, *dts)
+        self.dt_max = max(dts) if self.dt_max is None else max(self.dt_max, *dts)
+        for offset, (location, _) in enumerate(batch):
+            self._active_rows.setdefault(location, []).append(start + offset)
+        self.rows = start + count
+        self.flush()
+        return count
+
+    def flush(self) -> None:
+        if not self.sealed:
+            for mapped in self._columns.values():
+                mapped.flush()
+        with open(os.path.join(self.path, "meta.json.tmp"), "w") as f:
+            json.dump(
+                {"rows": self.rows, "sealed": self.sealed, "capacity": self.capacity,
+                 "dt_min": self.dt_min, "dt_max": self.dt_max},
+                f,
+            )
+        os.replace(os.path.join(self.path, "meta.json.tmp"), os.path.join(self.path, "meta.json"))
+
+    def seal(self) -> None:
+        locations = np.asarray(self.column("location")[: self.rows])
+        order = np.argsort(locations, kind="stable").astype(np.uint32)
+        ordered = locations[order]
+        ids = np.unique(ordered)
+        np.save(os.path.join(self.path, "order.npy"), order)
+        np.save(os.path.join(self.path, "ids.npy"), ids)
+        np.save(os.path.join(self.path, "starts.npy"), np.searchsorted(ordered, ids, "left").astype(np.uint32))
+        np.save(os.path.join(self.path, "ends.npy"), np.searchsorted(ordered, ids, "right").astype(np.uint32))
+        for mapped in self._columns.values():
+            mapped.flush()
+        self.write_rollup()
+        self.sealed = True
+        self.flush()
+        self._columns.clear()
+        self._active_rows.clear()
+
+    def _rollup_path(self, name: str) -> str:
+        return os.path.join(self.path, f"rollup-hour.{name}.npy")
+
+    def write_rollup(self) -> None:
+        """Materialize the hourly rollup of this segment, with a per-location offset index."""
+        rows = self.rows
+        values = {name: np.asarray(self.column(name)[:rows]) for name in ROLLUP_COLUMNS}
+        rollup = hourly_rollup(np.asarray(self.column("location")[:rows]), np.asarray(self.column("dt")[:rows]), values, ROLLUP_COLUMNS)
+        ids, starts = np.unique(rollup["location"], return_index=True)
+        ends = np.r_[starts[1:], len(rollup)]
+        np.save(self._rollup_path("records"), rollup)
+        np.save(self._rollup_path("index"), np.stack([ids.astype(np.int64), starts, ends], axis=1))
+
+    def hourly(self, location: int, start: int, end: int) -> np.ndarray:
+        """Hourly partials of one location whose hour lies in ``[start, end]``."""
+        if not self.sealed:
+            rows = self.rows_for(location)
+            dt = self.column("dt")[rows]
+            rows = rows[(dt >= start) & (dt <= end)]
+            values = {name: self.column(name)[rows] for name in ROLLUP_COLUMNS}
+            return hourly_rollup(np.full(len(rows), location, dtype=np.uint32), self.column("dt")[rows], values, ROLLUP_COLUMNS)
+        if self._rollup is None:
+            # Segments sealed before rollups existed get theirs on first use
+            if not os.path.exists(self._rollup_path("index")):
+                self.write_rollup()
+            self._rollup = (np.load(self._rollup_path("records"), mmap_mode="r"), np.load(self._rollup_path("index")))
+        records, index = self._rollup
+        i = int(np.searchsorted(index[:, 0], location)) if len(index) else 0
+        if i == len(index) or index[i, 0] != location:
+            return np.zeros(0, dtype=rollup_dtype(ROLLUP_COLUMNS))
+        found = np.array(records[index[i, 1] : index[i, 2]])
+        return found[(found["bucket"] >= start) & (found["bucket"] <= end)]
+
+    def rows_for(self, location: int) -> np.ndarray:
+        """Row numbers of one location, in append order."""
+        if not self.sealed:
+            return np.array(self._active_rows.get(location, ()), dtype=np.int64)
+        if self._index is None:
+            self._index = tuple(
+                np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+                for name in ("order", "ids", "starts", "ends")
+            )
+        order, ids, starts, ends = self._index
+        i = int(np.searchsorted(ids, location))
+        if i == len(ids) or ids[i] != location:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(order[starts[i] : ends[i]], dtype=np.int64)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.rows > 0 and self.dt_min <= end and self.dt_max >= start
+
+
+class HistoryStore:
+    """
+    Append-only observation history on disk.
+
+    ``record()`` only enqueues, so the request path never waits on disk; a
+    writer thread appends batches to the active segment. Queries memory-map
+    the column files and read only the rows of the requested location.
+    """
+
+    def __init__(self, directory: str = HISTORY_DIR, segment_rows: int = HISTORY_SEGMENT_ROWS, queue_size: int = HISTORY_QUEUE_SIZE):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.dropped = 0
+        self.recorded = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._loaded = False
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._segments: List[Segment] = []
+        self._last_dt: Dict[int, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        locations_path = os.path.join(self.directory, "locations.jsonl")
+        if os.path.exists(locations_path):
+            with open(locations_path) as f:
+                self._names = [json.loads(line) for line in f if line.strip()]
+        self._ids = {name: i for i, name in enumerate(self._names)}
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith("segment-"))
+        self._segments = [Segment(os.path.join(self.directory, n), self.segment_rows) for n in names]
+        self._loaded = True
+
+    def _location_id(self, name: str) -> int:
+        location = self._ids.get(name)
+        if location is None:
+            location = self._ids[name] = len(self._names)
+            self._names.append(name)
+            with open(os.path.join(self.directory, "locations.jsonl"), "a") as f:
+                f.write(json.dumps(name) + "\n")
+        return location
+
+    def _active(self) -> Segment:
+        if not self._segments or self._segments[-1].sealed:
+            path = os.path.join(self.directory, f"segment-{len(self._segments):06d}")
+            self._segments.append(Segment(path, self.segment_rows))
+        return self._segments[-1]
+
+    def record(self, key: Hashable, data: dict) -> None:
+        """Queue one observation for writing; drops it if the writer has fallen behind."""
+        if not self.enabled:
+            return
+        values = observation(data)
+        if values is None:
+            return
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._writer.start()
+        try:
+            self._queue.put_nowait((location_name(key), values))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        with self._lock:
+            self._load()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Drain whatever else is waiting so it is written in one go
+            while len(batch) < 1024:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self._write([item for item in batch if item is not None])
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple[str, Observation]]) -> None:
+        with self._lock:
+            rows = []
+            for name, values in batch:
+                location = self._location_id(name)
+                # Refetching an unchanged observation must not add a duplicate row
+                if self._last_dt.get(location) == values[0]:
+                    continue
+                self._last_dt[location] = values[0]
+                rows.append((location, values))
+            self.recorded += len(rows)
+            while rows:
+                segment = self._active()
+                written = segment.append(rows)
+                rows = rows[written:]
+                if segment.full:
+                    segment.seal()
+
+    def _raw(self, location: int, start: int, end: int, names: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+        # Caller holds the lock; a negative location is one never recorded
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in names}
+        for segment in self._segments:
+            if location < 0 or not segment.overlaps(start, end):
+                continue
+            rows = segment.rows_for(location)
+            if not len(rows):
+                continue
+            dt = segment.column("dt")[rows]
+            selected = rows[(dt >= start) & (dt <= end)]
+            for name in names:
+                parts[name].append(np.array(segment.column(name)[selected]))
+        columns = {
+            name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=COLUMNS[name])
+            for name, chunks in parts.items()
+        }
+        order = np.argsort(columns["dt"], kind="stable")
+        return {name: values[order] for name, values in columns.items()}
+
+    def query(self, key: Hashable, start: int, end: int) -> Dict[str, np.ndarray]:
+        """All stored columns of one location with ``start <= dt <= end``, sorted by ``dt``."""
+        with self._lock:
+            self._load()
+            location = self._ids.get(location_name(key))
+            return self._raw(-1 if location is None else location, start, end, VALUE_COLUMNS)
+
+    def rollup(self, key: Hashable, start: int, end: int, interval: Interval, aggregate: Aggregate) -> Dict[str, np.ndarray]:
+        """
+        ``aggregate`` of each rollup column per ``interval`` bucket. The range
+        is widened to whole buckets. min/max/mean merge the hourly rollups of
+        sealed segments (plus the active segment's rows); p95 reads raw rows.
+        """
+        start = int(bucket_start(np.int64(start), interval))
+        end = int(bucket_start(np.int64(end), interval)) + INTERVAL_SECONDS[interval] - 1
+        with self._lock:
+            self._load()
+            location = self._ids.get(location_name(key), -1)
+            if aggregate == Aggregate.p95:
+                raw = self._raw(location, start, end, ("dt",) + ROLLUP_COLUMNS)
+                return percentile(raw["dt"], raw, interval, ROLLUP_COLUMNS)
+            parts = [
+                segment.hourly(location, start, end)
+                for segment in self._segments
+                if location >= 0 and segment.overlaps(start, end)
+            ]
+        partials = np.concatenate(parts) if parts else np.zeros(0, dtype=rollup_dtype(ROLLUP_COLUMNS))
+        return combine(partials, interval, aggregate, ROLLUP_COLUMNS)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "locations": len(self._names),
+            "segments": len(self._segments),
+            "rows": sum(segment.rows for segment in self._segments),
+            "recorded": self.recorded,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until everything queued so far has been written (used on shutdown)."""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join(timeout)
+        self._writer = None
+
+
+def history_document(
+    name: str,
+    start: int,
+    end: int,
+    columns: Dict[str, np.ndarray],
+    units: Units = Units.standard,
+    interval: Optional[Interval] = None,
+    aggregate: Optional[Aggregate] = None,
+) -> dict:
+    """
+    Column-oriented result of a history query: raw observations, or one
+    row per bucket with a ``samples`` count when aggregated. Temperatures
+    and speeds are converted to ``units``.
+    """
+    names = ROLLUP_COLUMNS if interval else VALUE_COLUMNS[1:]
+    fields = {"dt": columns["dt"].tolist()}
+    for field in names:
+        values = columns[field].astype(np.float64)
+        if field in CONVERTED_FIELDS:
+            scale, offset = CONVERTED_FIELDS[field][units]
+            values = values * scale + offset
+        if COLUMNS[field].kind == "u":
+            fields[field] = [int(v) or None for v in values.tolist()]
+        else:
+            fields[field] = [None if v != v else v for v in np.round(values, 2).tolist()]
+    document = {"location": name, "from": start, "to": end, "units": units.value}
+    if interval:
+        document.update({"interval": interval.value, "agg": aggregate.value})
+        fields["samples"] = columns["temp_count"].tolist()
+    document.update({"count": len(fields["dt"]), "fields": fields})
+    return document
+
+
+def history_payload(name: str, start: int, end: int, columns: Dict[str, np.ndarray], units: Units = Units.standard, interval: Optional[Interval] = None, aggregate: Optional[Aggregate] = None) -> bytes:
+    return json.dumps(history_document(name, start, end, columns, units, interval, aggregate), separators=(",", ":")).encode("utf-8")
+
+
+history = HistoryStore()
@@ -0,0 +1,153 @@
+import time
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Dict, List, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from analytics import ColumnSet
+
+SECONDS_PER_HOUR = 3600
+
+# Interpolated columns: (column in ``forecast_columns``, parent key, key) of the output item
+FIELDS = (
+    ("temp", "main", "temp"),
+    ("feels_like", "main", "feels_like"),
+    ("pressure", "main", "pressure"),
+    ("humidity", "main", "humidity"),
+    ("wind_speed", "wind", "speed"),
+    ("wind_deg", "wind", "deg"),
+    ("wind_gust", "wind", "gust"),
+)
+
+
+class Interpolation(str, Enum):
+    linear = "linear"
+    cubic = "cubic"
+
+
+def _pchip_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Fritsch-Carlson slopes: the cubic stays monotone between samples and never overshoots them."""
+    h = np.diff(x)
+    d = np.diff(y) / h
+    m = np.empty_like(y)
+    m[0], m[-1] = d[0], d[-1]
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        harmonic = (w1 + w2) / (w1 / d[:-1] + w2 / d[1:])
+    m[1:-1] = np.where(d[:-1] * d[1:] > 0, harmonic, 0.0)
+    return m
+
+
+class Interpolator:
+    """
+    Evaluates a 3-hourly forecast at arbitrary times.
+
+    Built once per cache entry: the monotone cubic slopes are precomputed, so
+    evaluating any number of times is a binary search on ``dt`` plus a few
+    array operations. Wind direction is unwrapped so it turns the short way
+    round.
+    """
+
+    def __init__(self, columns: ColumnSet, method: Interpolation = Interpolation.linear):
+        self.method = Interpolation(method)
+        self.dt = columns["dt"]
+        self.x = self.dt.astype(np.float64)
+        self.values = {name: columns[name].astype(np.float64) for name, _, _ in FIELDS}
+        deg = self.values["wind_deg"]
+        present = ~np.isnan(deg)
+        if present.any():
+            deg[present] = np.unwrap(deg[present], period=360)
+        self.slopes = (
+            {name: _pchip_slopes(self.x, y) for name, y in self.values.items()}
+            if self.method == Interpolation.cubic and len(self.x) > 2
+            else None
+        )
+
+    @property
+    def start(self) -> int:
+        return int(self.dt[0])
+
+    @property
+    def end(self) -> int:
+        return int(self.dt[-1])
+
+    def covers(self, t: int) -> bool:
+        return len(self.dt) > 0 and self.start <= t <= self.end
+
+    def bracket(self, t: int) -> Tuple[int, int]:
+        """The forecast slots surrounding ``t``."""
+        i = int(np.searchsorted(self.dt, t, side="left"))
+        if i < len(self.dt) and self.dt[i] == t:
+            return int(t), int(t)
+        return int(self.dt[i - 1]), int(self.dt[i])
+
+    def evaluate(self, targets: np.ndarray) -> Dict[str, np.ndarray]:
+        """Interpolated columns at ``targets`` (unix seconds, within the forecast range)."""
+        t = np.asarray(targets, dtype=np.float64)
+        if len(self.x) == 1:
+            return {name: np.full(t.shape, y[0]) for name, y in self.values.items()}
+        # Bracketing slots: x[i] <= t <= x[i + 1]
+        i = np.clip(np.searchsorted(self.x, t, side="right") - 1, 0, len(self.x) - 2)
+        h = self.x[i + 1] - self.x[i]
+        s = (t - self.x[i]) / h
+        result = {}
+        for name, y in self.values.items():
+            y0, y1 = y[i], y[i + 1]
+            if self.slopes is None:
+                result[name] = y0 + s * (y1 - y0)
+                continue
+            m0, m1 = self.slopes[name][i] * h, self.slopes[name][i + 1] * h
+            s2, s3 = s * s, s * s * s
+            result[name] = (
+                (2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * m0 + (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * m1
+            )
+        result["wind_deg"] = np.mod(result["wind_deg"], 360)
+        return result
+
+    def items(self, targets: np.ndarray) -> List[dict]:
+        """Forecast-shaped items (``dt``, ``dt_txt``, ``main``, ``wind``) for each target time."""
+        columns = self.evaluate(targets)
+        rounded = [[None if v != v else v for v in np.round(columns[name], 2).tolist()] for name, _, _ in FIELDS]
+        items = []
+        for dt, values in zip(np.asarray(targets, dtype=np.int64).tolist(), zip(*rounded)):
+            item: Dict[str, dict] = {"main": {}, "wind": {}}
+            for (_, parent, key), value in zip(FIELDS, values):
+                if value is not None:
+                    item[parent][key] = value
+            items.append({"dt": dt, "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(dt)), **item})
+        return items
+
+
+def hourly_forecast(forecast: dict, interpolator: Interpolator) -> dict:
+    """The forecast resampled to every full hour between its first and last slot."""
+    if len(interpolator.dt):
+        first = -(-interpolator.start // SECONDS_PER_HOUR) * SECONDS_PER_HOUR
+        targets = np.arange(first, interpolator.end + 1, SECONDS_PER_HOUR, dtype=np.int64)
+    else:
+        targets = np.zeros(0, dtype=np.int64)
+    items = interpolator.items(targets)
+    return {
+        "cod": forecast.get("cod"),
+        "method": interpolator.method.value,
+        "cnt": len(items),
+        "list": items,
+        "city": forecast.get("city") or {},
+    }
+
+
+def parse_time(value: str, name: str = "t") -> int:
+    """A unix timestamp or an ISO 8601 date-time (UTC unless an offset is given); ``name`` is the query parameter."""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a unix timestamp or an ISO 8601 date-time")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
@@ -1,27 +1,117 @@
 #!/usr/bin/env python3
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Request, Response, Query, WebSocket
+from fastapi.responses import HTMLResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from datetime import datetime
+import asyncio
+import json
+import time
 
 # Assuming these are your own modules (make sure they exist and are correct)
 from models import (
     LocationResponse,
     WeatherResponse,
     ForecastResponse,
+    DailyForecastResponse,
+    HourlyForecastResponse,
+    ForecastPointResponse,
+    BatchRequest,
+    BatchLocation,
+    AnalyticsRequest,
+    HistoryQuery,
     ErrorResponse
 )
 
 from services import (
     get_location_data,
-    get_weather_data,
-    get_forecast_data,
-    get_weather_by_city_data,
-    get_forecast_by_city_data
+    get_weather_entry,
+    get_forecast_entry,
+    get_weather_entry_nearby,
+    get_forecast_entry_nearby,
+    get_here_entries,
+    weather_index,
+    forecast_index,
+    get_history_columns,
+    history_key,
+    get_weather_by_city_entry,
+    get_forecast_by_city_entry,
+    peek_weather_entry,
+    peek_forecast_entry,
+    weather_cache,
+    forecast_cache,
+    upstream_pool,
+    router,
+    close_client
 )
 
-from templates import HTML_TEMPLATE
+from templates import DEMO_PAGE
+from assets import static_response
+from compression import CompressionMiddleware, StaticPayload
+from diagnostics import check_admin, profiler, watchdog
+from readiness import readiness
+from timing import ServerTimingMiddleware, TimedJSONResponse, TimedRoute, slow_requests
+from metrics import METRICS_MEDIA_TYPE, LoopLagMonitor, MetricsMiddleware, register_caches, render as render_metrics
+from units import Units
+from views import encode, render, hourly_view, forecast_at
+from interpolation import Interpolation, parse_time
+from batch import NDJSON_MEDIA_TYPE, validate_batch, stream_batch, collect_batch, gather_entries
+from analytics import analyze, forecast_columns
+from delta import forecast_version, versioned_forecast
+from grid import GridSpec, parse_bbox, validate_resolution, sample_grid, grid_payload
+from tiles import TileService
+from history import history, history_document, history_payload
+from rollups import Aggregate, Interval
+from subscriptions import SSEResponse, SubscriptionHub, parse_location, websocket_session
+
+_openapi_payload: Optional[StaticPayload] = None
+
+async def _poll_weather(location):
+    if location[0] == "coord":
+        return await get_weather_entry(float(location[1]), float(location[2]))
+    return await get_weather_by_city_entry(location[1])
+
+async def _poll_forecast(location):
+    if location[0] == "coord":
+        return await get_forecast_entry(float(location[1]), float(location[2]))
+    return await get_forecast_by_city_entry(location[1])
+
+weather_hub = SubscriptionHub(_poll_weather)
+forecast_hub = SubscriptionHub(_poll_forecast, view="forecast", change_key=forecast_version)
+tile_service = TileService({
+    "weather": (peek_weather_entry, get_weather_entry),
+    "forecast": (peek_forecast_entry, get_forecast_entry),
+})
+register_caches(
+    {"weather": weather_cache, "forecast": forecast_cache, "tiles": tile_service.cache},
+    nearby={"weather": weather_index, "forecast": forecast_index},
+)
+loop_lag = LoopLagMonitor()
+
+def openapi_payload() -> StaticPayload:
+    global _openapi_payload
+    if _openapi_payload is None:
+        body = json.dumps(app.openapi(), separators=(",", ":")).encode("utf-8")
+        _openapi_payload = StaticPayload(body, "application/json")
+    return _openapi_payload
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compress the static payloads once instead of on every request
+    openapi_payload()
+    loop_lag.start()
+    watchdog.start()
+    yield
+    watchdog.stop()
+    profiler.stop()
+    await loop_lag.stop()
+    await weather_hub.close()
+    await forecast_hub.close()
+    tile_service.close()
+    await close_client()
+    await asyncio.to_thread(history.flush)
+    await asyncio.to_thread(slow_requests.flush)
 
 app = FastAPI(
     title="Location & Weather API",
@@ -35,37 +125,277 @@ app = FastAPI(
         "name": "MIT",
         "url": "https://opensource.org/licenses/MIT",
     },
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
 )
+# Routes time their endpoint, validation and serialization for Server-Timing
+app.router.route_class = TimedRoute
+
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+# Added last so it is outermost and times compression too
+app.add_middleware(MetricsMiddleware)
+
+# Serve the OpenAPI schema from the precompressed payload instead of re-encoding it
+app.router.routes = [route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url]
+
+@app.get(app.openapi_url, include_in_schema=False)
+async def openapi_json(request: Request):
+    return openapi_payload().response(request)
 
 # Demo routes
 @app.get("/demo", response_class=HTMLResponse, tags=["Demo"], summary="Interactive Demo Interface")
-async def demo():
-    return HTML_TEMPLATE
+async def demo(request: Request):
+    return DEMO_PAGE.response(request)
 
 @app.get("/", response_class=HTMLResponse, tags=["Demo"])
-async def root():
-    return HTML_TEMPLATE
+async def root(request: Request):
+    return DEMO_PAGE.response(request)
+
+@app.get("/static/{filename}", include_in_schema=False)
+async def static_asset(request: Request, filename: str):
+    return static_response(request, filename)
 
 # API Routes
 @app.get("/api/location", response_model=LocationResponse, tags=["Location"])
 async def get_location(request: Request):
     return await get_location_data(request)
 
+def _cache_distance(result, response: Response, distance: Optional[float]):
+    # Tell the client when a cached entry for a nearby point answered the request
+    if distance is not None:
+        headers = result.headers if isinstance(result, Response) else response.headers
+        headers["X-Cache-Distance"] = str(round(distance))
+    return result
+
 @app.get("/api/weather", response_model=WeatherResponse, tags=["Weather"])
-async def get_weather(lat: float, lon: float):
-    return await get_weather_data(lat, lon)
+async def get_weather(response: Response, lat: float, lon: float, units: Optional[Units] = None, fields: Optional[str] = None):
+    """May be answered from a fresh cached point nearby; ``X-Cache-Distance`` then gives its distance in meters."""
+    entry, distance = await get_weather_entry_nearby(lat, lon)
+    return _cache_distance(render(entry, "weather", units, fields), response, distance)
 
 @app.get("/api/forecast", response_model=ForecastResponse, tags=["Weather"])
-async def get_forecast(lat: float, lon: float):
-    return await get_forecast_data(lat, lon)
+async def get_forecast(request: Request, response: Response, lat: float, lon: float, units: Optional[Units] = None, fields: Optional[str] = None, since: Optional[str] = None):
+    """Pass the `ETag` you hold as `since` to receive only the changes since that version."""
+    entry, distance = await get_forecast_entry_nearby(lat, lon)
+    return _cache_distance(versioned_forecast(request, response, entry, "forecast", units, fields, since), response, distance)
+
+@app.get("/api/weather/here", tags=["Weather"], summary="Location, current weather and forecast for the caller's IP")
+async def get_weather_here(request: Request, daily: bool = False, units: Optional[Units] = None):
+    """
+    `/api/location`, `/api/weather` and `/api/forecast` in one round trip. The
+    IP is located first, then current weather and the forecast (day summaries
+    with `daily=true`) are fetched concurrently.
+    """
+    location, weather, forecast = await get_here_entries(request)
+    body = b"".join((
+        b'{"location":', json.dumps(location, separators=(",", ":")).encode("utf-8"),
+        b',"weather":', encode(weather, "weather", units),
+        b',"forecast":', encode(forecast, "daily" if daily else "forecast", units), b"}",
+    ))
+    return Response(body, media_type="application/json")
 
 @app.get("/api/weather-by-city", response_model=WeatherResponse, tags=["Weather"])
-async def get_weather_by_city(city: str, country: Optional[str] = None):
-    return await get_weather_by_city_data(city, country)
+async def get_weather_by_city(city: str, country: Optional[str] = None, units: Optional[Units] = None, fields: Optional[str] = None):
+    return render(await get_weather_by_city_entry(city, country), "weather", units, fields)
 
 @app.get("/api/forecast-by-city", response_model=ForecastResponse, tags=["Weather"])
-async def get_forecast_by_city(city: str, country: Optional[str] = None):
-    return await get_forecast_by_city_data(city, country)
+async def get_forecast_by_city(request: Request, response: Response, city: str, country: Optional[str] = None, units: Optional[Units] = None, fields: Optional[str] = None, since: Optional[str] = None):
+    """Pass the `ETag` you hold as `since` to receive only the changes since that version."""
+    entry = await get_forecast_by_city_entry(city, country)
+    return versioned_forecast(request, response, entry, "forecast", units, fields, since)
+
+@app.get("/api/forecast/daily", response_model=DailyForecastResponse, tags=["Weather"])
+async def get_daily_forecast(lat: float, lon: float, units: Optional[Units] = None, fields: Optional[str] = None):
+    return render(await get_forecast_entry(lat, lon), "daily", units, fields)
+
+@app.get("/api/forecast/daily-by-city", response_model=DailyForecastResponse, tags=["Weather"])
+async def get_daily_forecast_by_city(city: str, country: Optional[str] = None, units: Optional[Units] = None, fields: Optional[str] = None):
+    return render(await get_forecast_by_city_entry(city, country), "daily", units, fields)
+
+@app.get("/api/forecast/hourly", response_model=HourlyForecastResponse, tags=["Weather"])
+async def get_hourly_forecast(lat: float, lon: float, method: Interpolation = Interpolation.linear, units: Optional[Units] = None, fields: Optional[str] = None):
+    """Hourly values interpolated from the cached 3-hour forecast; never calls upstream beyond the forecast itself."""
+    return render(await get_forecast_entry(lat, lon), hourly_view(method), units, fields)
+
+@app.get("/api/forecast/at", response_model=ForecastPointResponse, tags=["Weather"])
+async def get_forecast_at(lat: float, lon: float, t: str, method: Interpolation = Interpolation.linear, units: Optional[Units] = None):
+    """Forecast interpolated at ``t`` (unix timestamp or ISO 8601 date-time) within the forecast range."""
+    return forecast_at(await get_forecast_entry(lat, lon), parse_time(t), method, units)
+
+async def _weather_lookup(location: BatchLocation):
+    if location.city is not None:
+        return await get_weather_by_city_entry(location.city, location.country)
+    return await get_weather_entry(location.lat, location.lon)
+
+async def _forecast_lookup(location: BatchLocation):
+    if location.city is not None:
+        return await get_forecast_by_city_entry(location.city, location.country)
+    return await get_forecast_entry(location.lat, location.lon)
+
+async def _batch_response(request: Request, batch: BatchRequest, lookup, view: str):
+    validate_batch(batch.locations)
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(
+            stream_batch(batch.locations, lookup, view, batch.units, batch.fields),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    body = await collect_batch(batch.locations, lookup, view, batch.units, batch.fields)
+    return Response(body, media_type="application/json")
+
+@app.post("/api/weather/batch", tags=["Weather"], summary="Current weather for many locations")
+async def get_weather_batch(request: Request, batch: BatchRequest):
+    """Send `Accept: application/x-ndjson` to stream each result as soon as it is ready."""
+    return await _batch_response(request, batch, _weather_lookup, "weather")
+
+@app.post("/api/forecast/batch", tags=["Weather"], summary="Forecasts for many locations")
+async def get_forecast_batch(request: Request, batch: BatchRequest):
+    """Send `Accept: application/x-ndjson` to stream each result as soon as it is ready."""
+    return await _batch_response(request, batch, _forecast_lookup, "forecast")
+
+@app.get("/api/weather/grid", tags=["Weather"], summary="Current weather sampled on a grid over a bounding box")
+async def get_weather_grid(bbox: str, resolution: float = 1.0, units: Optional[Units] = None):
+    """
+    ``bbox`` is ``west,south,east,north``. Cells come from a fixed global grid,
+    so overlapping viewports share cached cells; only missing cells are fetched.
+    """
+    spec = GridSpec(parse_bbox(bbox), validate_resolution(resolution))
+    entries, cached = await sample_grid(spec, peek_weather_entry, get_weather_entry)
+    return Response(grid_payload(spec, entries, cached, units or Units.standard), media_type="application/json")
+
+@app.get("/tiles/{layer}/{z}/{x}/{y}.png", tags=["Tiles"], summary="Weather map tile (XYZ, 256 px PNG)")
+async def get_tile(request: Request, layer: str, z: int, x: int, y: int):
+    """Layers: ``temperature``, ``clouds`` and ``precipitation`` (probability in the next forecast slot)."""
+    return tile_service.response(request, await tile_service.tile(layer, z, x, y))
+
+@app.get("/api/cache/nearby", tags=["System"], summary="Nearby-hit cache index statistics")
+async def nearby_cache_stats():
+    return {"weather": weather_index.stats(), "forecast": forecast_index.stats()}
+
+@app.get("/api/tiles/stats", tags=["Tiles"], summary="Tile cache hit ratio and render times")
+async def tile_stats():
+    return tile_service.stats()
+
+def _history_range(from_: Optional[str], to: Optional[str]):
+    return (parse_time(from_, "from") if from_ else 0), (parse_time(to, "to") if to else int(time.time()))
+
+@app.get("/api/history", tags=["History"], summary="Stored current-weather observations for a location")
+async def get_history(
+    lat: float,
+    lon: float,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    interval: Optional[Interval] = None,
+    agg: Aggregate = Aggregate.mean,
+    units: Optional[Units] = None,
+):
+    """
+    Every observation fetched for this point with ``from <= dt <= to``
+    (unix timestamps or ISO 8601; default: everything up to now), as one
+    array per field. With ``interval`` (hour, day, week; UTC buckets) each
+    row is the ``agg`` (min, max, mean, p95) of a bucket instead.
+    """
+    start, end = _history_range(from_, to)
+    name, columns = await asyncio.to_thread(get_history_columns, history_key(lat, lon), start, end, interval, agg)
+    return Response(history_payload(name, start, end, columns, units or Units.standard, interval, agg), media_type="application/json")
+
+@app.post("/api/history/query", tags=["History"], summary="Observations or rollups for many locations")
+async def query_history(request: HistoryQuery):
+    """Results are in request order, one document per location, shaped like ``GET /api/history``."""
+    validate_batch(request.locations)
+    start, end = _history_range(request.from_, request.to)
+    units = request.units or Units.standard
+
+    def run():
+        documents = []
+        for location in request.locations:
+            key = history_key(location.lat, location.lon, location.city, location.country)
+            name, columns = get_history_columns(key, start, end, request.interval, request.agg)
+            documents.append(history_document(name, start, end, columns, units, request.interval, request.agg))
+        return json.dumps(documents, separators=(",", ":")).encode("utf-8")
+
+    return Response(await asyncio.to_thread(run), media_type="application/json")
+
+@app.get("/api/history/stats", tags=["History"], summary="Observation history store statistics")
+async def history_stats():
+    return history.stats()
+
+# Analytics
+def _forecast_analytics(entries, request: AnalyticsRequest):
+    thresholds = {
+        "temp_below": request.temp_below,
+        "temp_above": request.temp_above,
+        "wind_above": request.wind_above,
+        "pop_above": request.pop_above,
+    }
+    found = [entry for entry in entries if not isinstance(entry, HTTPException)]
+    results = iter(analyze([entry.derive("columns", forecast_columns) for entry in found], request.window, thresholds))
+    return [
+        {"error": {"status": entry.status_code, "detail": entry.detail}} if isinstance(entry, HTTPException)
+        else next(results)
+        for entry in entries
+    ]
+
+@app.get("/api/forecast/analytics", tags=["Analytics"], summary="Forecast statistics for one location")
+async def get_forecast_analytics(
+    lat: float,
+    lon: float,
+    window: int = 8,
+    temp_below: Optional[float] = 273.15,
+    temp_above: Optional[float] = None,
+    wind_above: Optional[float] = None,
+    pop_above: Optional[float] = None,
+):
+    """Daily aggregates, extremes, rolling-window extremes and threshold crossings. Temperatures are in Kelvin."""
+    request = AnalyticsRequest(
+        locations=[BatchLocation(lat=lat, lon=lon)], window=window, temp_below=temp_below,
+        temp_above=temp_above, wind_above=wind_above, pop_above=pop_above,
+    )
+    return _forecast_analytics([await get_forecast_entry(lat, lon)], request)[0]
+
+@app.post("/api/forecast/analytics", tags=["Analytics"], summary="Forecast statistics for many locations")
+async def get_forecast_analytics_batch(request: AnalyticsRequest):
+    """All locations are analysed together in one vectorized pass; results are in request order."""
+    validate_batch(request.locations)
+    entries = await gather_entries(request.locations, _forecast_lookup)
+    return _forecast_analytics(entries, request)
+
+# Live subscriptions
+@app.get("/api/weather/subscribe", tags=["Subscriptions"], summary="Live weather updates (Server-Sent Events)")
+async def subscribe_weather(location: List[str] = Query(...), units: Optional[Units] = None):
+    """Repeat `location` as `lat,lon` or `City[,CC]`; an event is sent whenever a location's observation changes."""
+    subscriber = weather_hub.connect(units)
+    try:
+        for value in location:
+            weather_hub.subscribe(subscriber, parse_location(value))
+    except Exception:
+        weather_hub.disconnect(subscriber)
+        raise
+    return SSEResponse(weather_hub, subscriber)
+
+@app.websocket("/api/weather/ws")
+async def weather_websocket(websocket: WebSocket, units: Optional[Units] = None):
+    await websocket_session(weather_hub, websocket, units)
+
+@app.get("/api/forecast/subscribe", tags=["Subscriptions"], summary="Live forecast updates as deltas (Server-Sent Events)")
+async def subscribe_forecast(location: List[str] = Query(...), units: Optional[Units] = None):
+    """The first event per location carries the full forecast; later ones only the delta from the previous event."""
+    subscriber = forecast_hub.connect(units)
+    try:
+        for value in location:
+            forecast_hub.subscribe(subscriber, parse_location(value))
+    except Exception:
+        forecast_hub.disconnect(subscriber)
+        raise
+    return SSEResponse(forecast_hub, subscriber)
+
+@app.websocket("/api/forecast/ws")
+async def forecast_websocket(websocket: WebSocket, units: Optional[Units] = None):
+    await websocket_session(forecast_hub, websocket, units)
+
+@app.get("/api/subscriptions", tags=["Subscriptions"], summary="Subscription fan-out statistics")
+async def subscription_stats():
+    return {"weather": weather_hub.stats(), "forecast": forecast_hub.stats()}
 
 # System endpoints
 @app.get("/api/health", tags=["System"])
@@ -76,6 +406,55 @@ async def health_check():
         "version": "1.0.0",
     }
 
+@app.get("/api/ready", tags=["System"], summary="Readiness for load balancers")
+async def ready(response: Response):
+    """
+    503 while this node is saturated (upstream pool, requests in flight or
+    event-loop lag over the `READY_*` limits). Also reports cache fill and hit
+    ratios and upstream health and call budgets. Never calls upstream.
+    """
+    ok, report = readiness(upstream_pool(), {"weather": weather_cache, "forecast": forecast_cache, "tiles": tile_service.cache})
+    if not ok:
+        response.status_code = 503
+    return report
+
+@app.get("/api/providers", tags=["System"], summary="Weather providers in routing order")
+async def provider_stats():
+    """Rolling latency, error rate and remaining budget that order the providers for the next lookup."""
+    return {"providers": router.stats()}
+
+@app.get("/metrics", tags=["System"], summary="Prometheus metrics")
+async def metrics():
+    """Request, upstream, cache, connection pool and event-loop lag metrics in the Prometheus text format."""
+    return Response(render_metrics(), media_type=METRICS_MEDIA_TYPE)
+
+@app.get("/api/admin/stalls", tags=["Admin"], summary="Event-loop stalls caught by the watchdog")
+async def admin_stalls(x_admin_token: Optional[str] = Header(None)):
+    """Recent stalls over `STALL_THRESHOLD_MS` with the stack that was blocking the loop. Requires `X-Admin-Token`."""
+    check_admin(x_admin_token)
+    return watchdog.stats()
+
+@app.post("/api/admin/profiler/start", tags=["Admin"], summary="Start the sampling profiler")
+async def admin_profiler_start(
+    x_admin_token: Optional[str] = Header(None),
+    interval_ms: float = Query(10.0, description="Sampling interval"),
+    seconds: float = Query(30.0, description="Stop automatically after this long (max 300)"),
+):
+    """Samples the event-loop thread's stack; clears the previous profile. Requires `X-Admin-Token`."""
+    check_admin(x_admin_token)
+    return profiler.start(interval_ms, seconds)
+
+@app.post("/api/admin/profiler/stop", tags=["Admin"], summary="Stop the sampling profiler")
+async def admin_profiler_stop(x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    return profiler.stop()
+
+@app.get("/api/admin/profiler", tags=["Admin"], summary="Profile as collapsed stacks")
+async def admin_profiler(x_admin_token: Optional[str] = Header(None)):
+    """One `frame;frame;... count` line per stack, for flamegraph.pl or speedscope. Requires `X-Admin-Token`."""
+    check_admin(x_admin_token)
+    return Response(profiler.collapsed(), media_type="text/plain")
+
 @app.get("/api/info", tags=["System"])
 async def api_info():
     return {
@@ -84,8 +463,18 @@ async def api_info():
         "description": "Professional API for location detection and weather information",
         "endpoints": {
             "location": {"path": "/api/location"},
+            "weather_here": {"path": "/api/weather/here"},
             "weather": {"path": "/api/weather"},
             "forecast": {"path": "/api/forecast"},
+            "daily_forecast": {"path": "/api/forecast/daily"},
+            "hourly_forecast": {"path": "/api/forecast/hourly"},
+            "forecast_at": {"path": "/api/forecast/at"},
+            "weather_grid": {"path": "/api/weather/grid"},
+            "tiles": {"path": "/tiles/{layer}/{z}/{x}/{y}.png"},
+            "history": {"path": "/api/history"},
+            "ready": {"path": "/api/ready"},
+            "providers": {"path": "/api/providers"},
+            "metrics": {"path": "/metrics"},
         }
     }
 
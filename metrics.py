@@ -0,0 +1,378 @@
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from cache import TTLCache
+from diagnostics import watchdog
+from timing import slow_requests
+
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Requests that match no route share one label so unknown paths cannot grow the series
+UNMATCHED_ROUTE = "<unmatched>"
+# Upstream calls are labeled by the endpoint name their caller passes; anything else is OTHER_ENDPOINT,
+# so request paths (e.g. ip-api's /json/{ip}) never become label values
+UPSTREAM_ENDPOINTS = {"weather", "forecast", "onecall", "location", "open-meteo"}
+OTHER_ENDPOINT = "other"
+
+Labels = Tuple[str, ...]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; made cumulative only when scraped
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """
+    A named metric with one child per label combination.
+
+    Children are created on first use and then reused, so recording a sample
+    is a dict lookup plus an in-place add; there are no locks because every
+    sample is recorded on the event loop thread. ``collect`` instead produces
+    ``{labels: value}`` at scrape time, for values other objects already count.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), collect: Optional[Callable[[], Dict[Labels, float]]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self._children: Dict[Labels, object] = {}
+        REGISTRY.append(self)
+
+    def _child(self):
+        return _Value()
+
+    def labels(self, *values: str):
+        try:
+            return self._children[values]
+        except KeyError:
+            child = self._children[values] = self._child()
+            return child
+
+    def _format_labels(self, values: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        values = self.collect() if self.collect else {labels: child.value for labels, child in self._children.items()}
+        return [f"{self.name}{self._format_labels(labels)} {_number(value)}" for labels, value in values.items()]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _child(self):
+        return _Buckets(self.buckets)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._format_labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {_number(child.sum)}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+http_requests = Counter("http_requests_total", "Requests handled, by route template, method and status.", ("route", "method", "status"))
+http_duration = Histogram("http_request_duration_seconds", "Time to the end of the response body, by route template.", ("route", "method"))
+http_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled.")
+_in_flight = http_in_flight.labels()
+
+
+class MetricsMiddleware:
+    """
+    Count and time every HTTP request under its route template (``/api/weather``,
+    ``/tiles/{layer}/{z}/{x}/{y}.png``...), not its raw path.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        _in_flight.value += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_flight.value -= 1
+            # The router records the matched route in the scope
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_duration.labels(path, method).observe(elapsed)
+            http_requests.labels(path, method, str(status)).inc()
+
+
+upstream_duration = Histogram("upstream_request_duration_seconds", "Upstream time to response headers, by provider and endpoint.", ("provider", "endpoint"))
+upstream_responses = Counter("upstream_responses_total", "Upstream responses by provider and status; status is the error type when no response arrived.", ("provider", "status"))
+upstream_in_flight = Gauge("upstream_requests_in_flight", "Upstream requests awaiting response headers.", ("provider",))
+
+
+class ProviderHealth:
+    """
+    Passive view of one upstream provider: consecutive failed calls (5xx, 429 or
+    no response), calls made by this process in the current minute, and rolling
+    latency and error rate. The error rate decays towards zero while the
+    provider is not called, so a provider that failed earlier gets tried again.
+    """
+
+    __slots__ = ("consecutive_failures", "last_success", "last_failure", "minute", "minute_calls", "latency", "_error_rate", "_updated")
+
+    # Weight of the newest sample in the moving averages
+    ALPHA = 0.2
+    ERROR_RATE_HALF_LIFE = 60.0
+
+    def __init__(self):
+        self.consecutive_failures = 0
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.minute = 0
+        self.minute_calls = 0
+        self.latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._updated = 0.0
+
+    def record(self, ok: bool, seconds: float) -> None:
+        now = time.time()
+        minute = int(now // 60)
+        if minute != self.minute:
+            self.minute, self.minute_calls = minute, 0
+        self.minute_calls += 1
+        self.latency = seconds if self.latency is None else self.latency + self.ALPHA * (seconds - self.latency)
+        error_rate = self.error_rate()
+        self._error_rate = error_rate + self.ALPHA * ((0.0 if ok else 1.0) - error_rate)
+        self._updated = time.monotonic()
+        if ok:
+            self.consecutive_failures = 0
+            self.last_success = now
+        else:
+            self.consecutive_failures += 1
+            self.last_failure = now
+
+    def error_rate(self) -> float:
+        if not self._updated:
+            return 0.0
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._updated) / self.ERROR_RATE_HALF_LIFE)
+
+    def calls_this_minute(self) -> int:
+        return self.minute_calls if self.minute == int(time.time() // 60) else 0
+
+
+upstream_health: Dict[str, ProviderHealth] = {}
+
+
+class UpstreamMetricsTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the upstream transport to time every call. Callers name the provider
+    with the ``provider`` request extension (otherwise the host is used) and
+    the endpoint with ``endpoint``.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider = request.extensions.get("provider") or request.url.host
+        endpoint = request.extensions.get("endpoint")
+        if endpoint not in UPSTREAM_ENDPOINTS:
+            endpoint = OTHER_ENDPOINT
+        in_flight = upstream_in_flight.labels(provider)
+        in_flight.value += 1
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.inner.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        except Exception as exc:
+            status = type(exc).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.value -= 1
+            upstream_duration.labels(provider, endpoint).observe(elapsed)
+            upstream_responses.labels(provider, status).inc()
+            health = upstream_health.get(provider)
+            if health is None:
+                health = upstream_health[provider] = ProviderHealth()
+            health.record(status.isdigit() and int(status) < 500 and status != "429", elapsed)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def pool_state(client: Optional[httpx.AsyncClient]) -> Dict[str, Optional[int]]:
+    """
+    Active and idle pooled connections of ``client``, requests queued for a
+    connection and the pool limit (``None`` without a connection pool, e.g. on
+    cassette replay). Bounded by the pool size, so cheap to call per scrape.
+    """
+    transport = getattr(client, "_transport", None)
+    transport = getattr(transport, "inner", transport)
+    pool = getattr(transport, "_pool", None)
+    connections = list(getattr(pool, "connections", ()))
+    idle = sum(1 for connection in connections if connection.is_idle())
+    queued = sum(1 for request in getattr(pool, "_requests", ()) if request.is_queued())
+    return {"active": len(connections) - idle, "idle": idle, "queued": queued, "max": getattr(pool, "_max_connections", None)}
+
+
+def pool_usage(client: Optional[httpx.AsyncClient]) -> Dict[Labels, float]:
+    state = pool_state(client)
+    return {("active",): state["active"], ("idle",): state["idle"], ("queued",): state["queued"]}
+
+
+Counter(
+    "slow_requests_total", "Requests over SLOW_REQUEST_MS, by whether they were logged or dropped.", ("result",),
+    collect=lambda: {("logged",): slow_requests.logged, ("dropped",): slow_requests.dropped},
+)
+
+
+# Caches and nearby indexes exposed by register_caches, by name
+_caches: Dict[str, TTLCache] = {}
+_nearby: Dict[str, object] = {}
+
+
+def _cache_lookups() -> Dict[Labels, float]:
+    values = {}
+    for name, cache in _caches.items():
+        values[(name, "hit")] = cache.hits
+        values[(name, "miss")] = cache.misses
+        values[(name, "stale")] = cache.stale
+        values[(name, "coalesced")] = cache.coalesced
+    for name, index in _nearby.items():
+        values[(name, "nearby_hit")] = index.hits
+    return values
+
+
+Counter("cache_lookups_total", "Cache lookups by result; stale means an expired entry was found, coalesced that a miss joined a fetch already in flight.", ("cache", "result"), collect=_cache_lookups)
+Gauge("cache_entries", "Entries currently held per cache.", ("cache",), collect=lambda: {(name,): len(cache) for name, cache in _caches.items()})
+
+
+def register_caches(caches: Dict[str, TTLCache], nearby: Dict[str, object] = None) -> None:
+    """
+    Expose the counters ``TTLCache`` (and ``SpatialIndex``) already keep.
+    Registering a name again replaces it, so no series is ever duplicated.
+    """
+    _caches.update(caches)
+    _nearby.update(nearby or {})
+
+
+loop_lag = Histogram("event_loop_lag_seconds", "How late a periodic timer callback ran; time the loop was blocked.", buckets=LAG_BUCKETS)
+loop_lag_last = Gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample.")
+Counter("event_loop_stalls_total", "Event-loop stalls over STALL_THRESHOLD_MS seen by the watchdog.", collect=lambda: {(): watchdog.count})
+
+
+class LoopLagMonitor:
+    """Sleeps ``interval`` seconds in a loop and records how much longer each sleep took."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._histogram = loop_lag.labels()
+        self._last = loop_lag_last.labels()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self._histogram.observe(lag)
+            self._last.value = lag
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
+from rollups import Aggregate, Interval
+from units import Units
+
 class LocationResponse(BaseModel):
     status: str = Field(..., description="Status of the request (success/fail)")
     country: Optional[str] = Field(None, description="Country name")
@@ -75,6 +78,84 @@ class ForecastResponse(BaseModel):
     list: List[ForecastItem] = Field(..., description="List of forecast items")
     city: dict = Field(..., description="City information")
 
+class DailyWind(BaseModel):
+    speed_mean: Optional[float] = Field(None, description="Mean wind speed over the day in meter/sec")
+    speed_max: Optional[float] = Field(None, description="Maximum wind speed over the day in meter/sec")
+    gust_max: Optional[float] = Field(None, description="Strongest wind gust over the day in meter/sec")
+
+class DailyForecast(BaseModel):
+    date: str = Field(..., description="Local calendar date, ISO format")
+    dt: int = Field(..., description="Time of the first forecast slot of the day, unix timestamp")
+    slots: int = Field(..., description="Number of 3-hour forecast items aggregated")
+    temp_min: float = Field(..., description="Minimum temperature in Kelvin")
+    temp_max: float = Field(..., description="Maximum temperature in Kelvin")
+    temp_mean: float = Field(..., description="Mean temperature in Kelvin")
+    humidity_mean: float = Field(..., description="Mean humidity percentage")
+    condition: Optional[WeatherCondition] = Field(None, description="Most frequent weather condition of the day")
+    pop: float = Field(..., description="Highest probability of precipitation of the day")
+    wind: DailyWind = Field(..., description="Wind summary")
+
+class DailyForecastResponse(BaseModel):
+    cod: str = Field(..., description="Internal parameter")
+    cnt: int = Field(..., description="Number of days")
+    list: List[DailyForecast] = Field(..., description="List of daily summaries")
+    city: dict = Field(..., description="City information")
+
+class InterpolatedMain(BaseModel):
+    temp: Optional[float] = Field(None, description="Temperature in Kelvin")
+    feels_like: Optional[float] = Field(None, description="Perceived temperature in Kelvin")
+    pressure: Optional[float] = Field(None, description="Atmospheric pressure in hPa")
+    humidity: Optional[float] = Field(None, description="Humidity percentage")
+
+class InterpolatedWind(BaseModel):
+    speed: Optional[float] = Field(None, description="Wind speed in meter/sec")
+    deg: Optional[float] = Field(None, description="Wind direction in degrees")
+    gust: Optional[float] = Field(None, description="Wind gust in meter/sec")
+
+class InterpolatedForecast(BaseModel):
+    dt: int = Field(..., description="Time of the value, unix timestamp")
+    dt_txt: str = Field(..., description="Time of the value, UTC")
+    main: InterpolatedMain = Field(..., description="Interpolated main parameters")
+    wind: InterpolatedWind = Field(..., description="Interpolated wind")
+
+class HourlyForecastResponse(BaseModel):
+    cod: str = Field(..., description="Internal parameter")
+    method: str = Field(..., description="Interpolation method: linear or cubic (monotone)")
+    cnt: int = Field(..., description="Number of hourly values")
+    list: List[InterpolatedForecast] = Field(..., description="Hourly values interpolated from the 3-hour forecast")
+    city: dict = Field(..., description="City information")
+
+class ForecastPointResponse(InterpolatedForecast):
+    method: str = Field(..., description="Interpolation method: linear or cubic (monotone)")
+    bracket: List[int] = Field(..., description="Forecast slots the value was interpolated between, unix timestamps")
+
+class BatchLocation(BaseModel):
+    lat: Optional[float] = Field(None, description="Latitude")
+    lon: Optional[float] = Field(None, description="Longitude")
+    city: Optional[str] = Field(None, description="City name, used when coordinates are not given")
+    country: Optional[str] = Field(None, description="Country code (optional)")
+
+class BatchRequest(BaseModel):
+    locations: List[BatchLocation] = Field(..., description="Locations to query, by coordinates or city")
+    units: Optional[Units] = Field(None, description="Units for temperatures and wind speeds")
+    fields: Optional[str] = Field(None, description="Comma-separated dotted paths to keep in each result")
+
+class AnalyticsRequest(BaseModel):
+    locations: List[BatchLocation] = Field(..., description="Locations to analyse, by coordinates or city")
+    window: int = Field(8, description="Rolling window in 3-hour slots (8 = 24 hours)")
+    temp_below: Optional[float] = Field(273.15, description="Report slots colder than this temperature in Kelvin")
+    temp_above: Optional[float] = Field(None, description="Report slots warmer than this temperature in Kelvin")
+    wind_above: Optional[float] = Field(None, description="Report slots with wind speed above this value in meter/sec")
+    pop_above: Optional[float] = Field(None, description="Report slots with probability of precipitation above this value")
+
+class HistoryQuery(BaseModel):
+    locations: List[BatchLocation] = Field(..., description="Locations to query, by coordinates or city")
+    from_: Optional[str] = Field(None, alias="from", description="Start time, unix timestamp or ISO 8601 (default: all history)")
+    to: Optional[str] = Field(None, description="End time, unix timestamp or ISO 8601 (default: now)")
+    interval: Optional[Interval] = Field(None, description="Bucket size for rollups; raw observations when omitted")
+    agg: Aggregate = Field(Aggregate.mean, description="Aggregate per bucket: min, max, mean or p95")
+    units: Optional[Units] = Field(None, description="Units for temperatures and wind speeds")
+
 class ErrorResponse(BaseModel):
     cod: int = Field(..., description="Error code")
     message: str = Field(..., description="Error message")
\ No newline at end of file
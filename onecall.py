@@ -0,0 +1,140 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# The /data/2.5/forecast grid: one item every 3 hours for 5 days
+STEP = 3 * 3600
+FORECAST_ITEMS = 40
+# Local hour each daily One Call temperature stands for; "night" is taken as midnight ending the day
+DAILY_TEMP_HOURS = (("morn", 6), ("day", 12), ("eve", 18), ("night", 24))
+
+
+def _local_day(dt: int, offset: int) -> int:
+    return (dt + offset) // 86400
+
+
+def _conditions(point: dict) -> dict:
+    """The fields hourly and daily One Call points share with a forecast item."""
+    wind = {"speed": point.get("wind_speed", 0.0), "deg": point.get("wind_deg", 0)}
+    if "wind_gust" in point:
+        wind["gust"] = point["wind_gust"]
+    return {
+        "weather": point.get("weather") or [],
+        "clouds": {"all": point.get("clouds", 0)},
+        "wind": wind,
+    }
+
+
+def onecall_weather(data: dict) -> dict:
+    """
+    One Call ``current`` as a ``/data/2.5/weather`` document. One Call has no
+    station data, so ``id``, ``name`` and the country are empty and the
+    min/max temperatures equal the current one.
+    """
+    current = data["current"]
+    document = {
+        "coord": {"lon": data["lon"], "lat": data["lat"]},
+        "base": "onecall",
+        "main": {
+            "temp": current["temp"],
+            "feels_like": current.get("feels_like", current["temp"]),
+            "temp_min": current["temp"],
+            "temp_max": current["temp"],
+            "pressure": current.get("pressure", 0),
+            "humidity": current.get("humidity", 0),
+        },
+        "visibility": current.get("visibility"),
+        **_conditions(current),
+        "dt": current["dt"],
+        "sys": {"sunrise": current.get("sunrise"), "sunset": current.get("sunset")},
+        "timezone": data.get("timezone_offset", 0),
+        "id": 0,
+        "name": "",
+        "cod": 200,
+    }
+    for kind in ("rain", "snow"):
+        if kind in current:
+            document[kind] = current[kind]
+    return document
+
+
+def _daily_temp(days: Dict[int, dict], local_day: int, hour: float, field: str) -> float:
+    """Piecewise-linear ``temp``/``feels_like`` of a day at a local hour, from its four daily values."""
+    day = days[local_day]
+    previous = days.get(local_day - 1, day)
+    anchors: List[Tuple[float, float]] = [(0, previous[field]["night"])]
+    anchors += [(at, day[field][name]) for name, at in DAILY_TEMP_HOURS if name in day[field]]
+    for (h0, t0), (h1, t1) in zip(anchors, anchors[1:]):
+        if h0 <= hour <= h1:
+            return t0 + (t1 - t0) * (hour - h0) / (h1 - h0)
+    return anchors[-1][1]
+
+
+def _item(dt: int, point: dict, temp: float, feels_like: float, precipitation: Dict[str, float], day: Optional[dict]) -> dict:
+    item = {
+        "dt": dt,
+        "main": {
+            "temp": temp,
+            "feels_like": feels_like,
+            "temp_min": temp,
+            "temp_max": temp,
+            "pressure": point.get("pressure", 0),
+            "humidity": point.get("humidity", 0),
+            "temp_kf": 0,
+        },
+        **_conditions(point),
+        "visibility": point.get("visibility", 10000),
+        "pop": point.get("pop", 0),
+        "sys": {"pod": "d" if day and day.get("sunrise", 0) <= dt < day.get("sunset", 0) else "n"},
+        "dt_txt": datetime.fromtimestamp(dt, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    for kind, volume in precipitation.items():
+        if volume:
+            item[kind] = {"3h": round(volume, 2)}
+    return item
+
+
+def onecall_forecast(data: dict) -> dict:
+    """
+    One Call ``hourly`` and ``daily`` as a ``/data/2.5/forecast`` document on
+    the same 3-hour UTC grid. The first 48 hours take every third hourly
+    point, with precipitation summed over the 3 hours up to it. Later slots
+    are filled from the daily points, interpolating temperatures between
+    their morning, day, evening and night values.
+    """
+    offset = data.get("timezone_offset", 0)
+    hourly = {point["dt"]: point for point in data.get("hourly", ())}
+    days = {_local_day(day["dt"], offset): day for day in data.get("daily", ())}
+    start = data["current"]["dt"] // STEP * STEP + STEP
+    items = []
+    for dt in range(start, start + FORECAST_ITEMS * STEP, STEP):
+        local_day = _local_day(dt, offset)
+        day = days.get(local_day)
+        point = hourly.get(dt)
+        if point is not None:
+            window = [hourly[t] for t in range(dt - STEP + 3600, dt + 1, 3600) if t in hourly]
+            precipitation = {kind: sum(p.get(kind, {}).get("1h", 0.0) for p in window) for kind in ("rain", "snow")}
+            items.append(_item(dt, point, point["temp"], point.get("feels_like", point["temp"]), precipitation, day))
+        elif day is not None:
+            hour = (dt + offset) % 86400 / 3600
+            temp = _daily_temp(days, local_day, hour, "temp")
+            feels_like = _daily_temp(days, local_day, hour, "feels_like") if "feels_like" in day else temp
+            # Daily volumes are spread evenly over the day's eight slots
+            precipitation = {kind: day.get(kind, 0.0) / 8 for kind in ("rain", "snow")}
+            items.append(_item(dt, day, round(temp, 2), round(feels_like, 2), precipitation, day))
+    today = days.get(_local_day(data["current"]["dt"], offset), {})
+    return {
+        "cod": "200",
+        "message": 0,
+        "cnt": len(items),
+        "list": items,
+        "city": {
+            "id": 0,
+            "name": "",
+            "coord": {"lat": data["lat"], "lon": data["lon"]},
+            "country": "",
+            "population": 0,
+            "timezone": offset,
+            "sunrise": today.get("sunrise", data["current"].get("sunrise")),
+            "sunset": today.get("sunset", data["current"].get("sunset")),
+        },
+    }
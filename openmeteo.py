@@ -0,0 +1,179 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from onecall import FORECAST_ITEMS, STEP
+
+CELSIUS_TO_KELVIN = 273.15
+# Variables requested from /v1/forecast, as named by Open-Meteo
+CURRENT_VARIABLES = (
+    "temperature_2m", "relative_humidity_2m", "apparent_temperature", "is_day", "precipitation", "rain", "showers",
+    "weather_code", "cloud_cover", "pressure_msl", "surface_pressure", "wind_speed_10m", "wind_direction_10m", "wind_gusts_10m",
+)
+HOURLY_VARIABLES = CURRENT_VARIABLES + ("precipitation_probability", "visibility")
+# Upstream visibility is capped like OWM's
+MAX_VISIBILITY = 10000
+
+# WMO weather interpretation code -> OWM condition id, group, description and icon (without the d/n suffix)
+WMO_CONDITIONS: Dict[int, Tuple[int, str, str, str]] = {
+    0: (800, "Clear", "clear sky", "01"),
+    1: (801, "Clouds", "few clouds", "02"),
+    2: (802, "Clouds", "scattered clouds", "03"),
+    3: (804, "Clouds", "overcast clouds", "04"),
+    45: (741, "Fog", "fog", "50"),
+    48: (741, "Fog", "fog", "50"),
+    51: (300, "Drizzle", "light intensity drizzle", "09"),
+    53: (301, "Drizzle", "drizzle", "09"),
+    55: (302, "Drizzle", "heavy intensity drizzle", "09"),
+    56: (511, "Rain", "freezing rain", "13"),
+    57: (511, "Rain", "freezing rain", "13"),
+    61: (500, "Rain", "light rain", "10"),
+    63: (501, "Rain", "moderate rain", "10"),
+    65: (502, "Rain", "heavy intensity rain", "10"),
+    66: (511, "Rain", "freezing rain", "13"),
+    67: (511, "Rain", "freezing rain", "13"),
+    71: (600, "Snow", "light snow", "13"),
+    73: (601, "Snow", "snow", "13"),
+    75: (602, "Snow", "heavy snow", "13"),
+    77: (600, "Snow", "light snow", "13"),
+    80: (520, "Rain", "light intensity shower rain", "09"),
+    81: (521, "Rain", "shower rain", "09"),
+    82: (522, "Rain", "heavy intensity shower rain", "09"),
+    85: (620, "Snow", "light shower snow", "13"),
+    86: (622, "Snow", "heavy shower snow", "13"),
+    95: (211, "Thunderstorm", "thunderstorm", "11"),
+    96: (201, "Thunderstorm", "thunderstorm with rain", "11"),
+    99: (202, "Thunderstorm", "thunderstorm with heavy rain", "11"),
+}
+
+
+def forecast_url(base_url: str, lat: float, lon: float) -> str:
+    """One request for current conditions and 6 days of hourly data, SI units and unix times."""
+    return (
+        f"{base_url}/v1/forecast?latitude={lat}&longitude={lon}"
+        f"&current={','.join(CURRENT_VARIABLES)}&hourly={','.join(HOURLY_VARIABLES)}&daily=sunrise,sunset"
+        "&forecast_days=6&timezone=auto&timeformat=unixtime&wind_speed_unit=ms"
+    )
+
+
+def _kelvin(celsius: Optional[float]) -> float:
+    return round((celsius or 0.0) + CELSIUS_TO_KELVIN, 2)
+
+
+def _int(value: Optional[float]) -> int:
+    return int(round(value or 0))
+
+
+def condition(code: Optional[int], is_day: Optional[int]) -> dict:
+    condition_id, main, description, icon = WMO_CONDITIONS.get(code, WMO_CONDITIONS[3] if code else WMO_CONDITIONS[0])
+    return {"id": condition_id, "main": main, "description": description, "icon": icon + ("d" if is_day else "n")}
+
+
+def _fields(point: dict) -> dict:
+    """The parts of a weather document or forecast item built from one Open-Meteo point."""
+    temp = _kelvin(point.get("temperature_2m"))
+    wind = {"speed": point.get("wind_speed_10m") or 0.0, "deg": _int(point.get("wind_direction_10m"))}
+    if point.get("wind_gusts_10m") is not None:
+        wind["gust"] = point["wind_gusts_10m"]
+    return {
+        "main": {
+            "temp": temp,
+            "feels_like": _kelvin(point.get("apparent_temperature", point.get("temperature_2m"))),
+            "temp_min": temp,
+            "temp_max": temp,
+            "pressure": _int(point.get("pressure_msl")),
+            "humidity": _int(point.get("relative_humidity_2m")),
+            "sea_level": _int(point.get("pressure_msl")),
+            "grnd_level": _int(point.get("surface_pressure")),
+        },
+        "weather": [condition(point.get("weather_code"), point.get("is_day"))],
+        "clouds": {"all": _int(point.get("cloud_cover"))},
+        "wind": wind,
+    }
+
+
+def _precipitation(points: List[dict]) -> Dict[str, float]:
+    """Rain (including showers) and, as the rest of the precipitation, snow in mm."""
+    rain = sum((p.get("rain") or 0.0) + (p.get("showers") or 0.0) for p in points)
+    total = sum(p.get("precipitation") or 0.0 for p in points)
+    return {"rain": round(rain, 2), "snow": round(max(total - rain, 0.0), 2)}
+
+
+def _sun(data: dict, dt: int) -> Tuple[Optional[int], Optional[int]]:
+    """Sunrise and sunset of the local day containing ``dt``."""
+    daily = data.get("daily") or {}
+    offset = data.get("utc_offset_seconds", 0)
+    day = (dt + offset) // 86400
+    for sunrise, sunset in zip(daily.get("sunrise", ()), daily.get("sunset", ())):
+        if sunrise is not None and (sunrise + offset) // 86400 == day:
+            return sunrise, sunset
+    return None, None
+
+
+def open_meteo_weather(data: dict) -> dict:
+    """Open-Meteo ``current`` as a ``/data/2.5/weather`` document (no station, so no ``id`` or ``name``)."""
+    current = data["current"]
+    sunrise, sunset = _sun(data, current["time"])
+    document = {
+        "coord": {"lon": data["longitude"], "lat": data["latitude"]},
+        "base": "open-meteo",
+        **_fields(current),
+        "visibility": MAX_VISIBILITY,
+        "dt": current["time"],
+        "sys": {"sunrise": sunrise, "sunset": sunset},
+        "timezone": data.get("utc_offset_seconds", 0),
+        "id": 0,
+        "name": "",
+        "cod": 200,
+    }
+    for kind, volume in _precipitation([current]).items():
+        if volume:
+            document[kind] = {"1h": volume}
+    return document
+
+
+def open_meteo_forecast(data: dict) -> dict:
+    """
+    Open-Meteo ``hourly`` as a ``/data/2.5/forecast`` document: every third
+    hour on the 3-hour UTC grid, with precipitation summed over the 3 hours
+    up to each slot.
+    """
+    hourly = data["hourly"]
+    names = [name for name in hourly if name != "time"]
+    points = {t: {name: hourly[name][i] for name in names} for i, t in enumerate(hourly["time"])}
+    start = data["current"]["time"] // STEP * STEP + STEP
+    items = []
+    for dt in range(start, start + FORECAST_ITEMS * STEP, STEP):
+        point = points.get(dt)
+        if point is None:
+            break
+        item = {
+            "dt": dt,
+            **_fields(point),
+            "visibility": min(_int(point.get("visibility")) or MAX_VISIBILITY, MAX_VISIBILITY),
+            "pop": round((point.get("precipitation_probability") or 0) / 100, 2),
+            "sys": {"pod": "d" if point.get("is_day") else "n"},
+            "dt_txt": datetime.fromtimestamp(dt, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        item["main"]["temp_kf"] = 0
+        window = [points[t] for t in range(dt - STEP + 3600, dt + 1, 3600) if t in points]
+        for kind, volume in _precipitation(window).items():
+            if volume:
+                item[kind] = {"3h": volume}
+        items.append(item)
+    sunrise, sunset = _sun(data, data["current"]["time"])
+    return {
+        "cod": "200",
+        "message": 0,
+        "cnt": len(items),
+        "list": items,
+        "city": {
+            "id": 0,
+            "name": "",
+            "coord": {"lat": data["latitude"], "lon": data["longitude"]},
+            "country": "",
+            "population": 0,
+            "timezone": data.get("utc_offset_seconds", 0),
+            "sunrise": sunrise,
+            "sunset": sunset,
+        },
+    }
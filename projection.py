@@ -0,0 +1,64 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Projection = Callable[[Any], Any]
+
+
+def _normalize(fields: str) -> Tuple[str, ...]:
+    return tuple(sorted({path.strip() for path in fields.split(",") if path.strip()}))
+
+
+def _build_tree(paths: Tuple[str, ...]) -> Dict[str, Optional[dict]]:
+    # None marks "keep the whole value"; it wins over any deeper path
+    tree: Dict[str, Optional[dict]] = {}
+    for path in paths:
+        node = tree
+        keys = path.split(".")
+        for depth, key in enumerate(keys):
+            last = depth == len(keys) - 1
+            if key in node and node[key] is None:
+                break
+            if last:
+                node[key] = None
+            else:
+                node = node.setdefault(key, {})
+    return tree
+
+
+def _compile(tree: Dict[str, Optional[dict]]) -> Projection:
+    steps = tuple((key, _compile(sub) if sub else None) for key, sub in tree.items())
+
+    def project(value: Any) -> Any:
+        # Lists are transparent: "list.main.temp" applies to every forecast item
+        if isinstance(value, list):
+            return [project(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        result = {}
+        for key, sub in steps:
+            if key in value:
+                result[key] = value[key] if sub is None else sub(value[key])
+        return result
+
+    return project
+
+
+def field_key(fields: str) -> str:
+    """Canonical form of a field list: equivalent lists give the same key."""
+    return ",".join(_normalize(fields))
+
+
+@lru_cache(maxsize=256)
+def _compile_paths(paths: Tuple[str, ...]) -> Projection:
+    return _compile(_build_tree(paths))
+
+
+def compile_fields(fields: str) -> Projection:
+    """
+    Compile a comma-separated list of dotted paths into a projection function.
+
+    Plans are cached per distinct field set, so repeated requests only pay
+    for walking the payload.
+    """
+    return _compile_paths(_normalize(fields))
+
@@ -0,0 +1,225 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Sequence
+
+from fastapi import HTTPException
+
+from metrics import Counter, upstream_health
+from onecall import onecall_forecast, onecall_weather
+from openmeteo import forecast_url, open_meteo_forecast, open_meteo_weather
+
+# Providers for coordinate lookups, most preferred first; city lookups use those that support them
+WEATHER_PROVIDERS = [name.strip() for name in os.environ.get("WEATHER_PROVIDERS", "openweathermap").split(",") if name.strip()]
+# A provider with this many failed calls in a row is reported as failing and skipped for PROVIDER_COOLDOWN seconds
+UPSTREAM_FAILURE_THRESHOLD = int(os.environ.get("UPSTREAM_FAILURE_THRESHOLD", "5"))
+PROVIDER_COOLDOWN = float(os.environ.get("PROVIDER_COOLDOWN", "30"))
+# Latency assumed for a provider that has not been called yet
+PROVIDER_DEFAULT_LATENCY_MS = float(os.environ.get("PROVIDER_DEFAULT_LATENCY_MS", "500"))
+# Per-minute call budgets of the upstream plans (0 means unlimited)
+UPSTREAM_CALLS_PER_MINUTE = {
+    "openweathermap": int(os.environ.get("OPENWEATHER_CALLS_PER_MINUTE", "60")),
+    "open-meteo": int(os.environ.get("OPEN_METEO_CALLS_PER_MINUTE", "600")),
+    "ip-api": int(os.environ.get("IP_API_CALLS_PER_MINUTE", "45")),
+}
+
+# How much a provider's error rate inflates its latency score: 10% errors double it
+ERROR_PENALTY = 10.0
+
+# (url, provider, endpoint) -> decoded JSON
+FetchJson = Callable[[str, str, str], Awaitable[dict]]
+
+provider_failures = Counter("weather_provider_failures_total", "Lookups a weather provider failed, passing them to the next provider in line.", ("provider",))
+
+
+class ProviderError(Exception):
+    """The provider failed or is unusable, as opposed to the lookup itself being invalid."""
+
+
+class Provider:
+    """
+    An upstream weather source normalized to the OWM ``/data/2.5`` documents.
+
+    ``coordinate`` returns the document of ``kind`` (``weather`` or
+    ``forecast``), plus the other one when the provider gets both from one
+    request. Errors that another provider could avoid raise ``ProviderError``;
+    invalid lookups raise ``HTTPException`` as before.
+    """
+
+    name = ""
+    cities = False
+
+    def __init__(self, fetch_json: FetchJson):
+        self.fetch_json = fetch_json
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def coordinate(self, kind: str, lat: float, lon: float) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    async def city(self, kind: str, query: str) -> dict:
+        raise ProviderError(f"{self.name} has no city lookup")
+
+    async def _get(self, url: str, endpoint: str) -> dict:
+        try:
+            return await self.fetch_json(url, self.name, endpoint)
+        except Exception as e:
+            raise ProviderError(str(e) or type(e).__name__) from e
+
+    async def _once(self, key: Hashable, fetch: Callable[[], Awaitable[Dict[str, dict]]]) -> Dict[str, dict]:
+        """Concurrent identical requests (e.g. weather and forecast misses for one point) share one call."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(fetch())
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+
+class OpenWeatherMap(Provider):
+    """OpenWeatherMap ``/data/2.5`` endpoints, or One Call 3.0 in ``onecall`` mode."""
+
+    name = "openweathermap"
+    cities = True
+    MODES = ("split", "onecall")
+
+    def __init__(self, fetch_json: FetchJson, base_url: str, api_key: str, mode: str = "split"):
+        if mode not in self.MODES:
+            raise ValueError(f"OPENWEATHER_API_MODE must be one of {', '.join(self.MODES)}, not {mode!r}")
+        super().__init__(fetch_json)
+        self.base_url = base_url
+        self.api_key = api_key
+        self.mode = mode
+
+    async def coordinate(self, kind: str, lat: float, lon: float) -> Dict[str, dict]:
+        if self.mode == "onecall":
+            return await self._once((round(lat, 4), round(lon, 4)), lambda: self._onecall(lat, lon))
+        return {kind: await self._document(kind, f"lat={lat}&lon={lon}", f"{kind.capitalize()} data not found")}
+
+    async def city(self, kind: str, query: str) -> dict:
+        return await self._document(kind, f"q={query}", "City not found")
+
+    async def _document(self, kind: str, params: str, not_found: str) -> dict:
+        data = await self._get(f"{self.base_url}/data/2.5/{kind}?{params}&appid={self.api_key}", kind)
+        self._check(data, not_found)
+        return data
+
+    async def _onecall(self, lat: float, lon: float) -> Dict[str, dict]:
+        data = await self._get(f"{self.base_url}/data/3.0/onecall?lat={lat}&lon={lon}&exclude=minutely,alerts&appid={self.api_key}", "onecall")
+        self._check(data, "Weather data not found")
+        if "current" not in data:
+            raise ProviderError("One Call response without current weather")
+        return {"weather": onecall_weather(data), "forecast": onecall_forecast(data)}
+
+    @staticmethod
+    def _check(data: dict, not_found: str) -> None:
+        # Error bodies carry the HTTP status as ``cod``; 200 is an int for weather and a string for forecasts
+        cod = str(data.get("cod", "200"))
+        if cod == "200":
+            return
+        if cod in ("401", "429") or cod.startswith("5"):
+            raise ProviderError(data.get("message", f"status {cod}"))
+        raise HTTPException(status_code=400, detail=data.get("message", not_found))
+
+
+class OpenMeteo(Provider):
+    """Open-Meteo forecast API (no key); one request returns current weather and the forecast."""
+
+    name = "open-meteo"
+
+    def __init__(self, fetch_json: FetchJson, base_url: str):
+        super().__init__(fetch_json)
+        self.base_url = base_url
+
+    async def coordinate(self, kind: str, lat: float, lon: float) -> Dict[str, dict]:
+        return await self._once((round(lat, 4), round(lon, 4)), lambda: self._forecast(lat, lon))
+
+    async def _forecast(self, lat: float, lon: float) -> Dict[str, dict]:
+        data = await self._get(forecast_url(self.base_url, lat, lon), "open-meteo")
+        if data.get("error"):
+            raise HTTPException(status_code=400, detail=data.get("reason", "Weather data not found"))
+        if "current" not in data or "hourly" not in data:
+            raise ProviderError("Open-Meteo response without current or hourly data")
+        return {"weather": open_meteo_weather(data), "forecast": open_meteo_forecast(data)}
+
+
+class ProviderRouter:
+    """
+    Orders the providers for every lookup and falls back down the order when
+    one fails.
+
+    Providers whose per-minute budget is spent, or that are cooling down after
+    ``UPSTREAM_FAILURE_THRESHOLD`` failures in a row, go last. The rest are
+    ranked by rolling latency inflated by their error rate, with the configured
+    order breaking ties. The figures come from the upstream metrics transport,
+    so ranking costs a few attribute reads per provider.
+    """
+
+    def __init__(self, providers: Sequence[Provider]):
+        if not providers:
+            raise ValueError("WEATHER_PROVIDERS names no provider")
+        self.providers = list(providers)
+
+    @classmethod
+    def from_names(cls, names: Sequence[str], providers: Sequence[Provider]) -> "ProviderRouter":
+        by_name = {provider.name: provider for provider in providers}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown weather provider {', '.join(unknown)}; choose from {', '.join(by_name)}")
+        return cls([by_name[name] for name in names])
+
+    def available(self, provider: Provider) -> bool:
+        health = upstream_health.get(provider.name)
+        if health is None:
+            return True
+        budget = UPSTREAM_CALLS_PER_MINUTE.get(provider.name, 0)
+        if budget and health.calls_this_minute() >= budget:
+            return False
+        failing = health.consecutive_failures >= UPSTREAM_FAILURE_THRESHOLD
+        return not (failing and time.time() - (health.last_failure or 0) < PROVIDER_COOLDOWN)
+
+    def score(self, provider: Provider) -> float:
+        """Expected seconds per call, inflated by the error rate; lower is better."""
+        health = upstream_health.get(provider.name)
+        if health is None or health.latency is None:
+            return PROVIDER_DEFAULT_LATENCY_MS / 1000
+        return health.latency * (1 + ERROR_PENALTY * health.error_rate())
+
+    def ranked(self, cities: bool = False) -> List[Provider]:
+        candidates = [(i, p) for i, p in enumerate(self.providers) if p.cities or not cities]
+        candidates.sort(key=lambda c: (not self.available(c[1]), self.score(c[1]), c[0]))
+        return [provider for _, provider in candidates]
+
+    async def coordinate(self, kind: str, lat: float, lon: float) -> Dict[str, dict]:
+        return await self._first(self.ranked(), lambda provider: provider.coordinate(kind, lat, lon))
+
+    async def city(self, kind: str, query: str) -> dict:
+        return await self._first(self.ranked(cities=True), lambda provider: provider.city(kind, query))
+
+    async def _first(self, providers: List[Provider], call: Callable[[Provider], Awaitable]):
+        errors = []
+        for provider in providers:
+            try:
+                return await call(provider)
+            except ProviderError as e:
+                provider_failures.labels(provider.name).inc()
+                errors.append(f"{provider.name}: {e}")
+        raise ProviderError("; ".join(errors) if errors else "no configured provider supports this lookup")
+
+    def stats(self) -> List[dict]:
+        """The providers in the order the next coordinate lookup would try them."""
+        report = []
+        for provider in self.ranked():
+            health = upstream_health.get(provider.name)
+            budget = UPSTREAM_CALLS_PER_MINUTE.get(provider.name, 0)
+            calls = health.calls_this_minute() if health else 0
+            report.append({
+                "name": provider.name,
+                "available": self.available(provider),
+                "score_ms": round(self.score(provider) * 1000, 1),
+                "latency_ms": round(health.latency * 1000, 1) if health and health.latency is not None else None,
+                "error_rate": round(health.error_rate(), 4) if health else 0.0,
+                "consecutive_failures": health.consecutive_failures if health else 0,
+                "calls_this_minute": calls,
+                "remaining_this_minute": max(budget - calls, 0) if budget else None,
+                "cities": provider.cities,
+            })
+        return report
@@ -0,0 +1,71 @@
+import os
+from typing import Dict, List, Tuple
+
+from cache import TTLCache
+from metrics import http_in_flight, loop_lag_last, upstream_health
+from providers import UPSTREAM_CALLS_PER_MINUTE, UPSTREAM_FAILURE_THRESHOLD
+
+# Saturation limits past which /api/ready answers 503 so the load balancer sheds traffic
+READY_MAX_POOL_UTILIZATION = float(os.environ.get("READY_MAX_POOL_UTILIZATION", "0.9"))
+READY_MAX_POOL_QUEUE = int(os.environ.get("READY_MAX_POOL_QUEUE", "50"))
+READY_MAX_IN_FLIGHT = int(os.environ.get("READY_MAX_IN_FLIGHT", "512"))
+READY_MAX_LOOP_LAG_MS = float(os.environ.get("READY_MAX_LOOP_LAG_MS", "250"))
+
+
+def cache_report(cache: TTLCache) -> dict:
+    lookups = cache.hits + cache.misses
+    return {
+        "entries": len(cache),
+        "fill": round(len(cache) / cache.max_entries, 4),
+        "hit_ratio": round(cache.hits / lookups, 4) if lookups else None,
+        "fetching": cache.fetching,
+    }
+
+
+def upstream_report() -> Dict[str, dict]:
+    report = {}
+    for provider in sorted(set(UPSTREAM_CALLS_PER_MINUTE) | set(upstream_health)):
+        health = upstream_health.get(provider)
+        budget = UPSTREAM_CALLS_PER_MINUTE.get(provider, 0)
+        calls = health.calls_this_minute() if health else 0
+        failures = health.consecutive_failures if health else 0
+        report[provider] = {
+            "state": "failing" if failures >= UPSTREAM_FAILURE_THRESHOLD else "ok",
+            "consecutive_failures": failures,
+            "last_success": health.last_success if health else None,
+            "last_failure": health.last_failure if health else None,
+            "calls_this_minute": calls,
+            "remaining_this_minute": max(budget - calls, 0) if budget else None,
+        }
+    return report
+
+
+def readiness(pool: dict, caches: Dict[str, TTLCache]) -> Tuple[bool, dict]:
+    """
+    Whether this process should take traffic, and why. Only local saturation
+    (connection pool, requests in flight, event-loop lag) makes it not ready;
+    upstream failures and spent budgets are reported but would affect every
+    node alike. Reads counters only: no upstream calls, no scans.
+    """
+    failing: List[str] = []
+    utilization = pool["active"] / pool["max"] if pool.get("max") else 0.0
+    if utilization >= READY_MAX_POOL_UTILIZATION:
+        failing.append(f"upstream pool {utilization:.0%} busy")
+    if pool["queued"] > READY_MAX_POOL_QUEUE:
+        failing.append(f"{pool['queued']} requests waiting for an upstream connection")
+    in_flight = int(http_in_flight.labels().value)
+    if in_flight > READY_MAX_IN_FLIGHT:
+        failing.append(f"{in_flight} requests in flight")
+    lag_ms = loop_lag_last.labels().value * 1000
+    if lag_ms > READY_MAX_LOOP_LAG_MS:
+        failing.append(f"event loop lag {lag_ms:.0f} ms")
+    report = {
+        "ready": not failing,
+        "failing": failing,
+        "pool": {**pool, "utilization": round(utilization, 4)},
+        "requests_in_flight": in_flight,
+        "event_loop_lag_ms": round(lag_ms, 2),
+        "caches": {name: cache_report(cache) for name, cache in caches.items()},
+        "upstream": upstream_report(),
+    }
+    return not failing, report
@@ -0,0 +1,121 @@
+from enum import Enum
+from typing import Dict, Sequence
+
+import numpy as np
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+# 1970-01-05 was a Monday; weeks start on Monday 00:00 UTC
+WEEK_ORIGIN = 4 * SECONDS_PER_DAY
+
+
+class Interval(str, Enum):
+    hour = "hour"
+    day = "day"
+    week = "week"
+
+
+class Aggregate(str, Enum):
+    min = "min"
+    max = "max"
+    mean = "mean"
+    p95 = "p95"
+
+
+INTERVAL_SECONDS = {Interval.hour: SECONDS_PER_HOUR, Interval.day: SECONDS_PER_DAY, Interval.week: 7 * SECONDS_PER_DAY}
+
+
+def bucket_start(dt: np.ndarray, interval: Interval) -> np.ndarray:
+    """Start (unix seconds, UTC) of the bucket each timestamp falls in."""
+    width = INTERVAL_SECONDS[interval]
+    origin = WEEK_ORIGIN if interval == Interval.week else 0
+    return (dt - origin) // width * width + origin
+
+
+def rollup_dtype(columns: Sequence[str]) -> np.dtype:
+    """One record per (location, hour): per column count, sum, min and max."""
+    fields = [("location", np.uint32), ("bucket", np.int64)]
+    for name in columns:
+        fields += [(f"{name}_count", np.uint32), (f"{name}_sum", np.float64), (f"{name}_min", np.float32), (f"{name}_max", np.float32)]
+    return np.dtype(fields)
+
+
+def _group(keys: np.ndarray):
+    # Sort once; ``starts`` marks where each distinct key begins
+    order = np.argsort(keys, kind="stable")
+    ordered = keys[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]]) if len(ordered) else np.zeros(0, dtype=np.intp)
+    return order, ordered, starts
+
+
+def _reduce(values: np.ndarray, starts: np.ndarray, ufunc, empty: float) -> np.ndarray:
+    if not len(values):
+        return np.zeros(0, dtype=values.dtype)
+    return ufunc.reduceat(np.where(np.isnan(values), empty, values), starts)
+
+
+def hourly_rollup(location: np.ndarray, dt: np.ndarray, values: Dict[str, np.ndarray], columns: Sequence[str]) -> np.ndarray:
+    """Aggregate raw rows into hourly partials, sorted by location then hour."""
+    hour = bucket_start(dt.astype(np.int64), Interval.hour)
+    keys = location.astype(np.int64) << 40 | (hour // SECONDS_PER_HOUR)
+    order, ordered, starts = _group(keys)
+    result = np.zeros(len(starts), dtype=rollup_dtype(columns))
+    result["location"] = ordered[starts] >> 40
+    result["bucket"] = (ordered[starts] & ((1 << 40) - 1)) * SECONDS_PER_HOUR
+    for name in columns:
+        column = values[name][order].astype(np.float64)
+        present = ~np.isnan(column)
+        result[f"{name}_count"] = np.add.reduceat(present.astype(np.uint32), starts) if len(starts) else 0
+        result[f"{name}_sum"] = _reduce(column, starts, np.add, 0.0)
+        result[f"{name}_min"] = _reduce(column, starts, np.minimum, np.inf)
+        result[f"{name}_max"] = _reduce(column, starts, np.maximum, -np.inf)
+    return result
+
+
+def combine(partials: np.ndarray, interval: Interval, aggregate: Aggregate, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Merge hourly partials (of one location) into ``interval`` buckets and
+    return ``dt`` (bucket starts), one aggregated array per column and the
+    sample count per column (``<name>_count``).
+    """
+    buckets = bucket_start(partials["bucket"], interval)
+    order, ordered, starts = _group(buckets)
+    merged = partials[order]
+    result = {"dt": ordered[starts]}
+    for name in columns:
+        count = np.add.reduceat(merged[f"{name}_count"].astype(np.int64), starts) if len(starts) else np.zeros(0, np.int64)
+        if aggregate == Aggregate.min:
+            value = np.minimum.reduceat(merged[f"{name}_min"].astype(np.float64), starts) if len(starts) else np.zeros(0)
+        elif aggregate == Aggregate.max:
+            value = np.maximum.reduceat(merged[f"{name}_max"].astype(np.float64), starts) if len(starts) else np.zeros(0)
+        else:
+            total = np.add.reduceat(merged[f"{name}_sum"], starts) if len(starts) else np.zeros(0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                value = total / count
+        result[name] = np.where(count > 0, value, np.nan)
+        result[f"{name}_count"] = count
+    return result
+
+
+def percentile(dt: np.ndarray, values: Dict[str, np.ndarray], interval: Interval, columns: Sequence[str], q: float = 0.95) -> Dict[str, np.ndarray]:
+    """
+    Nearest-rank percentile per bucket, from raw rows. Percentiles cannot be
+    merged from partials, so this reads the raw columns; one lexsort per
+    column keeps it vectorized.
+    """
+    buckets = bucket_start(dt.astype(np.int64), interval)
+    distinct = np.unique(buckets)
+    result = {"dt": distinct}
+    for name in columns:
+        column = values[name].astype(np.float64)
+        present = ~np.isnan(column)
+        b, v = buckets[present], column[present]
+        order = np.lexsort((v, b))
+        b, v = b[order], v[order]
+        slot = np.searchsorted(distinct, b)
+        count = np.bincount(slot, minlength=len(distinct))
+        first = np.concatenate([[0], np.cumsum(count)[:-1]]) if len(distinct) else np.zeros(0, dtype=np.int64)
+        rank = np.maximum(np.ceil(q * count).astype(np.int64) - 1, 0)
+        result[name] = np.where(count > 0, v[np.minimum(first + rank, max(len(v) - 1, 0))] if len(v) else np.nan, np.nan)
+        result[f"{name}_count"] = count
+    return result
@@ -1,86 +1,218 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional, Tuple
+
 from fastapi import HTTPException, Request
 import httpx
 from models import LocationResponse, WeatherResponse, ForecastResponse
+from cache import CacheEntry, TTLCache
+from cassette import cassette
+from metrics import Gauge, UpstreamMetricsTransport, pool_state, pool_usage
+from timing import UpstreamTrace, phase
+from columnar import pack_forecast
+from providers import WEATHER_PROVIDERS, OpenMeteo, OpenWeatherMap, ProviderError, ProviderRouter
+from spatial import SpatialIndex
+from history import history, location_name
+from rollups import Aggregate, Interval
+
+OPENWEATHER_API_KEY = os.environ.get("OPENWEATHER_API_KEY", "26ca4d17ab7073188de43040d3cbaf93")
+OPENWEATHER_BASE_URL = os.environ.get("OPENWEATHER_BASE_URL", "https://api.openweathermap.org")
+IP_API_BASE_URL = os.environ.get("IP_API_BASE_URL", "http://ip-api.com")
+# "onecall" gets current weather and forecast for a coordinate from one One Call 3.0 request;
+# "split" uses /data/2.5/weather and /data/2.5/forecast. City lookups always use the latter.
+OPENWEATHER_API_MODE = os.environ.get("OPENWEATHER_API_MODE", "split")
+OPEN_METEO_BASE_URL = os.environ.get("OPEN_METEO_BASE_URL", "https://api.open-meteo.com")
+
+# OWM refreshes current conditions roughly every 10 minutes and forecasts every 3 hours
+WEATHER_CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", "600"))
+FORECAST_CACHE_TTL = float(os.environ.get("FORECAST_CACHE_TTL", "1800"))
+# "columnar" keeps cached forecasts as compact struct-of-arrays instead of JSON dicts
+FORECAST_CACHE_FORMAT = os.environ.get("FORECAST_CACHE_FORMAT", "dict")
+
+weather_cache = TTLCache(ttl=WEATHER_CACHE_TTL)
+forecast_cache = TTLCache(
+    ttl=FORECAST_CACHE_TTL, pack=pack_forecast if FORECAST_CACHE_FORMAT == "columnar" else None
+)
+
+# Opt-in: a coordinate miss may be answered by a fresh entry up to this many meters away (0, the default, disables it)
+NEARBY_CACHE_RADIUS = float(os.environ.get("NEARBY_CACHE_RADIUS", "0"))
+weather_index = SpatialIndex(weather_cache, NEARBY_CACHE_RADIUS)
+forecast_index = SpatialIndex(forecast_cache, NEARBY_CACHE_RADIUS)
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP client so upstream connections are pooled across requests."""
+    global _client
+    if _client is None or _client.is_closed:
+        # With CASSETTE_MODE set, upstream calls are recorded to or replayed from a cassette
+        transport = UpstreamMetricsTransport(cassette or httpx.AsyncHTTPTransport())
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(10.0), transport=transport)
+    return _client
+
+Gauge("upstream_pool_connections", "Pooled upstream connections by state; queued are requests waiting for one.", ("state",), collect=lambda: pool_usage(_client))
+
+def upstream_pool() -> dict:
+    """Connection pool state of the shared client, without creating it."""
+    return pool_state(_client)
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
-OPENWEATHER_API_KEY = "26ca4d17ab7073188de43040d3cbaf93"
+async def _fetch_json(url: str, provider: str, endpoint: str) -> dict:
+    # ``provider`` and ``endpoint`` label the call in the upstream metrics
+    extensions = {"provider": provider, "endpoint": endpoint}
+    trace = UpstreamTrace.begin()
+    if trace is not None:
+        extensions["trace"] = trace
+    response = await get_client().get(url, extensions=extensions)
+    if trace is not None:
+        trace.finish()
+    # Server errors and rate limiting fail the call, so providers can fall back; the URL
+    # (and API key) stay out of the message, which reaches clients in error details
+    if response.status_code >= 500 or response.status_code == 429:
+        raise httpx.HTTPStatusError(f"upstream status {response.status_code}", request=response.request, response=response)
+    with phase("decode"):
+        return response.json()
+
+def _coord_key(lat: float, lon: float) -> tuple:
+    # ~11 m precision; nearby requests share the same upstream entry
+    return ("coord", round(lat, 4), round(lon, 4))
+
+def _city_query(city: str, country: str = None) -> str:
+    return f"{city},{country}" if country else city
 
 async def get_location_data(request: Request):
     try:
         forwarded_for = request.headers.get("x-forwarded-for")
         real_ip = request.headers.get("x-real-ip")
         client_ip = forwarded_for or real_ip or request.client.host
-        
+
         if client_ip in ["127.0.0.1", "localhost", "::1"]:
-            url = "http://ip-api.com/json/"
+            url = f"{IP_API_BASE_URL}/json/"
         else:
-            url = f"http://ip-api.com/json/{client_ip}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            data = response.json()
-            
-        return data
+            url = f"{IP_API_BASE_URL}/json/{client_ip}"
+
+        return await _fetch_json(url, "ip-api", "location")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get location: {str(e)}")
 
-async def get_weather_data(lat: float, lon: float):
+router = ProviderRouter.from_names(WEATHER_PROVIDERS, (
+    OpenWeatherMap(_fetch_json, OPENWEATHER_BASE_URL, OPENWEATHER_API_KEY, OPENWEATHER_API_MODE),
+    OpenMeteo(_fetch_json, OPEN_METEO_BASE_URL),
+))
+
+async def _fetch_coordinate(key: tuple, lat: float, lon: float, kind: str) -> dict:
     try:
-        url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            data = response.json()
-            
-        if data.get("cod") != 200:
-            raise HTTPException(status_code=400, detail=data.get("message", "Weather data not found"))
-            
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get weather data: {str(e)}")
+        documents = await router.coordinate(kind, lat, lon)
+    except ProviderError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get {kind} data: {str(e)}")
+    # Providers answering both kinds at once fill the other cache too, unless it has an entry or a fetch of its own
+    for other, cache, index in (("weather", weather_cache, weather_index), ("forecast", forecast_cache, forecast_index)):
+        if other != kind and other in documents and not cache.is_fetching(key) and cache.get(key) is None:
+            index.add(cache.set(key, documents[other]).key)
+            if other == "weather":
+                history.record(key, documents[other])
+    if kind == "weather":
+        # Only enqueues; the history writer thread does the disk work
+        history.record(key, documents[kind])
+    return documents[kind]
 
-async def get_forecast_data(lat: float, lon: float):
+async def _fetch_city(key: tuple, query: str, kind: str) -> dict:
     try:
-        url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            data = response.json()
-            
-        if data.get("cod") != "200":
-            raise HTTPException(status_code=400, detail=data.get("message", "Forecast data not found"))
-            
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get forecast data: {str(e)}")
+        data = await router.city(kind, query)
+    except ProviderError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get {kind} data: {str(e)}")
+    if kind == "weather":
+        history.record(key, data)
+    return data
+
+async def get_weather_entry(lat: float, lon: float) -> CacheEntry:
+    key = _coord_key(lat, lon)
+    entry = await weather_cache.get_or_fetch(key, lambda: _fetch_coordinate(key, lat, lon, "weather"))
+    weather_index.add(entry.key)
+    return entry
+
+def peek_weather_entry(lat: float, lon: float) -> Optional[CacheEntry]:
+    """The cached current weather for a coordinate, without fetching."""
+    return weather_cache.get(_coord_key(lat, lon))
+
+async def get_forecast_entry(lat: float, lon: float) -> CacheEntry:
+    key = _coord_key(lat, lon)
+    entry = await forecast_cache.get_or_fetch(key, lambda: _fetch_coordinate(key, lat, lon, "forecast"))
+    forecast_index.add(entry.key)
+    return entry
+
+async def nearby_entry(
+    index: SpatialIndex, lat: float, lon: float, fetch: Callable[[float, float], Awaitable[CacheEntry]]
+) -> Tuple[CacheEntry, Optional[float]]:
+    """
+    The exact cached entry if there is one, else the nearest fresh entry within
+    the index radius, else a fetched one. The distance in meters is returned
+    when a nearby entry stands in for the requested point.
+    """
+    with phase("cache"):
+        found = index.nearest(lat, lon) if index.cache.get(_coord_key(lat, lon)) is None else None
+    if found is not None:
+        return found
+    return await fetch(lat, lon), None
+
+async def get_weather_entry_nearby(lat: float, lon: float) -> Tuple[CacheEntry, Optional[float]]:
+    return await nearby_entry(weather_index, lat, lon, get_weather_entry)
+
+async def get_forecast_entry_nearby(lat: float, lon: float) -> Tuple[CacheEntry, Optional[float]]:
+    return await nearby_entry(forecast_index, lat, lon, get_forecast_entry)
+
+async def get_here_entries(request: Request) -> Tuple[dict, CacheEntry, CacheEntry]:
+    """
+    The caller's IP location and the current weather and forecast entries
+    there; the two weather lookups run concurrently once the location is known.
+    """
+    location = await get_location_data(request)
+    lat, lon = location.get("lat"), location.get("lon")
+    if lat is None or lon is None:
+        raise HTTPException(status_code=400, detail=location.get("message") or "Could not locate the client IP")
+    (weather, _), (forecast, _) = await asyncio.gather(
+        get_weather_entry_nearby(lat, lon), get_forecast_entry_nearby(lat, lon)
+    )
+    return location, weather, forecast
+
+def peek_forecast_entry(lat: float, lon: float) -> Optional[CacheEntry]:
+    """The cached forecast for a coordinate, without fetching."""
+    return forecast_cache.get(_coord_key(lat, lon))
+
+async def get_weather_by_city_entry(city: str, country: str = None) -> CacheEntry:
+    query = _city_query(city, country)
+    key = ("city", query.lower())
+    return await weather_cache.get_or_fetch(key, lambda: _fetch_city(key, query, "weather"))
+
+async def get_forecast_by_city_entry(city: str, country: str = None) -> CacheEntry:
+    query = _city_query(city, country)
+    key = ("city", query.lower())
+    return await forecast_cache.get_or_fetch(key, lambda: _fetch_city(key, query, "forecast"))
+
+def history_key(lat: Optional[float] = None, lon: Optional[float] = None, city: Optional[str] = None, country: Optional[str] = None) -> tuple:
+    """The cache key (and so history location) of a coordinate, or of a city when no coordinate is given."""
+    if lat is not None and lon is not None:
+        return _coord_key(lat, lon)
+    return ("city", _city_query(city, country).lower())
+
+def get_history_columns(key: tuple, start: int, end: int, interval: Optional[Interval] = None, aggregate: Aggregate = Aggregate.mean) -> Tuple[str, dict]:
+    """Stored observations for a location, raw or rolled up (blocking: reads memory-mapped segments)."""
+    columns = history.rollup(key, start, end, interval, aggregate) if interval else history.query(key, start, end)
+    return location_name(key), columns
+
+async def get_weather_data(lat: float, lon: float):
+    return (await get_weather_entry(lat, lon)).data
+
+async def get_forecast_data(lat: float, lon: float):
+    return (await get_forecast_entry(lat, lon)).data
 
 async def get_weather_by_city_data(city: str, country: str = None):
-    try:
-        query = f"{city},{country}" if country else city
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={query}&appid={OPENWEATHER_API_KEY}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            data = response.json()
-            
-        if data.get("cod") != 200:
-            raise HTTPException(status_code=400, detail=data.get("message", "City not found"))
-            
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get weather data: {str(e)}")
+    return (await get_weather_by_city_entry(city, country)).data
 
 async def get_forecast_by_city_data(city: str, country: str = None):
-    try:
-        query = f"{city},{country}" if country else city
-        url = f"https://api.openweathermap.org/data/2.5/forecast?q={query}&appid={OPENWEATHER_API_KEY}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            data = response.json()
-            
-        if data.get("cod") != "200":
-            raise HTTPException(status_code=400, detail=data.get("message", "City not found"))
-            
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get forecast data: {str(e)}")
\ No newline at end of file
+    return (await get_forecast_by_city_entry(city, country)).data
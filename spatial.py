@@ -0,0 +1,138 @@
+import math
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from cache import CacheEntry, TTLCache
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371008.8
+MAX_PRECISION = 9
+
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    """Standard base-32 geohash of a coordinate."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        target, coord = (lon_range, lon) if even else (lat_range, lat)
+        middle = (target[0] + target[1]) / 2
+        value <<= 1
+        if coord >= middle:
+            value |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width of a geohash cell in degrees."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def neighbours(lat: float, lon: float, precision: int) -> List[str]:
+    """The cell containing a coordinate and its eight neighbours."""
+    height, width = cell_size(precision)
+    cells = []
+    for dlat in (-height, 0.0, height):
+        shifted_lat = lat + dlat
+        if not -90 <= shifted_lat <= 90:
+            continue
+        for dlon in (-width, 0.0, width):
+            shifted_lon = (lon + dlon + 180) % 360 - 180
+            cells.append(geohash(shifted_lat, shifted_lon, precision))
+    return list(dict.fromkeys(cells))
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def precision_for(radius_m: float) -> int:
+    """
+    The finest geohash precision whose cells are at least ``radius_m`` tall,
+    so the 3x3 block around a point covers the radius north-south (and
+    east-west away from the poles).
+    """
+    for precision in range(MAX_PRECISION, 0, -1):
+        height, _ = cell_size(precision)
+        if math.radians(height) * EARTH_RADIUS_M >= radius_m:
+            return precision
+    return 1
+
+
+class SpatialIndex:
+    """
+    Geohash index over the coordinate keys (``("coord", lat, lon)``) of a
+    ``TTLCache``, used to answer a miss with a fresh entry a short distance
+    away. Keys whose entries have expired or been evicted are pruned lazily.
+    """
+
+    def __init__(self, cache: TTLCache, radius_m: float):
+        self.cache = cache
+        self.radius_m = radius_m
+        self.precision = precision_for(radius_m) if radius_m > 0 else MAX_PRECISION
+        self._cells: Dict[str, Set[Hashable]] = {}
+        self.hits = 0
+        self.lookups = 0
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._cells.values())
+
+    def add(self, key: Hashable) -> None:
+        if isinstance(key, tuple) and key[0] == "coord":
+            self._cells.setdefault(geohash(key[1], key[2], self.precision), set()).add(key)
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[CacheEntry, float]]:
+        """
+        A fresh entry within the radius, and its distance in meters. The
+        point's own cell is searched first and the first entry in range wins.
+        Candidates are peeked, so only the entry that answers is promoted in
+        the cache's LRU order.
+        """
+        if self.radius_m <= 0:
+            return None
+        self.lookups += 1
+        own = geohash(lat, lon, self.precision)
+        cells = [own] + [cell for cell in neighbours(lat, lon, self.precision) if cell != own]
+        for cell in cells:
+            keys = self._cells.get(cell)
+            if not keys:
+                continue
+            found = None
+            for key in list(keys):
+                entry = self.cache.peek(key)
+                if entry is None:
+                    keys.discard(key)
+                    continue
+                distance = distance_m(lat, lon, key[1], key[2])
+                if distance <= self.radius_m:
+                    found = (self.cache.get(key) or entry, distance)
+                    break
+            if not keys:
+                del self._cells[cell]
+            if found is not None:
+                self.hits += 1
+                return found
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "radius_m": self.radius_m,
+            "precision": self.precision,
+            "indexed": len(self),
+            "lookups": self.lookups,
+            "nearby_hits": self.hits,
+        }
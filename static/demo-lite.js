@@ -0,0 +1,231 @@
+let map;
+let currentLat, currentLon;
+
+function showLoading() {
+    document.getElementById('loading').style.display = 'block';
+}
+
+function hideLoading() {
+    document.getElementById('loading').style.display = 'none';
+}
+
+function showError(message) {
+    const errorDiv = document.getElementById('error');
+    errorDiv.textContent = message;
+    errorDiv.style.display = 'block';
+    setTimeout(() => {
+        errorDiv.style.display = 'none';
+    }, 5000);
+}
+
+async function getCurrentLocation() {
+    showLoading();
+    try {
+        const response = await fetch('/get-location');
+        const data = await response.json();
+
+        console.log('Location data received:', data); // Debug log
+
+        if (data.status === 'success' || data.lat) {
+            // Display location info
+            document.getElementById('city').textContent = data.city || 'Unknown';
+            document.getElementById('region').textContent = data.regionName || data.region || 'Unknown';
+            document.getElementById('latitude').textContent = data.lat ? data.lat.toFixed(6) : 'Unknown';
+            document.getElementById('longitude').textContent = data.lon ? data.lon.toFixed(6) : 'Unknown';
+
+            // Store coordinates
+            currentLat = data.lat;
+            currentLon = data.lon;
+
+            // Initialize map if coordinates exist
+            if (data.lat && data.lon) {
+                initMap(data.lat, data.lon, data.city || 'Your Location');
+            }
+        } else {
+            showError('Failed to get location information. Response: ' + JSON.stringify(data));
+        }
+    } catch (error) {
+        showError('Error getting location: ' + error.message);
+    }
+    hideLoading();
+}
+
+function initMap(lat, lon, city) {
+    if (map) {
+        map.remove();
+    }
+
+    map = L.map('map').setView([lat, lon], 13);
+
+    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        attribution: '© OpenStreetMap contributors'
+    }).addTo(map);
+
+    L.marker([lat, lon]).addTo(map)
+        .bindPopup(`📍 ${city}<br>Lat: ${lat.toFixed(4)}, Lon: ${lon.toFixed(4)}`)
+        .openPopup();
+}
+
+async function getWeatherCondition() {
+    if (!currentLat || !currentLon) {
+        showError('Please get your location first');
+        return;
+    }
+
+    showLoading();
+    try {
+        const response = await fetch(`/get-weather?lat=${currentLat}&lon=${currentLon}`);
+        const data = await response.json();
+
+        console.log('Weather data received:', data); // Debug log
+
+        if (data.cod === 200) {
+            // Hide the initial message
+            document.getElementById('weatherContent').style.display = 'none';
+
+            // Display weather info
+            const temp = Math.round(data.main.temp - 273.15); // Convert Kelvin to Celsius
+            const feelsLike = Math.round(data.main.feels_like - 273.15);
+
+            document.getElementById('weatherMain').textContent = data.weather[0].main;
+            document.getElementById('weatherDesc').textContent = data.weather[0].description;
+            document.getElementById('temperature').textContent = `${temp}°C`;
+            document.getElementById('feelsLike').textContent = `${feelsLike}°C`;
+            document.getElementById('humidity').textContent = `${data.main.humidity}%`;
+            document.getElementById('windSpeed').textContent = `${data.wind.speed} m/s`;
+            document.getElementById('windDirection').textContent = data.wind.deg || 'N/A';
+
+            // Set weather icon
+            const weatherIcons = {
+                'Clear': '☀️',
+                'Clouds': '☁️',
+                'Rain': '🌧️',
+                'Drizzle': '🌦️',
+                'Thunderstorm': '⛈️',
+                'Snow': '❄️',
+                'Mist': '🌫️',
+                'Fog': '🌫️'
+            };
+            document.getElementById('weatherIcon').textContent = weatherIcons[data.weather[0].main] || '🌤️';
+
+            // Show weather cards
+            document.getElementById('weatherCards').style.display = 'grid';
+
+        } else {
+            showError('Failed to get weather information: ' + (data.message || 'Unknown error'));
+        }
+    } catch (error) {
+        console.error('Weather error:', error);
+        showError('Error getting weather: ' + error.message);
+    }
+    hideLoading();
+}
+
+async function getWeatherForecast() {
+    if (!currentLat || !currentLon) {
+        showError('Please get your location first');
+        return;
+    }
+
+    showLoading();
+    try {
+        const response = await fetch(`/get-forecast?lat=${currentLat}&lon=${currentLon}`);
+        const data = await response.json();
+
+        console.log('Forecast data received:', data); // Debug log
+
+        if (data.cod === "200") {
+            // Hide the initial message
+            document.getElementById('forecastContent').style.display = 'none';
+
+            // Show the forecast container
+            document.getElementById('forecastResult').style.display = 'block';
+
+            // Process forecast data
+            const forecastDays = document.getElementById('forecastDays');
+            forecastDays.innerHTML = '';
+
+            // Group forecasts by day
+            const dailyForecasts = {};
+            const today = new Date().toDateString();
+
+            data.list.forEach(forecast => {
+                const date = new Date(forecast.dt * 1000);
+                const dayKey = date.toDateString();
+
+                // Skip today's forecasts
+                if (dayKey === today) return;
+
+                if (!dailyForecasts[dayKey]) {
+                    dailyForecasts[dayKey] = {
+                        date: date,
+                        temps: [],
+                        weather: [],
+                        count: 0
+                    };
+                }
+
+                const temp = Math.round(forecast.main.temp - 273.15);
+                dailyForecasts[dayKey].temps.push(temp);
+                dailyForecasts[dayKey].weather.push(forecast.weather[0]);
+                dailyForecasts[dayKey].count++;
+            });
+
+            // Create forecast cards for each day
+            for (const dayKey in dailyForecasts) {
+                if (Object.keys(dailyForecasts).length > 5) break; // Limit to 5 days
+
+                const day = dailyForecasts[dayKey];
+                const avgTemp = Math.round(day.temps.reduce((a, b) => a + b, 0) / day.temps.length);
+                const minTemp = Math.min(...day.temps);
+                const maxTemp = Math.max(...day.temps);
+
+                // Find the most common weather condition
+                const weatherCounts = {};
+                day.weather.forEach(w => {
+                    const key = w.main;
+                    weatherCounts[key] = (weatherCounts[key] || 0) + 1;
+                });
+                const mostCommonWeather = Object.entries(weatherCounts).reduce((a, b) => 
+                    a[1] > b[1] ? a : b)[0];
+                const weatherDesc = day.weather.find(w => w.main === mostCommonWeather).description;
+
+                // Weather icons
+                const weatherIcons = {
+                    'Clear': '☀️',
+                    'Clouds': '☁️',
+                    'Rain': '🌧️',
+                    'Drizzle': '🌦️',
+                    'Thunderstorm': '⛈️',
+                    'Snow': '❄️',
+                    'Mist': '🌫️',
+                    'Fog': '🌫️'
+                };
+
+                // Format date
+                const options = { weekday: 'short', month: 'short', day: 'numeric' };
+                const formattedDate = day.date.toLocaleDateString(undefined, options);
+
+                // Create forecast card
+                const forecastCard = document.createElement('div');
+                forecastCard.className = 'forecast-day';
+                forecastCard.innerHTML = `
+                    <div class="forecast-date">${formattedDate}</div>
+                    <div class="weather-icon">${weatherIcons[mostCommonWeather] || '🌤️'}</div>
+                    <div class="forecast-temp">${avgTemp}°C</div>
+                    <div class="forecast-temp">H: ${maxTemp}°C / L: ${minTemp}°C</div>
+                    <div class="forecast-description">${weatherDesc}</div>
+                `;
+
+                forecastDays.appendChild(forecastCard);
+            }
+
+        } else {
+            showError('Failed to get forecast information: ' + (data.message || 'Unknown error'));
+        }
+    } catch (error) {
+        console.error('Forecast error:', error);
+        showError('Error getting forecast: ' + error.message);
+    }
+    hideLoading();
+}
@@ -0,0 +1,201 @@
+let map;
+let currentLat, currentLon;
+// Weather and daily forecast that came with the location, shown without another request
+let prefetched = null;
+
+function showLoading() {
+    document.getElementById('loading').style.display = 'block';
+}
+
+function hideLoading() {
+    document.getElementById('loading').style.display = 'none';
+}
+
+function showError(message) {
+    const errorDiv = document.getElementById('error');
+    errorDiv.textContent = message;
+    errorDiv.style.display = 'block';
+    setTimeout(() => {
+        errorDiv.style.display = 'none';
+    }, 5000);
+}
+
+async function getCurrentLocation() {
+    showLoading();
+    try {
+        let data;
+        const response = await fetch('/api/weather/here?units=metric&daily=true');
+        if (response.ok) {
+            const here = await response.json();
+            data = here.location;
+            prefetched = { weather: here.weather, forecast: here.forecast };
+        } else {
+            prefetched = null;
+            data = await (await fetch('/api/location')).json();
+        }
+
+        console.log('Location data received:', data);
+
+        if (data.status === 'success' || data.lat) {
+            document.getElementById('city').textContent = data.city || 'Unknown';
+            document.getElementById('region').textContent = data.regionName || data.region || 'Unknown';
+            document.getElementById('country').textContent = data.country || 'Unknown';
+
+            if (data.lat && data.lon) {
+                document.getElementById('coordinates').textContent = `${data.lat.toFixed(6)}, ${data.lon.toFixed(6)}`;
+                currentLat = data.lat;
+                currentLon = data.lon;
+                initMap(data.lat, data.lon, data.city || 'Your Location');
+            }
+        } else {
+            showError('Failed to get location information: ' + (data.message || 'Unknown error'));
+        }
+    } catch (error) {
+        showError('Error getting location: ' + error.message);
+    }
+    hideLoading();
+}
+
+function initMap(lat, lon, city) {
+    if (map) {
+        map.remove();
+    }
+
+    map = L.map('map').setView([lat, lon], 13);
+
+    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        attribution: '© OpenStreetMap contributors'
+    }).addTo(map);
+
+    // Weather overlays rendered by this API; off until picked in the layer control
+    const overlay = (layer) => L.tileLayer(`/tiles/${layer}/{z}/{x}/{y}.png`, {
+        minZoom: 3, maxZoom: 18, opacity: 0.7, attribution: 'Weather © OpenWeatherMap'
+    });
+    L.control.layers(null, {
+        'Temperature': overlay('temperature'),
+        'Clouds': overlay('clouds'),
+        'Precipitation': overlay('precipitation')
+    }).addTo(map);
+
+    L.marker([lat, lon]).addTo(map)
+        .bindPopup(`📍 ${city}<br>Lat: ${lat.toFixed(4)}, Lon: ${lon.toFixed(4)}`)
+        .openPopup();
+}
+
+async function getWeatherCondition() {
+    if (!currentLat || !currentLon) {
+        showError('Please get your location first');
+        return;
+    }
+
+    showLoading();
+    try {
+        const data = prefetched ? prefetched.weather
+            : await (await fetch(`/api/weather?lat=${currentLat}&lon=${currentLon}&units=metric`)).json();
+
+        console.log('Weather data received:', data);
+
+        if (data.cod === 200) {
+            document.getElementById('weatherContent').style.display = 'none';
+
+            const temp = Math.round(data.main.temp);
+            const feelsLike = Math.round(data.main.feels_like);
+
+            document.getElementById('weatherMain').textContent = data.weather[0].main;
+            document.getElementById('weatherDesc').textContent = data.weather[0].description;
+            document.getElementById('temperature').textContent = `${temp}°C`;
+            document.getElementById('feelsLike').textContent = `${feelsLike}°C`;
+            document.getElementById('humidity').textContent = `${data.main.humidity}%`;
+            document.getElementById('windSpeed').textContent = `${data.wind.speed} m/s`;
+            document.getElementById('windDirection').textContent = data.wind.deg || 'N/A';
+
+            const weatherIcons = {
+                'Clear': '☀️',
+                'Clouds': '☁️',
+                'Rain': '🌧️',
+                'Drizzle': '🌦️',
+                'Thunderstorm': '⛈️',
+                'Snow': '❄️',
+                'Mist': '🌫️',
+                'Fog': '🌫️'
+            };
+            document.getElementById('weatherIcon').textContent = weatherIcons[data.weather[0].main] || '🌤️';
+
+            document.getElementById('weatherCards').style.display = 'grid';
+
+        } else {
+            showError('Failed to get weather information: ' + (data.message || 'Unknown error'));
+        }
+    } catch (error) {
+        console.error('Weather error:', error);
+        showError('Error getting weather: ' + error.message);
+    }
+    hideLoading();
+}
+
+async function getWeatherForecast() {
+    if (!currentLat || !currentLon) {
+        showError('Please get your location first');
+        return;
+    }
+
+    showLoading();
+    try {
+        const data = prefetched ? prefetched.forecast
+            : await (await fetch(`/api/forecast/daily?lat=${currentLat}&lon=${currentLon}&units=metric`)).json();
+
+        console.log('Daily forecast received:', data);
+
+        if (data.cod === "200") {
+            document.getElementById('forecastContent').style.display = 'none';
+            document.getElementById('forecastResult').style.display = 'block';
+
+            const forecastDays = document.getElementById('forecastDays');
+            forecastDays.innerHTML = '';
+
+            const weatherIcons = {
+                'Clear': '☀️',
+                'Clouds': '☁️',
+                'Rain': '🌧️',
+                'Drizzle': '🌦️',
+                'Thunderstorm': '⛈️',
+                'Snow': '❄️',
+                'Mist': '🌫️',
+                'Fog': '🌫️'
+            };
+
+            // Days are already grouped server-side in the location's local calendar
+            const today = new Date().toLocaleDateString('en-CA');
+            const days = data.list.filter(day => day.date !== today).slice(0, 5);
+
+            days.forEach(day => {
+                const avgTemp = Math.round(day.temp_mean);
+                const minTemp = Math.round(day.temp_min);
+                const maxTemp = Math.round(day.temp_max);
+                const condition = day.condition || {};
+
+                const options = { weekday: 'short', month: 'short', day: 'numeric', timeZone: 'UTC' };
+                const formattedDate = new Date(day.date).toLocaleDateString(undefined, options);
+
+                const forecastCard = document.createElement('div');
+                forecastCard.className = 'forecast-day';
+                forecastCard.innerHTML = `
+                    <div class="forecast-date">${formattedDate}</div>
+                    <div class="weather-icon">${weatherIcons[condition.main] || '🌤️'}</div>
+                    <div class="forecast-temp">${avgTemp}°C</div>
+                    <div class="forecast-temp">H: ${maxTemp}°C / L: ${minTemp}°C</div>
+                    <div class="forecast-description">${condition.description || ''}</div>
+                `;
+
+                forecastDays.appendChild(forecastCard);
+            });
+
+        } else {
+            showError('Failed to get forecast information: ' + (data.message || 'Unknown error'));
+        }
+    } catch (error) {
+        console.error('Forecast error:', error);
+        showError('Error getting forecast: ' + error.message);
+    }
+    hideLoading();
+}
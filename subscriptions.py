@@ -0,0 +1,302 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from cache import CacheEntry
+from delta import delta_document, forecast_version
+from units import Units
+from views import encode, view_data
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_POLL_INTERVAL = float(os.environ.get("SUBSCRIPTION_POLL_INTERVAL", "600"))
+SUBSCRIPTION_KEEPALIVE = float(os.environ.get("SUBSCRIPTION_KEEPALIVE", "15"))
+MAX_SUBSCRIPTIONS_PER_CONNECTION = int(os.environ.get("MAX_SUBSCRIPTIONS_PER_CONNECTION", "50"))
+
+# A slow subscriber only needs the latest few updates, never a backlog
+SUBSCRIBER_QUEUE_SIZE = 8
+
+Location = Tuple[str, ...]
+EntryFetch = Callable[[Location], Awaitable[CacheEntry]]
+ChangeKey = Callable[[CacheEntry], Hashable]
+
+
+def observation_time(entry: CacheEntry) -> Hashable:
+    return entry.data.get("dt")
+
+
+def parse_location(value: str) -> Location:
+    """``"51.5,-0.12"`` -> ``("coord", "51.5", "-0.12")``, ``"London,GB"`` -> ``("city", "london,gb")``."""
+    parts = [part.strip() for part in value.split(",")]
+    if len(parts) == 2:
+        try:
+            lat, lon = float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+        else:
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise HTTPException(status_code=400, detail=f"Coordinates out of range: {value}")
+            return ("coord", f"{round(lat, 4)}", f"{round(lon, 4)}")
+    if not parts[0]:
+        raise HTTPException(status_code=400, detail="Empty location")
+    return ("city", ",".join(parts).lower())
+
+
+def location_label(location: Location) -> str:
+    return ",".join(location[1:])
+
+
+class Subscriber:
+    """One connection (SSE stream or WebSocket) and the locations it follows."""
+
+    __slots__ = ("queue", "view", "units", "locations", "sent")
+
+    def __init__(self, view: str = "weather", units: Optional[Units] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.view = view
+        self.units = units
+        self.locations: Set[Location] = set()
+        # Last forecast sent per location, the base for the next delta
+        self.sent: Optional[Dict[Location, CacheEntry]] = None
+
+    def offer(self, location: Location, entry: CacheEntry) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait((location, entry))
+
+    def message(self, location: Location, entry: CacheEntry) -> bytes:
+        label = json.dumps(location_label(location)).encode("utf-8")
+        if self.view != "forecast":
+            return b'{"location":' + label + b',"data":' + encode(entry, self.view, self.units) + b"}"
+
+        if self.sent is None:
+            self.sent = {}
+        previous = self.sent.get(location)
+        self.sent[location] = entry
+        version = forecast_version(entry)
+        if previous is None or previous is entry:
+            return (
+                b'{"location":' + label + b',"version":"' + version.encode("ascii")
+                + b'","data":' + encode(entry, "forecast", self.units) + b"}"
+            )
+        units = self.units or Units.standard
+        delta = delta_document(
+            forecast_version(previous), version,
+            view_data(previous, "forecast", units), view_data(entry, "forecast", units),
+        )
+        return b'{"location":' + label + b',"delta":' + delta + b"}"
+
+    def forget(self, location: Location) -> None:
+        self.locations.discard(location)
+        if self.sent is not None:
+            self.sent.pop(location, None)
+
+
+class LocationPoller:
+    """
+    The single upstream polling loop for one location.
+
+    Every subscriber to the location shares it, and an update is pushed only
+    when ``change_key`` (the observation time by default) changes.
+    """
+
+    __slots__ = ("location", "fetch", "interval", "change_key", "subscribers", "entry", "task")
+
+    def __init__(self, location: Location, fetch: EntryFetch, interval: float, change_key: ChangeKey):
+        self.location = location
+        self.fetch = fetch
+        self.interval = interval
+        self.change_key = change_key
+        self.subscribers: Set[Subscriber] = set()
+        self.entry: Optional[CacheEntry] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            try:
+                entry = await self.fetch(self.location)
+            except Exception as e:
+                logger.warning("Polling %s failed: %s", location_label(self.location), e)
+            else:
+                if self.entry is None or self.change_key(entry) != self.change_key(self.entry):
+                    self.entry = entry
+                    for subscriber in self.subscribers:
+                        subscriber.offer(self.location, entry)
+            await asyncio.sleep(self.interval)
+
+
+class SubscriptionHub:
+    """Tracks subscribers and runs one ``LocationPoller`` per distinct location."""
+
+    def __init__(
+        self,
+        fetch: EntryFetch,
+        interval: float = SUBSCRIPTION_POLL_INTERVAL,
+        view: str = "weather",
+        change_key: ChangeKey = observation_time,
+    ):
+        self.fetch = fetch
+        self.interval = interval
+        self.view = view
+        self.change_key = change_key
+        self.pollers: Dict[Location, LocationPoller] = {}
+        self.connections = 0
+
+    def connect(self, units: Optional[Units] = None) -> Subscriber:
+        self.connections += 1
+        return Subscriber(self.view, units)
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        for location in list(subscriber.locations):
+            self.unsubscribe(subscriber, location)
+        self.connections -= 1
+
+    def subscribe(self, subscriber: Subscriber, location: Location) -> None:
+        if location in subscriber.locations:
+            return
+        if len(subscriber.locations) >= MAX_SUBSCRIPTIONS_PER_CONNECTION:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {MAX_SUBSCRIPTIONS_PER_CONNECTION} locations per connection",
+            )
+        poller = self.pollers.get(location)
+        if poller is None:
+            poller = self.pollers[location] = LocationPoller(location, self.fetch, self.interval, self.change_key)
+            poller.start()
+        poller.subscribers.add(subscriber)
+        subscriber.locations.add(location)
+        if poller.entry is not None:
+            # Late joiners get the current observation straight away
+            subscriber.offer(location, poller.entry)
+
+    def unsubscribe(self, subscriber: Subscriber, location: Location) -> None:
+        subscriber.forget(location)
+        poller = self.pollers.get(location)
+        if poller is None:
+            return
+        poller.subscribers.discard(subscriber)
+        if not poller.subscribers:
+            poller.task.cancel()
+            del self.pollers[location]
+
+    async def close(self) -> None:
+        tasks = [poller.task for poller in self.pollers.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.pollers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "locations": len(self.pollers),
+            "subscriptions": sum(len(p.subscribers) for p in self.pollers.values()),
+            "idle_connection_bytes": idle_subscriber_size(),
+        }
+
+
+def idle_subscriber_size() -> int:
+    """Approximate bytes held per idle connection by the hub (not the socket itself)."""
+    subscriber = Subscriber()
+    queue = subscriber.queue
+    return (
+        sys.getsizeof(subscriber)
+        + sys.getsizeof(queue)
+        + sys.getsizeof(queue.__dict__)
+        + sys.getsizeof(queue._queue)
+        + sys.getsizeof(subscriber.locations)
+    )
+
+
+async def sse_events(hub: SubscriptionHub, subscriber: Subscriber):
+    """Server-Sent Events for a subscriber, with keep-alive comments while idle."""
+    while True:
+        try:
+            location, entry = await asyncio.wait_for(subscriber.queue.get(), SUBSCRIPTION_KEEPALIVE)
+        except asyncio.TimeoutError:
+            yield b": keepalive\n\n"
+            continue
+        yield (
+            b"event: " + hub.view.encode("ascii") + b"\nid: " + str(hub.change_key(entry)).encode("ascii")
+            + b"\ndata: " + subscriber.message(location, entry) + b"\n\n"
+        )
+
+
+class SSEResponse(StreamingResponse):
+    """
+    The event stream of a subscriber. The subscriber is disconnected when the
+    response ends however it ends, including a client that goes away before
+    the first event is sent.
+    """
+
+    def __init__(self, hub: SubscriptionHub, subscriber: Subscriber):
+        super().__init__(
+            sse_events(hub, subscriber),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self.hub = hub
+        self.subscriber = subscriber
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.hub.disconnect(self.subscriber)
+
+
+def _command_locations(command: dict, action: str) -> List[str]:
+    """The locations of a WebSocket command; a single string counts as one location."""
+    value = command.get(action, [])
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list):
+        raise TypeError(f"{action} must be a list of locations")
+    return value
+
+
+async def websocket_session(hub: SubscriptionHub, websocket: WebSocket, units: Optional[Units] = None) -> None:
+    """
+    Serve one WebSocket subscriber.
+
+    Clients send ``{"subscribe": [...]}`` / ``{"unsubscribe": [...]}`` with
+    locations as ``"lat,lon"`` or ``"City[,CC]"`` and receive one JSON message
+    per update.
+    """
+    await websocket.accept()
+    subscriber = hub.connect(units)
+
+    async def push():
+        while True:
+            location, entry = await subscriber.queue.get()
+            await websocket.send_bytes(subscriber.message(location, entry))
+
+    sender = asyncio.create_task(push())
+    try:
+        while True:
+            try:
+                command = await websocket.receive_json()
+                for value in _command_locations(command, "subscribe"):
+                    hub.subscribe(subscriber, parse_location(value))
+                for value in _command_locations(command, "unsubscribe"):
+                    hub.unsubscribe(subscriber, parse_location(value))
+            except HTTPException as e:
+                await websocket.send_json({"error": e.detail})
+            except (ValueError, AttributeError, TypeError):
+                await websocket.send_json({"error": "Expected {\"subscribe\": [...]} or {\"unsubscribe\": [...]}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.disconnect(subscriber)
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import httpx
+import pytest
+
+# The modules live at the repository root, next to main.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Tests must not write observations to data/history
+os.environ["HISTORY_DIR"] = ""
+
+START = 1760000400
+CONDITIONS = [
+    {"id": 800, "main": "Clear", "description": "clear sky", "icon": "01{}"},
+    {"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04{}"},
+    {"id": 500, "main": "Rain", "description": "light rain", "icon": "10{}"},
+]
+
+
+def synthetic_forecast(seed: int = 0, slots: int = 40, start: int = START) -> dict:
+    """A forecast shaped like OWM's /data/2.5/forecast response, parsed from JSON."""
+    items = []
+    for i in range(slots):
+        dt = start + i * 10800
+        temp = round(280 + (i + seed) % 9 + seed % 13 / 10, 2)
+        pod = "d" if 6 <= (i * 3) % 24 < 18 else "n"
+        condition = dict(CONDITIONS[(i + seed) % 3])
+        condition["icon"] = condition["icon"].format(pod)
+        item = {
+            "dt": dt,
+            "main": {"temp": temp, "feels_like": round(temp - 1.3, 2), "temp_min": round(temp - 0.4, 2),
+                     "temp_max": round(temp + 0.6, 2), "pressure": 1012 + i % 5, "sea_level": 1012 + i % 5,
+                     "grnd_level": 1008 + i % 4, "humidity": 40 + (i * 7 + seed) % 50, "temp_kf": 0},
+            "weather": [condition],
+            "clouds": {"all": (i * 11) % 100},
+            "wind": {"speed": round(1 + ((i + seed) % 90) / 10, 2), "deg": (i * 37 + seed) % 360,
+                     "gust": round(3 + ((i + seed) % 50) / 10, 2)},
+            "visibility": 10000,
+            "pop": ((i + seed) % 10) / 10,
+        }
+        if condition["main"] == "Rain":
+            item["rain"] = {"3h": round(0.1 + (i % 7) / 10, 2)}
+        item["sys"] = {"pod": pod}
+        item["dt_txt"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(dt))
+        items.append(item)
+    city = {"id": seed, "name": f"City {seed}", "coord": {"lat": 51.5, "lon": -0.12}, "country": "GB",
+            "population": 1000, "timezone": 3600 * (seed % 5), "sunrise": start, "sunset": start + 40000}
+    return json.loads(json.dumps({"cod": "200", "message": 0, "cnt": slots, "list": items, "city": city}))
+
+
+@pytest.fixture
+def forecast():
+    return synthetic_forecast
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    The shared upstream client answered in-process by the load tests' mock
+    upstream, with empty weather and forecast caches. Yields the mock, whose
+    ``calls`` count the upstream requests. Provider health recorded meanwhile
+    is discarded, so it cannot reorder providers in later tests.
+    """
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from mock_upstream import Upstream, create_app
+
+    import services
+    from metrics import UpstreamMetricsTransport, upstream_health
+
+    mock = Upstream()
+    transport = UpstreamMetricsTransport(httpx.ASGITransport(app=create_app(mock)))
+    monkeypatch.setattr(services, "_client", httpx.AsyncClient(transport=transport))
+    monkeypatch.setattr(services.weather_cache, "_entries", OrderedDict())
+    monkeypatch.setattr(services.forecast_cache, "_entries", OrderedDict())
+    health = dict(upstream_health)
+    yield mock
+    upstream_health.clear()
+    upstream_health.update(health)
@@ -0,0 +1,47 @@
+from aggregation import daily_summary
+
+
+def item(dt, temp, main="Clear", speed=1.0, gust=None, pop=0.0):
+    wind = {"speed": speed, "deg": 0}
+    if gust is not None:
+        wind["gust"] = gust
+    return {
+        "dt": dt,
+        "main": {"temp": temp, "temp_min": temp - 1, "temp_max": temp + 1, "humidity": 50},
+        "weather": [{"id": 800, "main": main, "description": main.lower(), "icon": "01d"}],
+        "wind": wind,
+        "pop": pop,
+    }
+
+
+def test_daily_summary_groups_by_local_day():
+    # 1970-01-01 22:00 UTC is 1970-01-02 00:00 at UTC+2
+    forecast = {
+        "cod": "200",
+        "city": {"name": "Test", "timezone": 7200},
+        "list": [item(0, 280.0), item(10800, 282.0), item(79200, 290.0)],
+    }
+    summary = daily_summary(forecast)
+    assert summary["cnt"] == 2
+    first, second = summary["list"]
+    assert (first["date"], first["slots"]) == ("1970-01-01", 2)
+    assert (second["date"], second["slots"], second["dt"]) == ("1970-01-02", 1, 79200)
+    assert summary["city"]["name"] == "Test"
+
+
+def test_daily_summary_aggregates_each_field():
+    forecast = {"list": [
+        item(0, 280.0, "Rain", speed=2.0, gust=5.0, pop=0.2),
+        item(10800, 282.0, "Rain", speed=4.0, pop=0.7),
+        item(21600, 284.0, "Clouds", speed=3.0),
+    ]}
+    day = daily_summary(forecast)["list"][0]
+    assert (day["temp_min"], day["temp_max"], day["temp_mean"]) == (279.0, 285.0, 282.0)
+    assert day["humidity_mean"] == 50.0
+    assert day["condition"]["main"] == "Rain"
+    assert day["pop"] == 0.7
+    assert day["wind"] == {"speed_mean": 3.0, "speed_max": 4.0, "gust_max": 5.0}
+
+
+def test_daily_summary_of_empty_forecast():
+    assert daily_summary({}) == {"cod": "200", "cnt": 0, "list": [], "city": {}}
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from aggregation import daily_summary
+from analytics import analyze, forecast_columns
+
+
+def temps(forecast):
+    return [item["main"]["temp"] for item in forecast["list"]]
+
+
+def test_forecast_columns_use_nan_for_missing_values(forecast):
+    data = forecast(0, slots=3)
+    del data["list"][1]["wind"]["gust"]
+    columns = forecast_columns(data)
+    assert columns["dt"].dtype == np.int64
+    assert columns["temp"].tolist() == temps(data)
+    assert np.isnan(columns["wind_gust"][1])
+    assert columns["timezone"] == 0
+
+
+def test_daily_aggregates_match_the_per_item_summary(forecast):
+    for seed in (0, 3):
+        data = forecast(seed)
+        [result] = analyze([forecast_columns(data)])
+        expected = daily_summary(data)["list"]
+        assert [(d["date"], d["slots"]) for d in result["daily"]] == [(d["date"], d["slots"]) for d in expected]
+        for day, reference in zip(result["daily"], expected):
+            day_temps = [item["main"]["temp"] for item in data["list"] if item["dt"] >= reference["dt"]][: reference["slots"]]
+            assert day["temp_min"] == round(min(day_temps), 2)
+            assert day["temp_max"] == round(max(day_temps), 2)
+            assert day["temp_mean"] == pytest.approx(sum(day_temps) / len(day_temps), abs=0.01)
+
+
+def test_rolling_extremes_and_extremes(forecast):
+    data = forecast(1, slots=10)
+    values = temps(data)
+    [result] = analyze([forecast_columns(data)], window=3)
+    means = [sum(values[i:i + 3]) / 3 for i in range(8)]
+    warmest = max(range(8), key=means.__getitem__)
+    assert result["rolling"]["warmest"] == {"start": data["list"][warmest]["dt"], "mean": round(means[warmest], 2)}
+    assert result["extremes"]["temp_max"]["value"] == max(values)
+    assert result["extremes"]["temp_min"]["dt"] == data["list"][values.index(min(values))]["dt"]
+
+
+def test_window_longer_than_the_forecast_gives_no_rolling(forecast):
+    [result] = analyze([forecast_columns(forecast(0, slots=4))], window=5)
+    assert result["rolling"] is None
+
+
+def test_threshold_crossings(forecast):
+    data = forecast(0, slots=8)
+    for item, temp in zip(data["list"], [1, 1, 9, 9, 1, 9, 9, 9]):
+        item["main"]["temp"] = temp
+    [result] = analyze([forecast_columns(data)], thresholds={"temp_above": 5, "pop_above": None})
+    assert result["thresholds"] == {
+        "temp_above": {"threshold": 5, "slots": 5, "crossings": 3, "first": data["list"][2]["dt"]},
+    }
+
+
+def test_batches_pad_shorter_forecasts(forecast):
+    short, full = forecast(2, slots=5), forecast(2)
+    results = analyze([forecast_columns(short), forecast_columns(full)], thresholds={"temp_below": 0})
+    assert [r["slots"] for r in results] == [5, 40]
+    assert results[0]["extremes"]["temp_max"]["value"] == max(temps(short))
+    assert results[0]["thresholds"]["temp_below"]["first"] is None
+    assert analyze([]) == []
@@ -0,0 +1,38 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from main import app
+from templates import DEMO_PAGE, HTML_TEMPLATE
+
+
+def test_demo_page_links_hashed_assets():
+    client = TestClient(app)
+    page = client.get("/")
+    assert page.status_code == 200 and page.headers["content-type"].startswith("text/html")
+    urls = re.findall(r'(?:href|src)="(/static/[^"]+)"', page.text)
+    assert urls == [DEMO_PAGE.stylesheet.url, DEMO_PAGE.script.url]
+    assert all(re.fullmatch(r"/static/demo\.[0-9a-f]{10}\.(css|js)", url) for url in urls)
+
+
+def test_assets_are_cached_forever_and_revalidate():
+    client = TestClient(app)
+    asset = client.get(DEMO_PAGE.script.url)
+    assert asset.status_code == 200
+    assert asset.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert asset.headers["content-type"].startswith("application/javascript")
+    assert asset.text == DEMO_PAGE.script.source
+    again = client.get(DEMO_PAGE.script.url, headers={"If-None-Match": asset.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_unknown_or_stale_asset_urls_are_404():
+    client = TestClient(app)
+    assert client.get("/static/demo.0000000000.js").status_code == 404
+    assert client.get("/static/demo.js").status_code == 404
+
+
+def test_inline_template_embeds_the_assets():
+    assert "{{" not in HTML_TEMPLATE
+    assert DEMO_PAGE.stylesheet.source in HTML_TEMPLATE
+    assert DEMO_PAGE.script.source in HTML_TEMPLATE
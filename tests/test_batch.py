@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from batch import collect_batch, gather_entries, stream_batch, validate_batch
+from cache import CacheEntry
+from models import BatchLocation
+from units import Units
+
+LOCATIONS = [BatchLocation(lat=float(i), lon=0.0) for i in range(5)]
+
+
+def weather(lat):
+    return {"name": f"at {lat}", "main": {"temp": 273.15 + lat}, "wind": {"speed": 1.0}}
+
+
+async def lookup(location: BatchLocation) -> CacheEntry:
+    # Later locations finish first, so completion order is the reverse of request order
+    await asyncio.sleep(0.01 * (len(LOCATIONS) - location.lat))
+    if location.lat == 3:
+        raise HTTPException(status_code=404, detail="City not found")
+    if location.lat == 4:
+        raise RuntimeError("boom")
+    return CacheEntry(location.lat, weather(location.lat), 60)
+
+
+async def stream(concurrency):
+    return [json.loads(line) async for line in stream_batch(LOCATIONS, lookup, "weather", concurrency=concurrency)]
+
+
+def test_collect_batch_keeps_request_order_and_reports_errors():
+    results = json.loads(asyncio.run(collect_batch(LOCATIONS, lookup, "weather", concurrency=5)))
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[1]["data"]["name"] == "at 1.0"
+    assert results[1]["query"] == {"lat": 1.0, "lon": 0.0}
+    assert results[3]["error"] == {"status": 404, "detail": "City not found"}
+    assert results[4]["error"] == {"status": 500, "detail": "boom"}
+
+
+def test_stream_batch_yields_in_completion_order():
+    lines = asyncio.run(stream(concurrency=5))
+    assert [line["index"] for line in lines] == [4, 3, 2, 1, 0]
+
+
+def test_stream_batch_with_one_worker_is_sequential():
+    lines = asyncio.run(stream(concurrency=1))
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+
+
+def test_batch_units_and_fields_apply_per_line():
+    body = asyncio.run(collect_batch(LOCATIONS[:1], lookup, "weather", units=Units.metric, fields="main.temp"))
+    assert json.loads(body)[0]["data"] == {"main": {"temp": 0.0}}
+
+
+def test_gather_entries_returns_failures_as_http_exceptions():
+    results = asyncio.run(gather_entries(LOCATIONS, lookup))
+    assert isinstance(results[0], CacheEntry)
+    assert (results[3].status_code, results[4].status_code) == (404, 500)
+    assert results[4].detail == "boom"
+
+
+@pytest.mark.parametrize("locations", [[], [BatchLocation(lat=1.0)]])
+def test_validate_batch_rejects_empty_and_incomplete(locations):
+    with pytest.raises(HTTPException) as error:
+        validate_batch(locations)
+    assert error.value.status_code == 400
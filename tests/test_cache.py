@@ -0,0 +1,81 @@
+import asyncio
+
+from cache import TTLCache
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(calls)}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(5)))
+
+    entries = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(entry is entries[0] for entry in entries)
+    assert (cache.misses, cache.coalesced, cache.hits) == (5, 4, 0)
+    assert cache.fetching == 0
+
+
+def test_failed_fetch_propagates_to_waiters_and_is_not_cached():
+    cache = TTLCache(ttl=60)
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(cache) == 0
+
+
+def test_expired_entries_are_refetched():
+    cache = TTLCache(ttl=0)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+    assert cache.stale == 1
+
+
+def test_ttl_for_overrides_ttl_per_payload():
+    cache = TTLCache(ttl=60, ttl_for=lambda data: 0 if data.get("partial") else 60)
+    cache.set("full", {})
+    cache.set("partial", {"partial": True})
+    assert cache.get("full") is not None
+    assert cache.get("partial") is None
+
+
+def test_lru_eviction_and_peek_keeps_order():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.peek("a").data == 1
+    cache.set("c", 3)
+    # peek did not promote "a", so it was the least recently used
+    assert cache.peek("a") is None
+    assert cache.get("b").data == 2
+    cache.set("d", 4)
+    assert cache.peek("c") is None and cache.peek("b") is not None
+    assert (cache.hits, cache.misses, cache.stale) == (0, 0, 0)
+
+
+def test_derive_is_memoized_per_entry():
+    cache = TTLCache(ttl=60)
+    entry = cache.set("k", [1, 2, 3])
+    calls = []
+
+    def total(data):
+        calls.append(1)
+        return sum(data)
+
+    assert entry.derive("sum", total) == 6
+    assert entry.derive("sum", total) == 6
+    assert len(calls) == 1
+
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+
+from cassette import CassetteMiss, CassetteTransport, request_key
+
+
+def test_request_key_ignores_the_api_key_and_parameter_order():
+    first = request_key("get", httpx.URL("https://API.example.com/data/2.5/weather?lon=2&lat=1&appid=secret"))
+    second = request_key("GET", httpx.URL("https://api.example.com/data/2.5/weather?appid=other&lat=1&lon=2"))
+    assert first == second == "GET api.example.com/data/2.5/weather?lat=1&lon=2"
+
+
+def record(path, responses):
+    transport = CassetteTransport(str(path), "record")
+    calls = iter(responses)
+    transport._inner = httpx.MockTransport(lambda request: next(calls))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return [await client.get("https://api.example.com/w", params={"lat": 1, "appid": "k"}) for _ in responses]
+
+    return transport, asyncio.run(run())
+
+
+def replay(path, requests, latency_scale=0.0):
+    transport = CassetteTransport(str(path), "replay", latency_scale)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return [await client.get(url) for url in requests]
+
+    return transport, asyncio.run(run())
+
+
+def test_recorded_responses_replay_in_order_then_cycle(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    recorder, recorded = record(path, [
+        httpx.Response(200, json={"dt": 1}, headers={"X-Other": "dropped"}),
+        httpx.Response(503, content=b"\xff\xfe"),
+    ])
+    assert [r.status_code for r in recorded] == [200, 503]
+    assert recorder.stats()["recorded"] == 2
+
+    url = "https://api.example.com/w?lat=1&appid=other"
+    player, replayed = replay(path, [url, url, url])
+    assert [r.status_code for r in replayed] == [200, 503, 200]
+    assert replayed[0].json() == {"dt": 1}
+    assert replayed[0].headers["content-type"] == "application/json"
+    assert "x-other" not in replayed[0].headers
+    assert replayed[1].content == b"\xff\xfe"
+    assert (player.hits, player.misses) == (3, 0)
+
+
+def test_unrecorded_requests_miss(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    record(path, [httpx.Response(200, json={})])
+    player = CassetteTransport(str(path), "replay")
+
+    async def run():
+        async with httpx.AsyncClient(transport=player) as client:
+            await client.get("https://api.example.com/w?lat=2")
+
+    with pytest.raises(CassetteMiss):
+        asyncio.run(run())
+    assert player.misses == 1
+
+
+def test_invalid_mode_and_missing_cassette(tmp_path):
+    with pytest.raises(ValueError):
+        CassetteTransport(str(tmp_path / "c.jsonl"), "rewind")
+    with pytest.raises(FileNotFoundError):
+        CassetteTransport(str(tmp_path / "c.jsonl"), "replay")
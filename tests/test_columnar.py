@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import columnar
+from cache import TTLCache
+from columnar import NO_SYS, CompactForecast, deep_sizeof, pack_forecast
+
+
+def dumps(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 7])
+def test_round_trip_is_byte_for_byte(forecast, seed):
+    data = forecast(seed)
+    packed = CompactForecast.pack(data)
+    assert packed is not None
+    assert dumps(packed.materialize()) == dumps(data)
+
+
+def test_round_trip_keeps_int_float_spelling_and_missing_fields(forecast):
+    data = forecast(0, slots=6)
+    data["list"][0]["main"]["temp"] = 280
+    data["list"][1]["main"]["temp"] = 280.0
+    del data["list"][2]["wind"]["gust"]
+    del data["list"][3]["sys"]
+    snowy = dict(data["list"][4], snow={"3h": 0.125})
+    data["list"][4] = {key: snowy[key] for key in columnar.ITEM_KEYS if key in snowy}
+    packed = CompactForecast.pack(data)
+    assert packed is not None
+    assert dumps(packed.materialize()) == dumps(data)
+    assert packed.sys[3] == NO_SYS
+
+
+def test_key_order_it_cannot_reproduce_stays_a_dict(forecast):
+    data = forecast(0, slots=2)
+    data["list"][0]["snow"] = {"3h": 0.5}
+    assert CompactForecast.pack(data) is None
+
+
+def test_unsupported_shapes_stay_plain_dicts(forecast):
+    extra_key = forecast(0, slots=2)
+    extra_key["list"][0]["unknown"] = 1
+    nested_list = forecast(0, slots=2)
+    nested_list["list"][0]["main"] = [1]
+    string_value = forecast(0, slots=2)
+    string_value["list"][0]["visibility"] = "far"
+    for data in (extra_key, nested_list, string_value, {**forecast(0, slots=2), "extra": True}):
+        assert CompactForecast.pack(data) is None
+        assert pack_forecast(data) is data
+
+
+def test_full_intern_table_falls_back_to_dicts(forecast, monkeypatch):
+    monkeypatch.setattr(columnar, "_interned", {})
+    monkeypatch.setattr(columnar, "_interned_values", [()] * NO_SYS)
+    data = forecast(0)
+    assert pack_forecast(data) is data
+
+
+def test_packed_cache_entries_serve_plain_payloads(forecast):
+    cache = TTLCache(ttl=60, pack=pack_forecast)
+    data = forecast(3)
+    entry = cache.set("k", data)
+    assert isinstance(entry.stored, CompactForecast)
+    assert entry.data == data
+    assert deep_sizeof(entry.stored) * 5 < deep_sizeof(data)
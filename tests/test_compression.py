@@ -0,0 +1,76 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.responses import Response
+
+from compression import CompressionMiddleware, StaticPayload, encoded_etag, negotiate_encoding
+
+BODY = b'{"list":[' + b",".join(b'{"dt":%d,"main":{"temp":280.15}}' % i for i in range(100)) + b"]}"
+
+
+def make_client(minimum_size: int = 500) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/data")
+    def data(request: Request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return Response(status_code=304, headers={"ETag": '"v1"'})
+        return Response(BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return Response(b"{}", media_type="application/json")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    return TestClient(app)
+
+
+def test_negotiate_prefers_highest_q_then_server_order():
+    assert negotiate_encoding("gzip;q=0.5, br;q=0.9", ("br", "gzip")) == "br"
+    assert negotiate_encoding("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate_encoding("gzip;q=1, br;q=0", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("*;q=0.1", ("gzip",)) == "gzip"
+    assert negotiate_encoding("identity", ("br", "gzip")) is None
+    assert negotiate_encoding("", ("gzip",)) is None
+
+
+def test_gzip_response_round_trips_and_varies():
+    response = make_client().get("/data", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == BODY
+
+
+def test_small_bodies_are_sent_as_is():
+    response = make_client().get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_compressed_body_gets_its_own_strong_etag():
+    client = make_client()
+    compressed = client.get("/data", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/data", headers={"Accept-Encoding": "identity"})
+    assert compressed.headers["etag"] == '"v1-gzip"'
+    assert identity.headers["etag"] == '"v1"'
+
+
+def test_revalidating_the_compressed_etag_gets_304():
+    response = make_client().get("/data", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1-gzip"'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"v1-gzip"'
+
+
+def test_encoded_etag_keeps_weak_validators():
+    assert encoded_etag('"abc"', "br") == '"abc-br"'
+    assert encoded_etag('W/"abc"', "br") == 'W/"abc"'
+
+
+def test_static_payload_is_precompressed_with_per_encoding_etags():
+    payload = StaticPayload(BODY, "application/json")
+    assert gzip.decompress(payload.variants["gzip"]) == BODY
+    assert payload.etag("gzip") != payload.etag()
+    # Any representation of the same content is still fresh
+    assert payload.matches(payload.etag("gzip"))
+    assert payload.matches(f"W/{payload.etag()}")
+    assert not payload.matches('"other"')
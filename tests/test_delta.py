@@ -0,0 +1,143 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from cache import CacheEntry
+from delta import ForecastHistory, forecast_delta, forecast_version, representation_etag
+from main import app
+from services import _coord_key, forecast_cache
+from units import Units
+
+
+def test_forecast_delta_matches_slots_by_dt(forecast):
+    old, new = forecast(0, slots=5), forecast(0, slots=5)
+    del old["list"][4], new["list"][0]
+    new["list"][0]["main"]["temp"] = 300.0
+    del new["list"][1]["wind"]["gust"]
+    new["list"][2]["rain"] = {"3h": 9.9}
+
+    delta = forecast_delta(old, new)
+    assert delta["dropped"] == [old["list"][0]["dt"]]
+    assert delta["added"] == [new["list"][3]]
+    first, second, third = delta["changed"]
+    assert first == {"dt": new["list"][0]["dt"], "set": {"main.temp": 300.0}}
+    assert second == {"dt": new["list"][1]["dt"], "unset": ["wind.gust"]}
+    assert third["set"]["rain.3h"] == 9.9
+    assert "city" not in delta
+
+
+def test_forecast_delta_of_identical_forecasts_is_empty(forecast):
+    assert forecast_delta(forecast(1), forecast(1)) == {"dropped": [], "added": [], "changed": []}
+
+
+def test_forecast_delta_reports_changed_top_level_fields(forecast):
+    new = forecast(1)
+    new["city"]["name"] = "Renamed"
+    assert forecast_delta(forecast(1), new)["city"]["name"] == "Renamed"
+
+
+def test_forecast_version_is_a_content_hash(forecast):
+    first, second = CacheEntry("a", forecast(1), 60), CacheEntry("b", forecast(1), 60)
+    assert forecast_version(first) == forecast_version(second)
+    assert forecast_version(first) != forecast_version(CacheEntry("c", forecast(2), 60))
+    assert list(first.derived) == ["version"]
+
+
+def test_representation_etag_mixes_in_units_and_fields():
+    assert representation_etag("abc") == '"abc"'
+    assert representation_etag("abc", Units.metric) == '"abc-metric"'
+    assert representation_etag("abc", fields="list.dt,city") == representation_etag("abc", fields="city, list.dt")
+    assert representation_etag("abc", fields="city") != representation_etag("abc", fields="list.dt")
+
+
+def test_history_keeps_the_previous_version_for_its_ttl(forecast):
+    history = ForecastHistory(max_keys=10, ttl=60)
+    old, new = CacheEntry("k", forecast(1), 60), CacheEntry("k", forecast(2), 60)
+    old_version, new_version = history.remember(old), history.remember(new)
+    assert history.get("k", old_version) == forecast(1)
+    assert history.get("k", new_version) == forecast(2)
+    assert history.get("k", "unknown") is None
+
+    expired = ForecastHistory(max_keys=10, ttl=0)
+    expired.remember(old)
+    expired.remember(new)
+    assert expired.get("k", old_version) is None
+
+
+def test_history_is_bounded_by_key_count(forecast):
+    history = ForecastHistory(max_keys=3, ttl=60)
+    for key in range(5):
+        history.remember(CacheEntry(key, forecast(key), 60))
+    assert len(history) == 3
+    assert history.get(0, forecast_version(CacheEntry(0, forecast(0), 60))) is None
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def cache_forecast(lat, lon, payload):
+    forecast_cache.set(_coord_key(lat, lon), payload)
+
+
+def get(client, lat, lon, headers=None, **params):
+    return client.get("/api/forecast", params={"lat": lat, "lon": lon, **params}, headers=headers or {})
+
+
+@pytest.mark.parametrize("params", [{}, {"units": "metric"}, {"fields": "list.dt,list.main.temp"}])
+def test_if_none_match_gets_304_per_representation(client, forecast, params):
+    cache_forecast(10.0, 20.0, forecast(1))
+    first = get(client, 10.0, 20.0, **params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    revalidated = get(client, 10.0, 20.0, {"If-None-Match": etag}, **params)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+def test_etag_differs_between_representations(client, forecast):
+    cache_forecast(11.0, 20.0, forecast(1))
+    standard = get(client, 11.0, 20.0)
+    metric = get(client, 11.0, 20.0, {"If-None-Match": standard.headers["etag"]}, units="metric")
+    assert metric.status_code == 200
+    assert metric.headers["etag"] != standard.headers["etag"]
+    projected = get(client, 11.0, 20.0, {"If-None-Match": metric.headers["etag"]}, units="metric", fields="city")
+    assert projected.status_code == 200
+    assert projected.json() == {"city": forecast(1)["city"]}
+
+
+def test_since_returns_a_delta_against_the_previous_version(client, forecast):
+    cache_forecast(12.0, 20.0, forecast(1))
+    old_etag = get(client, 12.0, 20.0, units="metric").headers["etag"]
+    cache_forecast(12.0, 20.0, forecast(2))
+
+    response = get(client, 12.0, 20.0, units="metric", since=old_etag)
+    assert response.status_code == 200
+    assert response.headers["delta-base"] == '"' + old_etag.strip('"').split("-")[0] + '"'
+    delta = response.json()
+    assert delta["base"] == response.headers["delta-base"].strip('"')
+    assert delta["changed"] and delta["dropped"] == [] and delta["added"] == []
+    # Deltas are computed in the requested units
+    slot = delta["changed"][0]
+    assert slot["set"]["main.temp"] < 100
+
+    assert get(client, 12.0, 20.0, units="metric", since=response.headers["etag"]).status_code == 304
+
+
+def test_since_with_fields_projects_both_sides(client, forecast):
+    cache_forecast(13.0, 20.0, forecast(1))
+    old_etag = get(client, 13.0, 20.0).headers["etag"]
+    cache_forecast(13.0, 20.0, forecast(2))
+    delta = get(client, 13.0, 20.0, since=old_etag, fields="list.main.temp").json()
+    assert {path for change in delta["changed"] for path in change["set"]} == {"main.temp"}
+
+
+def test_unknown_since_falls_back_to_the_full_forecast(client, forecast):
+    cache_forecast(14.0, 20.0, forecast(1))
+    response = get(client, 14.0, 20.0, since='"0123456789abcdef0123"')
+    assert response.status_code == 200
+    assert "delta-base" not in response.headers
+    assert len(response.json()["list"]) == 40
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import diagnostics
+from diagnostics import SamplingProfiler, StallWatchdog, check_admin
+
+
+def blocking_handler():
+    time.sleep(0.2)
+
+
+def test_watchdog_captures_the_blocking_stack():
+    watchdog = StallWatchdog(threshold_ms=50)
+
+    async def run():
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        blocking_handler()
+        await asyncio.sleep(0.1)
+        watchdog.stop()
+
+    asyncio.run(run())
+    assert watchdog.count == 1
+    [stall] = watchdog.stats()["recent"]
+    assert stall["duration_ms"] >= 150
+    assert stall["coroutine"] == "test_watchdog_captures_the_blocking_stack.<locals>.run"
+    assert any("blocking_handler" in line for line in stall["stack"])
+
+
+def test_disabled_watchdog_never_starts():
+    watchdog = StallWatchdog(threshold_ms=0)
+
+    async def run():
+        watchdog.start()
+
+    asyncio.run(run())
+    assert not watchdog.enabled and watchdog._thread is None
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiler_samples_the_calling_thread():
+    profiler = SamplingProfiler()
+    profiler.start(interval_ms=2, seconds=5)
+    busy(0.2)
+    stats = profiler.stop()
+    assert not stats["running"] and stats["samples"] > 10
+    top = profiler.collapsed().splitlines()[0]
+    assert top.split(" ")[0].endswith("test_diagnostics.busy")
+
+
+@pytest.mark.parametrize("interval_ms, seconds", [(0.5, 1), (2000, 1), (10, 0), (10, 301)])
+def test_profiler_rejects_invalid_settings(interval_ms, seconds):
+    with pytest.raises(HTTPException) as error:
+        SamplingProfiler().start(interval_ms, seconds)
+    assert error.value.status_code == 400
+
+
+def test_admin_endpoints_need_the_configured_token(monkeypatch):
+    monkeypatch.setattr(diagnostics, "ADMIN_TOKEN", "")
+    with pytest.raises(HTTPException) as disabled:
+        check_admin("anything")
+    assert disabled.value.status_code == 404
+    monkeypatch.setattr(diagnostics, "ADMIN_TOKEN", "secret")
+    check_admin("secret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as denied:
+            check_admin(token)
+        assert denied.value.status_code == 403
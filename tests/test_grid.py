@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from cache import CacheEntry
+from grid import GridSpec, grid_payload, parse_bbox, sample_grid, validate_resolution
+from units import Units
+
+
+def weather(lat, lon):
+    return {"main": {"temp": 273.15 + lat, "humidity": 50}, "wind": {"speed": 2.0}, "weather": [{"id": 800}], "dt": 1}
+
+
+def test_overlapping_viewports_share_cell_centres():
+    first = GridSpec(parse_bbox("-0.3,51.2,0.3,51.7"), 0.25)
+    second = GridSpec(parse_bbox("-0.1,51.4,0.6,51.9"), 0.25)
+    assert set(first.cells()) & set(second.cells())
+    assert first.lats == [51.125, 51.375, 51.625]
+    assert first.lons == [-0.375, -0.125, 0.125, 0.375]
+    assert first.shape == (3, 4)
+
+
+def test_grid_is_clamped_to_the_globe():
+    spec = GridSpec(parse_bbox("-180,-90,-175,-85"), 5.0)
+    assert spec.cells() == [(-87.5, -177.5)]
+
+
+@pytest.mark.parametrize("bbox", ["1,2,3", "a,b,c,d", "10,0,5,5", "0,-91,1,1"])
+def test_invalid_bboxes_are_rejected(bbox):
+    with pytest.raises(HTTPException):
+        parse_bbox(bbox)
+
+
+def test_resolution_and_cell_limits():
+    assert validate_resolution(0.5) == 0.5
+    with pytest.raises(HTTPException):
+        validate_resolution(0.3)
+    with pytest.raises(HTTPException):
+        GridSpec((-180.0, -90.0, 180.0, 90.0), 1.0)
+
+
+def test_sample_grid_fetches_only_missing_cells():
+    spec = GridSpec((0.0, 0.0, 2.0, 2.0), 1.0)
+    cached = {(0.5, 0.5): CacheEntry((0.5, 0.5), weather(0.5, 0.5), 60)}
+    fetched = []
+
+    def peek(lat, lon):
+        return cached.get((lat, lon))
+
+    async def fetch(lat, lon):
+        fetched.append((lat, lon))
+        if lat > 1:
+            raise HTTPException(status_code=502, detail="upstream")
+        return CacheEntry((lat, lon), weather(lat, lon), 60)
+
+    entries, hits = asyncio.run(sample_grid(spec, peek, fetch, concurrency=2))
+    assert hits == 1
+    assert sorted(fetched) == [(0.5, 1.5), (1.5, 0.5), (1.5, 1.5)]
+    assert [entry is None for entry in entries] == [False, False, True, True]
+
+    document = json.loads(grid_payload(spec, entries, hits, Units.metric))
+    assert (document["cached"], document["fetched"], document["failed"]) == (1, 1, 2)
+    assert document["shape"] == [2, 2]
+    assert document["fields"]["temp"] == [0.5, 0.5, None, None]
+    assert document["fields"]["humidity"] == [50, 50, None, None]
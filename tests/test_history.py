@@ -0,0 +1,67 @@
+import pytest
+
+from history import HistoryStore, history_document, observation
+from units import Units
+
+KEY = ("coord", 51.5, -0.12)
+OTHER = ("city", "paris")
+
+
+def weather(dt, temp=280.0):
+    return {"dt": dt, "main": {"temp": temp, "humidity": 50, "pressure": 1010},
+            "wind": {"speed": 3.0, "deg": 90}, "weather": [{"id": 800}]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path), segment_rows=4)
+
+
+def record(store, key, observations):
+    for dt, temp in observations:
+        store.record(key, weather(dt, temp))
+    store.flush()
+
+
+def test_observation_fields():
+    assert observation(weather(10)) == (10, 280.0, 50, 1010, 3.0, 90, 800)
+    assert observation({"main": {}}) is None
+
+
+def test_query_spans_sealed_and_active_segments(store):
+    record(store, KEY, [(i * 600, 280.0 + i) for i in range(10)])
+    record(store, OTHER, [(i * 600, 300.0) for i in range(3)])
+    assert store.stats()["segments"] == 4
+    columns = store.query(KEY, 1200, 4800)
+    assert columns["dt"].tolist() == [1200, 1800, 2400, 3000, 3600, 4200, 4800]
+    assert columns["temp"].tolist() == [282.0, 283.0, 284.0, 285.0, 286.0, 287.0, 288.0]
+    assert store.query(("city", "nowhere"), 0, 10**10)["dt"].tolist() == []
+
+
+def test_unchanged_observations_are_not_duplicated(store):
+    record(store, KEY, [(600, 280.0), (600, 280.0), (1200, 281.0)])
+    assert store.recorded == 2
+    assert store.query(KEY, 0, 10**10)["dt"].tolist() == [600, 1200]
+
+
+def test_history_survives_a_restart(tmp_path):
+    first = HistoryStore(str(tmp_path), segment_rows=4)
+    record(first, KEY, [(i * 600, 280.0) for i in range(6)])
+    reopened = HistoryStore(str(tmp_path), segment_rows=4)
+    assert reopened.query(KEY, 0, 10**10)["dt"].tolist() == [i * 600 for i in range(6)]
+    record(reopened, KEY, [(6 * 600, 290.0)])
+    assert len(reopened.query(KEY, 0, 10**10)["dt"]) == 7
+
+
+def test_disabled_store_records_nothing():
+    store = HistoryStore("")
+    store.record(KEY, weather(1))
+    assert not store.enabled and store.stats()["queued"] == 0
+
+
+def test_history_document_converts_units(store):
+    record(store, KEY, [(600, 273.15)])
+    document = history_document("coord:51.5:-0.12", 0, 1000, store.query(KEY, 0, 1000), Units.metric)
+    assert document["count"] == 1
+    assert document["fields"]["temp"] == [0.0]
+    assert document["fields"]["condition"] == [800]
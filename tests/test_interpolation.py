@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from analytics import forecast_columns
+from cache import CacheEntry
+from interpolation import Interpolation, Interpolator, hourly_forecast, parse_time
+from views import forecast_at
+
+
+def test_linear_interpolation_between_slots(forecast):
+    data = forecast(0, slots=3)
+    found = Interpolator(forecast_columns(data))
+    start = data["list"][0]["dt"]
+    temps = [item["main"]["temp"] for item in data["list"]]
+    [item] = found.items([start + 3600])
+    assert item["main"]["temp"] == round(temps[0] + (temps[1] - temps[0]) / 3, 2)
+    assert found.bracket(start + 3600) == (start, start + 10800)
+    assert found.bracket(start) == (start, start)
+
+
+def test_wind_direction_turns_the_short_way(forecast):
+    data = forecast(0, slots=2)
+    data["list"][0]["wind"]["deg"], data["list"][1]["wind"]["deg"] = 350, 10
+    found = Interpolator(forecast_columns(data))
+    [item] = found.items([data["list"][0]["dt"] + 5400])
+    assert item["wind"]["deg"] == 0.0
+
+
+def test_cubic_matches_the_samples_and_does_not_overshoot(forecast):
+    data = forecast(0, slots=8)
+    found = Interpolator(forecast_columns(data), Interpolation.cubic)
+    temps = np.array([item["main"]["temp"] for item in data["list"]])
+    dts = found.dt
+    assert np.allclose(found.evaluate(dts)["temp"], temps)
+    fine = found.evaluate(np.arange(dts[0], dts[-1], 600))["temp"]
+    assert fine.min() >= temps.min() - 1e-9 and fine.max() <= temps.max() + 1e-9
+
+
+def test_hourly_forecast_covers_every_full_hour(forecast):
+    data = forecast(0, slots=4)
+    hourly = hourly_forecast(data, Interpolator(forecast_columns(data)))
+    assert hourly["cnt"] == 10
+    assert hourly["list"][0]["dt"] == data["list"][0]["dt"]
+    assert hourly["list"][-1]["dt"] == data["list"][-1]["dt"]
+    assert all(b["dt"] - a["dt"] == 3600 for a, b in zip(hourly["list"], hourly["list"][1:]))
+
+
+def test_forecast_at_checks_the_range(forecast):
+    data = forecast(0, slots=4)
+    entry = CacheEntry("k", data, 60)
+    t = data["list"][1]["dt"] + 1800
+    point = forecast_at(entry, t)
+    assert point["dt"] == t and point["bracket"] == [t - 1800, t + 9000]
+    with pytest.raises(HTTPException) as error:
+        forecast_at(entry, data["list"][-1]["dt"] + 1)
+    assert error.value.status_code == 400
+
+
+def test_parse_time_accepts_timestamps_and_iso_dates():
+    assert parse_time("1760000400") == 1760000400
+    assert parse_time("2025-10-09T09:00:00Z") == 1760000400
+    assert parse_time("2025-10-09T11:00:00+02:00") == 1760000400
+    assert parse_time("2025-10-09T09:00:00") == 1760000400
+    with pytest.raises(HTTPException) as error:
+        parse_time("yesterday", "from")
+    assert error.value.detail.startswith("from must be")
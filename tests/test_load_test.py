@@ -0,0 +1,49 @@
+import os
+import random
+import sys
+
+from starlette.testclient import TestClient
+
+# The load-test tools are scripts in benchmarks/, not modules of the app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from load_test import SCENARIOS, Workload, compare, percentile  # noqa: E402
+from mock_upstream import Upstream, create_app  # noqa: E402
+
+
+def test_mock_upstream_templates_the_request():
+    client = TestClient(create_app(Upstream()))
+    weather = client.get("/data/2.5/weather", params={"lat": 1.5, "lon": 2.5}).json()
+    assert weather["coord"] == {"lat": 1.5, "lon": 2.5}
+    forecast = client.get("/data/2.5/forecast", params={"q": "Lisbon,pt"}).json()
+    assert forecast["city"]["name"] == "Lisbon" and forecast["city"]["country"] == "PT"
+    assert client.get("/data/2.5/weather", params={"q": "Nowhere"}).status_code == 404
+    assert client.get("/json/198.51.100.7").json()["query"] == "198.51.100.7"
+    assert client.get("/__stats").json() == {"weather": 2, "forecast": 1, "location": 1}
+
+
+def test_mock_upstream_injects_errors_into_selected_endpoints():
+    client = TestClient(create_app(Upstream(error_rate=1.0, error_status=503, fail_kinds={"weather"})))
+    assert client.get("/data/2.5/weather", params={"lat": 0, "lon": 0}).status_code == 503
+    assert client.get("/data/2.5/forecast", params={"lat": 0, "lon": 0}).status_code == 200
+    assert client.get("/__stats").json()["errors"] == 1
+
+
+def test_workloads_are_reproducible():
+    first, second = Workload("main", 100, seed=1), Workload("main", 100, seed=1)
+    for scenario, step in SCENARIOS.items():
+        assert step(first, random.Random(2)) == step(second, random.Random(2)), scenario
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile(list(range(1, 101)), 0.95) == 95
+    assert percentile([3.0], 0.99) == 3.0
+
+
+def test_compare_flags_regressions_beyond_the_threshold():
+    result = {"rps": 1000, "p50_ms": 2.0, "p95_ms": 5.0, "p99_ms": 9.0, "rss_peak_mb": 80, "upstream": {"weather": 10, "errors": 3}}
+    baseline = {"recorded": "then", "config": {}, "scenarios": {"hot-key": dict(result, rps=1300, p99_ms=6.0)}}
+    regressions = compare({"hot-key": result}, baseline, {}, 0.2)
+    assert regressions == ["hot-key rps -23%", "hot-key p99_ms +50%"]
+    assert compare({"hot-key": result}, baseline, {}, 0.6) == []
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import metrics
+from cache import TTLCache
+from main import app
+from metrics import REGISTRY, Histogram, UpstreamMetricsTransport, register_caches, render
+
+
+@pytest.fixture
+def histogram():
+    metric = Histogram("test_duration_seconds", "Test durations.", ("route",), buckets=(0.1, 1.0))
+    yield metric
+    REGISTRY.remove(metric)
+
+
+def test_histogram_buckets_are_cumulative(histogram):
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels("/a").observe(value)
+    assert histogram.render() == [
+        "# HELP test_duration_seconds Test durations.",
+        "# TYPE test_duration_seconds histogram",
+        'test_duration_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_duration_seconds_bucket{route="/a",le="1"} 3',
+        'test_duration_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_duration_seconds_sum{route="/a"} 3.65',
+        'test_duration_seconds_count{route="/a"} 4',
+    ]
+
+
+def series(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_requests_are_labeled_by_route_template():
+    client = TestClient(app)
+    client.get("/api/forecast/at", params={"lat": "x", "lon": 0, "t": 0})
+    client.get("/no/such/path/12345")
+    text = client.get("/metrics").text
+    assert 'http_requests_total{route="/api/forecast/at",method="GET",status="422"}' in text
+    assert 'http_requests_total{route="<unmatched>",method="GET",status="404"}' in text
+    assert "12345" not in text
+
+
+def test_upstream_calls_use_fixed_endpoint_labels():
+    transport = UpstreamMetricsTransport(httpx.MockTransport(lambda request: httpx.Response(503)))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://ip.example/json/203.0.113.9", extensions={"provider": "test-ip", "endpoint": "/json/203.0.113.9"})
+            await client.get("http://owm.example/w", extensions={"provider": "test-owm", "endpoint": "weather"})
+
+    asyncio.run(run())
+    text = render()
+    assert 'upstream_request_duration_seconds_count{provider="test-ip",endpoint="other"} 1' in text
+    assert 'upstream_request_duration_seconds_count{provider="test-owm",endpoint="weather"} 1' in text
+    assert 'upstream_responses_total{provider="test-owm",status="503"} 1' in text
+    assert "203.0.113.9" not in text
+    assert metrics.upstream_health["test-owm"].consecutive_failures == 1
+
+
+def test_register_caches_is_idempotent():
+    cache = TTLCache(ttl=60)
+    cache.set("k", 1)
+    register_caches({"test": cache})
+    register_caches({"test": cache})
+    text = render()
+    assert series(text, 'cache_entries{cache="test"}') == ['cache_entries{cache="test"} 1']
+    assert series(text, 'cache_lookups_total{cache="test",result="hit"}') == ['cache_lookups_total{cache="test",result="hit"} 0']
+    assert len([m for m in REGISTRY if m.name == "cache_entries"]) == 1
+    metrics._caches.pop("test")
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import services
+from main import app
+from onecall import FORECAST_ITEMS, STEP, onecall_forecast, onecall_weather
+
+
+PAYLOAD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "payloads", "onecall.json")
+
+
+@pytest.fixture
+def onecall():
+    with open(PAYLOAD) as f:
+        return json.load(f)
+
+
+def test_current_becomes_a_weather_document(onecall):
+    weather = onecall_weather(onecall)
+    current = onecall["current"]
+    assert weather["coord"] == {"lon": onecall["lon"], "lat": onecall["lat"]}
+    assert weather["main"]["temp"] == weather["main"]["temp_min"] == current["temp"]
+    assert weather["wind"]["speed"] == current["wind_speed"]
+    assert (weather["dt"], weather["timezone"], weather["cod"]) == (current["dt"], 3600, 200)
+
+
+def test_forecast_is_on_the_three_hour_grid(onecall):
+    forecast = onecall_forecast(onecall)
+    dts = [item["dt"] for item in forecast["list"]]
+    assert forecast["cnt"] == FORECAST_ITEMS == len(dts)
+    assert dts[0] == onecall["current"]["dt"] // STEP * STEP + STEP
+    assert all(b - a == STEP for a, b in zip(dts, dts[1:]))
+    assert all(item["dt_txt"] and item["sys"]["pod"] in "dn" for item in forecast["list"])
+    assert forecast["city"]["timezone"] == 3600
+
+
+def test_hourly_slots_take_the_hourly_point_and_sum_precipitation(onecall):
+    hourly = {point["dt"]: point for point in onecall["hourly"]}
+    start = onecall["current"]["dt"] // STEP * STEP + STEP
+    for offset, hour in enumerate(range(start - STEP + 3600, start + 1, 3600)):
+        hourly[hour]["rain"] = {"1h": 0.5 + offset}
+    onecall["hourly"] = list(hourly.values())
+    first = onecall_forecast(onecall)["list"][0]
+    assert first["main"]["temp"] == hourly[start]["temp"]
+    assert first["rain"] == {"3h": 4.5}
+
+
+def test_later_slots_interpolate_the_daily_temperatures(onecall):
+    forecast = onecall_forecast(onecall)
+    last_hourly = max(point["dt"] for point in onecall["hourly"])
+    daily = [item for item in forecast["list"] if item["dt"] > last_hourly]
+    assert daily
+    lows = min(min(day["temp"].values()) for day in onecall["daily"])
+    highs = max(max(day["temp"].values()) for day in onecall["daily"])
+    assert all(lows <= item["main"]["temp"] <= highs for item in daily)
+
+
+def test_onecall_mode_serves_weather_and_forecast_from_one_request(upstream, monkeypatch):
+    monkeypatch.setattr(services.router.providers[0], "mode", "onecall")
+    client = TestClient(app)
+    weather = client.get("/api/weather", params={"lat": 12.5, "lon": 45.5}).json()
+    forecast = client.get("/api/forecast", params={"lat": 12.5, "lon": 45.5}).json()
+    assert weather["base"] == "onecall" and weather["coord"] == {"lon": 45.5, "lat": 12.5}
+    assert forecast["cnt"] == FORECAST_ITEMS
+    assert dict(upstream.calls) == {"onecall": 1}
@@ -0,0 +1,28 @@
+from projection import compile_fields, field_key
+
+DATA = {
+    "name": "Test",
+    "main": {"temp": 280.0, "humidity": 50},
+    "list": [{"dt": 1, "main": {"temp": 1.0, "pressure": 1000}}, {"dt": 2, "main": {"temp": 2.0}}],
+}
+
+
+def test_nested_paths_keep_only_selected_keys():
+    assert compile_fields("name,main.temp")(DATA) == {"name": "Test", "main": {"temp": 280.0}}
+
+
+def test_lists_are_transparent():
+    assert compile_fields("list.main.temp")(DATA) == {"list": [{"main": {"temp": 1.0}}, {"main": {"temp": 2.0}}]}
+
+
+def test_whole_value_wins_over_deeper_path():
+    assert compile_fields("main.temp,main")(DATA) == {"main": DATA["main"]}
+
+
+def test_missing_paths_are_skipped():
+    assert compile_fields("nope,main.nope")(DATA) == {"main": {}}
+
+
+def test_equivalent_field_lists_share_a_key_and_plan():
+    assert field_key(" main.temp ,name,,main.temp") == field_key("name,main.temp") == "main.temp,name"
+    assert compile_fields("name,main.temp") is compile_fields("main.temp, name")
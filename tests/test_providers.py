@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import metrics
+import services
+from main import app
+from metrics import ProviderHealth
+from openmeteo import open_meteo_forecast, open_meteo_weather
+from providers import UPSTREAM_FAILURE_THRESHOLD, Provider, ProviderError, ProviderRouter
+
+PAYLOAD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "payloads", "openmeteo.json")
+
+
+class Fake(Provider):
+    def __init__(self, name, fail=False, cities=False):
+        super().__init__(None)
+        self.name = name
+        self.fail = fail
+        self.cities = cities
+        self.calls = 0
+
+    async def coordinate(self, kind, lat, lon):
+        self.calls += 1
+        if self.fail:
+            raise ProviderError("down")
+        return {kind: {"provider": self.name}}
+
+    async def city(self, kind, query):
+        if not self.cities:
+            return await super().city(kind, query)
+        return {"provider": self.name}
+
+
+def health(monkeypatch, name, latency=None, failures=0):
+    state = ProviderHealth()
+    state.latency = latency
+    state.consecutive_failures = failures
+    state.last_failure = time.time() if failures else None
+    monkeypatch.setitem(metrics.upstream_health, name, state)
+    return state
+
+
+def test_unmeasured_providers_keep_the_configured_order():
+    router = ProviderRouter([Fake("test-a"), Fake("test-b")])
+    assert [p.name for p in router.ranked()] == ["test-a", "test-b"]
+
+
+def test_faster_providers_go_first(monkeypatch):
+    health(monkeypatch, "test-a", latency=0.4)
+    health(monkeypatch, "test-b", latency=0.1)
+    router = ProviderRouter([Fake("test-a"), Fake("test-b")])
+    assert [p.name for p in router.ranked()] == ["test-b", "test-a"]
+
+
+def test_failing_providers_cool_down_at_the_back(monkeypatch):
+    health(monkeypatch, "test-a", latency=0.01, failures=UPSTREAM_FAILURE_THRESHOLD)
+    router = ProviderRouter([Fake("test-a"), Fake("test-b")])
+    assert [p.name for p in router.ranked()] == ["test-b", "test-a"]
+    assert not router.available(router.providers[0])
+
+
+def test_lookups_fall_back_down_the_order():
+    first, second = Fake("test-a", fail=True), Fake("test-b")
+    router = ProviderRouter([first, second])
+    assert asyncio.run(router.coordinate("weather", 1.0, 2.0)) == {"weather": {"provider": "test-b"}}
+    assert (first.calls, second.calls) == (1, 1)
+
+    with pytest.raises(ProviderError) as error:
+        asyncio.run(ProviderRouter([first]).coordinate("weather", 1.0, 2.0))
+    assert str(error.value) == "test-a: down"
+
+
+def test_city_lookups_only_use_providers_with_cities():
+    router = ProviderRouter([Fake("test-a"), Fake("test-b", cities=True)])
+    assert asyncio.run(router.city("weather", "London")) == {"provider": "test-b"}
+    with pytest.raises(ProviderError):
+        asyncio.run(ProviderRouter([Fake("test-a")]).city("weather", "London"))
+
+
+def test_unknown_provider_names_are_rejected():
+    with pytest.raises(ValueError):
+        ProviderRouter.from_names(["nope"], [Fake("test-a")])
+    with pytest.raises(ValueError):
+        ProviderRouter([])
+
+
+def test_open_meteo_documents_use_owm_shapes_and_units():
+    with open(PAYLOAD) as f:
+        data = json.load(f)
+    weather = open_meteo_weather(data)
+    assert weather["main"]["temp"] == round(data["current"]["temperature_2m"] + 273.15, 2)
+    assert weather["weather"][0]["id"] == 804
+    assert weather["wind"]["speed"] == data["current"]["wind_speed_10m"]
+    forecast = open_meteo_forecast(data)
+    assert forecast["cnt"] == len(forecast["list"]) > 0
+    assert all(b["dt"] - a["dt"] == 10800 for a, b in zip(forecast["list"], forecast["list"][1:]))
+
+
+def test_open_meteo_answers_when_openweathermap_fails(upstream, monkeypatch):
+    upstream.error_rate, upstream.fail_kinds = 1.0, {"weather", "forecast"}
+    owm, open_meteo = services.router.providers[0], services.OpenMeteo(services._fetch_json, "http://open-meteo.test")
+    monkeypatch.setattr(services.router, "providers", [owm, open_meteo])
+    client = TestClient(app)
+    response = client.get("/api/weather", params={"lat": 33.5, "lon": -7.5})
+    assert response.status_code == 200
+    assert client.get("/api/forecast", params={"lat": 33.5, "lon": -7.5}).status_code == 200
+    # Open-Meteo's one request filled the forecast cache too
+    assert upstream.calls["openmeteo"] == 1
+    assert upstream.calls["weather"] == 1 and upstream.calls["forecast"] == 0
+
+
+def test_city_lookups_report_unknown_cities(upstream):
+    response = TestClient(app).get("/api/weather-by-city", params={"city": "Nowhere"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "city not found"
@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import metrics
+from cache import TTLCache
+from main import app
+from metrics import ProviderHealth, http_in_flight, loop_lag_last
+from readiness import cache_report, readiness
+
+IDLE_POOL = {"active": 0, "idle": 2, "queued": 0, "max": 100}
+
+
+@pytest.fixture(autouse=True)
+def reset_gauges():
+    yield
+    http_in_flight.labels().value = 0
+    loop_lag_last.labels().value = 0
+
+
+def test_idle_node_is_ready():
+    ok, report = readiness(IDLE_POOL, {})
+    assert ok and report["failing"] == []
+    assert report["pool"]["utilization"] == 0.0
+
+
+@pytest.mark.parametrize("pool, in_flight, lag, reason", [
+    ({"active": 95, "idle": 0, "queued": 0, "max": 100}, 0, 0.0, "upstream pool 95% busy"),
+    ({"active": 10, "idle": 0, "queued": 51, "max": 100}, 0, 0.0, "51 requests waiting for an upstream connection"),
+    (IDLE_POOL, 513, 0.0, "513 requests in flight"),
+    (IDLE_POOL, 0, 0.3, "event loop lag 300 ms"),
+])
+def test_local_saturation_makes_the_node_unready(pool, in_flight, lag, reason):
+    http_in_flight.labels().value = in_flight
+    loop_lag_last.labels().value = lag
+    ok, report = readiness(pool, {})
+    assert not ok and report["failing"] == [reason]
+
+
+def test_failing_upstreams_are_reported_but_keep_the_node_ready(monkeypatch):
+    health = ProviderHealth()
+    for _ in range(5):
+        health.record(False, 0.1)
+    monkeypatch.setitem(metrics.upstream_health, "openweathermap", health)
+    ok, report = readiness({"active": 0, "idle": 0, "queued": 0, "max": None}, {})
+    assert ok
+    upstream = report["upstream"]["openweathermap"]
+    assert upstream["state"] == "failing" and upstream["consecutive_failures"] == 5
+    assert upstream["remaining_this_minute"] == 55
+
+
+def test_cache_report():
+    cache = TTLCache(ttl=60, max_entries=4)
+    cache.set("k", 1)
+    cache.hits, cache.misses = 3, 1
+    assert cache_report(cache) == {"entries": 1, "fill": 0.25, "hit_ratio": 0.75, "fetching": 0}
+
+
+def test_ready_endpoint_answers_503_when_saturated():
+    client = TestClient(app)
+    assert client.get("/api/ready").status_code == 200
+    loop_lag_last.labels().value = 1.0
+    response = client.get("/api/ready")
+    assert response.status_code == 503
+    assert response.json()["failing"] == ["event loop lag 1000 ms"]
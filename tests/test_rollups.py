@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from history import HistoryStore
+from rollups import Aggregate, Interval, bucket_start, combine, hourly_rollup, percentile
+
+COLUMNS = ("temp",)
+KEY = ("coord", 51.5, -0.12)
+
+
+def nearest_rank(values, q=0.95):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+def test_bucket_starts():
+    dt = np.array([0, 3599, 3600, 86399, 86400])
+    assert bucket_start(dt, Interval.hour).tolist() == [0, 0, 3600, 82800, 86400]
+    assert bucket_start(dt, Interval.day).tolist() == [0, 0, 0, 0, 86400]
+    # Weeks start on Monday: 1970-01-05 is day 4
+    assert bucket_start(np.array([0, 4 * 86400, 11 * 86400 - 1]), Interval.week).tolist() == [-3 * 86400, 4 * 86400, 4 * 86400]
+
+
+@pytest.mark.parametrize("size", [1, 2, 19, 20, 21, 100])
+def test_percentile_is_nearest_rank(size):
+    rng = np.random.default_rng(size)
+    values = rng.normal(280, 5, size)
+    result = percentile(np.zeros(size, dtype=np.int64), {"temp": values}, Interval.day, COLUMNS)
+    assert result["temp"].tolist() == [nearest_rank(values.tolist())]
+    assert result["temp_count"].tolist() == [size]
+
+
+def test_percentile_per_bucket_ignores_missing_values():
+    dt = np.array([0, 10, 20, 86400, 86410, 2 * 86400])
+    values = np.array([3.0, 1.0, 2.0, np.nan, 5.0, np.nan])
+    result = percentile(dt, {"temp": values}, Interval.day, COLUMNS, q=0.5)
+    assert result["dt"].tolist() == [0, 86400, 2 * 86400]
+    assert result["temp"][:2].tolist() == [2.0, 5.0]
+    assert np.isnan(result["temp"][2])
+    assert result["temp_count"].tolist() == [3, 1, 0]
+
+
+def raw_rows(hours=72, per_hour=4):
+    rng = np.random.default_rng(0)
+    dt = np.arange(hours * per_hour, dtype=np.int64) * (3600 // per_hour)
+    temp = rng.normal(280, 5, len(dt))
+    temp[::7] = np.nan
+    return dt, temp
+
+
+@pytest.mark.parametrize("aggregate", [Aggregate.min, Aggregate.max, Aggregate.mean])
+def test_combined_hourly_partials_match_the_raw_rows(aggregate):
+    dt, temp = raw_rows()
+    partials = hourly_rollup(np.zeros(len(dt), dtype=np.uint32), dt, {"temp": temp}, COLUMNS)
+    assert len(partials) == 72
+    result = combine(partials, Interval.day, aggregate, COLUMNS)
+    reduce = {Aggregate.min: np.nanmin, Aggregate.max: np.nanmax, Aggregate.mean: np.nanmean}[aggregate]
+    for day, value in zip(result["dt"].tolist(), result["temp"].tolist()):
+        in_day = temp[(dt >= day) & (dt < day + 86400)]
+        # min/max partials are stored as float32
+        assert value == pytest.approx(reduce(in_day), rel=1e-6)
+    assert result["temp_count"].sum() == np.count_nonzero(~np.isnan(temp))
+
+
+def test_store_rollups_merge_sealed_and_active_segments(tmp_path):
+    store = HistoryStore(str(tmp_path), segment_rows=50)
+    dt, temp = raw_rows(hours=30)
+    for t, value in zip(dt.tolist(), temp.tolist()):
+        store.record(KEY, {"dt": t, "main": {"temp": None if value != value else value}})
+    store.flush()
+    assert store.stats()["segments"] == 3
+
+    mean = store.rollup(KEY, 0, int(dt[-1]), Interval.day, Aggregate.mean)
+    assert mean["dt"].tolist() == [0, 86400]
+    first_day = temp[dt < 86400].astype(np.float32)
+    assert mean["temp"][0] == pytest.approx(np.nanmean(first_day), rel=1e-6)
+
+    p95 = store.rollup(KEY, 3600, 3600, Interval.hour, Aggregate.p95)
+    in_hour = temp[(dt >= 3600) & (dt < 7200)]
+    expected = nearest_rank(in_hour[~np.isnan(in_hour)].astype(np.float32).tolist())
+    assert p95["temp"].tolist() == [expected]
+    assert store.rollup(("city", "nowhere"), 0, 86400, Interval.day, Aggregate.max)["dt"].tolist() == []
@@ -0,0 +1,78 @@
+import pytest
+
+from cache import TTLCache
+from spatial import SpatialIndex, cell_size, distance_m, geohash, neighbours, precision_for
+
+
+def test_geohash_matches_the_reference_encoding():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash(-25.382708, -49.265506, 7) == "6gkzwgj"
+
+
+def test_neighbours_cover_the_surrounding_cells():
+    cells = neighbours(51.5, -0.12, 6)
+    assert len(cells) == 9 and geohash(51.5, -0.12, 6) in cells
+    height, width = cell_size(6)
+    assert geohash(51.5 + height, -0.12 + width, 6) in cells
+    # Wraps around the antimeridian and stops at the poles
+    assert geohash(0.0, -179.99, 6) in neighbours(0.0, 179.99, 6)
+    assert len(neighbours(89.999, 0.0, 6)) == 6
+
+
+def test_distance_and_precision():
+    assert distance_m(0, 0, 0, 1) == pytest.approx(111195, rel=1e-3)
+    assert distance_m(51.5, -0.12, 51.5, -0.12) == 0
+    precision = precision_for(2000)
+    assert cell_size(precision)[0] * 111195 >= 2000
+    assert cell_size(precision + 1)[0] * 111195 < 2000
+
+
+def make_index(radius_m=2000.0, ttl=60):
+    cache = TTLCache(ttl=ttl)
+    return cache, SpatialIndex(cache, radius_m)
+
+
+def add(cache, index, lat, lon):
+    key = ("coord", lat, lon)
+    cache.set(key, {"at": (lat, lon)})
+    index.add(key)
+    return key
+
+
+def test_nearest_finds_an_entry_within_the_radius():
+    cache, index = make_index()
+    add(cache, index, 51.5, -0.12)
+    entry, distance = index.nearest(51.505, -0.12)
+    assert entry.data == {"at": (51.5, -0.12)}
+    assert distance == pytest.approx(556, rel=0.01)
+    assert index.nearest(51.6, -0.12) is None
+    assert (index.lookups, index.hits) == (2, 1)
+
+
+def test_nearest_only_promotes_the_hit():
+    cache, index = make_index()
+    near = add(cache, index, 51.5, -0.12)
+    cache.set("other", {})
+    index.nearest(51.5001, -0.12)
+    assert list(cache._entries) == ["other", near]
+    assert cache.stale == 0
+
+
+def test_expired_entries_are_pruned_and_not_counted_stale():
+    cache, index = make_index(ttl=0)
+    add(cache, index, 51.5, -0.12)
+    assert index.nearest(51.5, -0.12) is None
+    assert len(index) == 0 and cache.stale == 0
+
+
+def test_zero_radius_disables_the_fallback():
+    cache, index = make_index(radius_m=0)
+    add(cache, index, 51.5, -0.12)
+    assert index.nearest(51.5, -0.12) is None
+    assert index.lookups == 0
+
+
+def test_only_coordinate_keys_are_indexed():
+    cache, index = make_index()
+    index.add(("city", "london"))
+    assert len(index) == 0
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi.testclient import TestClient
+
+from cache import CacheEntry
+from subscriptions import SSEResponse, SubscriptionHub, _command_locations, parse_location, websocket_session
+
+
+def make_hub(calls=None):
+    async def fetch(location):
+        if calls is not None:
+            calls.append(location)
+        return CacheEntry(location, {"dt": 1, "name": location[1], "main": {"temp": 280.0}}, 60)
+
+    return SubscriptionHub(fetch, interval=3600)
+
+
+def test_parse_location_coordinates_and_cities():
+    assert parse_location("51.50001, -0.12") == ("coord", "51.5", "-0.12")
+    assert parse_location("London, GB") == ("city", "london,gb")
+    assert parse_location("Paris") == ("city", "paris")
+    with pytest.raises(HTTPException):
+        parse_location("91,0")
+    with pytest.raises(HTTPException):
+        parse_location("")
+
+
+def test_command_locations_accepts_a_single_string():
+    assert _command_locations({"subscribe": "London"}, "subscribe") == ["London"]
+    assert _command_locations({"subscribe": ["a", "b"]}, "subscribe") == ["a", "b"]
+    assert _command_locations({}, "unsubscribe") == []
+    with pytest.raises(TypeError):
+        _command_locations({"subscribe": {"city": "London"}}, "subscribe")
+
+
+def test_subscribers_share_one_poller_per_location():
+    calls = []
+
+    async def run():
+        hub = make_hub(calls)
+        first, second = hub.connect(), hub.connect()
+        hub.subscribe(first, ("city", "london"))
+        await asyncio.sleep(0)
+        hub.subscribe(second, ("city", "london"))
+        await asyncio.sleep(0)
+        stats = hub.stats()
+        queued = first.queue.qsize(), second.queue.qsize()
+        hub.disconnect(first)
+        hub.disconnect(second)
+        await hub.close()
+        return stats, queued, hub.stats()
+
+    stats, queued, after = asyncio.run(run())
+    assert calls == [("city", "london")]
+    assert (stats["connections"], stats["locations"], stats["subscriptions"]) == (2, 1, 2)
+    # The late joiner got the poller's current entry straight away
+    assert queued == (1, 1)
+    assert (after["connections"], after["locations"]) == (0, 0)
+
+
+def test_sse_response_disconnects_when_the_client_leaves():
+    async def run():
+        hub = make_hub()
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ("city", "london"))
+        sent = []
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        await SSEResponse(hub, subscriber)({"type": "http", "method": "GET"}, receive, send)
+        await hub.close()
+        return hub, sent
+
+    hub, sent = asyncio.run(run())
+    assert hub.connections == 0 and hub.pollers == {}
+    assert dict(sent[0]["headers"])[b"content-type"].startswith(b"text/event-stream")
+
+
+def make_client(hub: SubscriptionHub) -> TestClient:
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        await websocket_session(hub, websocket)
+
+    return TestClient(app)
+
+
+def test_websocket_subscribe_string_and_list():
+    hub = make_hub()
+    with make_client(hub).websocket_connect("/ws") as websocket:
+        websocket.send_json({"subscribe": "London,GB"})
+        message = json.loads(websocket.receive_bytes())
+        assert message["location"] == "london,gb"
+        assert message["data"]["name"] == "london,gb"
+        websocket.send_json({"subscribe": ["51.5,-0.12"], "unsubscribe": ["London,GB"]})
+        assert json.loads(websocket.receive_bytes())["location"] == "51.5,-0.12"
+        assert set(hub.pollers) == {("coord", "51.5", "-0.12")}
+    assert hub.pollers == {} and hub.connections == 0
+
+
+@pytest.mark.parametrize("command", [{"subscribe": {"city": "London"}}, {"subscribe": [1]}, ["London"]])
+def test_websocket_rejects_malformed_commands(command):
+    hub = make_hub()
+    with make_client(hub).websocket_connect("/ws") as websocket:
+        websocket.send_json(command)
+        assert "error" in websocket.receive_json()
+    assert hub.pollers == {}
+
+
+def test_websocket_reports_invalid_locations():
+    with make_client(make_hub()).websocket_connect("/ws") as websocket:
+        websocket.send_json({"subscribe": ["100,0"]})
+        assert websocket.receive_json() == {"error": "Coordinates out of range: 100,0"}
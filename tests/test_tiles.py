@@ -0,0 +1,118 @@
+import asyncio
+import struct
+import zlib
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import tiles
+from cache import CacheEntry
+from tiles import LAYERS, TILE_SIZE, TileService, render_tile, tile_bounds, tile_resolution
+
+
+def decode(png: bytes) -> np.ndarray:
+    """The RGBA pixels of a PNG written by ``tiles._png`` (one IDAT, no filters)."""
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", png[16:24])
+    length = struct.unpack(">I", png[33:37])[0]
+    raw = np.frombuffer(zlib.decompress(png[41:41 + length]), dtype=np.uint8)
+    return raw.reshape(height, width * 4 + 1)[:, 1:].reshape(height, width, 4)
+
+
+def test_tile_bounds_and_resolution():
+    assert tile_bounds(0, 0, 0) == pytest.approx((-180, -85.0511, 180, 85.0511), abs=1e-4)
+    west, south, east, north = tile_bounds(1, 1, 0)
+    assert (west, south, east) == pytest.approx((0, 0, 180))
+    assert tile_resolution(tile_bounds(1, 0, 0)) is None
+    assert tile_resolution(tile_bounds(8, 128, 85)) == 0.25
+
+
+def test_render_tile_interpolates_and_leaves_unknown_cells_transparent():
+    lats, lons = np.array([-0.5, 0.5]), np.array([-0.5, 0.5])
+    stops = LAYERS["temperature"].stops
+    known = decode(render_tile(9, 255, 255, lats, lons, np.full((2, 2), 283.15), 1.0, stops))
+    assert known.shape == (TILE_SIZE, TILE_SIZE, 4)
+    assert (known == (116, 196, 118, 170)).all()
+    unknown = decode(render_tile(9, 255, 255, lats, lons, np.full((2, 2), np.nan), 1.0, stops))
+    assert not unknown.any()
+
+
+def weather(lat, lon):
+    return CacheEntry((lat, lon), {"main": {"temp": 283.15}, "clouds": {"all": 50}}, 60)
+
+
+def forecast(lat, lon):
+    return CacheEntry((lat, lon), {"list": [{"pop": 1.0}]}, 60)
+
+
+def make_service(cached, make_entry, failing=False):
+    fetched = []
+
+    def peek(lat, lon):
+        return make_entry(lat, lon) if (lat, lon) in cached else None
+
+    async def fetch(lat, lon):
+        fetched.append((lat, lon))
+        if failing:
+            raise HTTPException(status_code=502, detail="upstream")
+        return make_entry(lat, lon)
+
+    service = TileService({"weather": (peek, fetch), "forecast": (peek, fetch)}, workers=0)
+    return service, fetched
+
+
+def test_render_fetches_a_bounded_number_of_nearest_cells(monkeypatch):
+    monkeypatch.setattr(tiles, "TILE_FETCH_CELLS", 4)
+    service, fetched = make_service(set(), weather)
+    entry = asyncio.run(service.tile("temperature", 8, 128, 85))
+    assert len(fetched) == 4
+    assert not entry.data.complete
+    assert decode(entry.data.png)[..., 3].any()
+    # Partial tiles expire after TILE_PARTIAL_TTL rather than TILE_CACHE_TTL
+    assert service.cache.ttl_for(entry.data) == min(tiles.TILE_PARTIAL_TTL, tiles.TILE_CACHE_TTL)
+
+
+def test_precipitation_layer_reads_forecasts():
+    service, fetched = make_service(set(), forecast)
+    entry = asyncio.run(service.tile("precipitation", 8, 128, 85))
+    assert fetched
+    assert (decode(entry.data.png)[..., 3] == 210).any()
+
+
+def test_failed_fetches_leave_the_tile_transparent():
+    service, fetched = make_service(set(), weather, failing=True)
+    entry = asyncio.run(service.tile("clouds", 8, 128, 85))
+    assert fetched and not entry.data.complete
+    assert not decode(entry.data.png).any()
+
+
+def test_low_zoom_tiles_are_blank_and_complete():
+    service, fetched = make_service(set(), weather)
+    entry = asyncio.run(service.tile("temperature", 1, 0, 0))
+    assert fetched == [] and entry.data.complete
+    assert not decode(entry.data.png).any()
+
+
+def test_complete_tiles_get_an_etag_and_304():
+    service, _ = make_service(set(), weather)
+    service.sources["weather"] = (weather, None)
+    entry = asyncio.run(service.tile("temperature", 8, 128, 85))
+    assert entry.data.complete
+
+    def request(headers=()):
+        return Request({"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers]})
+
+    first = service.response(request(), entry)
+    etag = first.headers["etag"]
+    assert first.media_type == "image/png"
+    assert service.response(request([("if-none-match", etag)]), entry).status_code == 304
+
+
+@pytest.mark.parametrize("args", [("wind", 1, 0, 0), ("temperature", 2, 4, 0), ("temperature", 19, 0, 0)])
+def test_unknown_layers_and_tiles_are_404(args):
+    service, _ = make_service(set(), weather)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(service.tile(*args))
+    assert error.value.status_code == 404
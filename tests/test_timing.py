@@ -0,0 +1,79 @@
+import asyncio
+import json
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from timing import ServerTimingMiddleware, SlowRequestLog, TimedJSONResponse, TimedRoute, phase
+
+
+class CollectedLog(SlowRequestLog):
+    """Keeps records in memory instead of handing them to the writer thread."""
+
+    def __init__(self, threshold_ms):
+        super().__init__(threshold_ms=threshold_ms)
+        self.records = []
+
+    def record(self, entry):
+        self.records.append(entry)
+
+
+def make_client(header=True, threshold_ms=0.0):
+    app = FastAPI(default_response_class=TimedJSONResponse)
+    app.router.route_class = TimedRoute
+
+    @app.get("/slow")
+    async def slow():
+        with phase("cache"):
+            await asyncio.sleep(0.02)
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            yield b"{}\n"
+            await asyncio.sleep(0.05)
+            yield b"{}\n"
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    log = CollectedLog(threshold_ms)
+    app.add_middleware(ServerTimingMiddleware, header=header, slow_log=log)
+    return TestClient(app), log
+
+
+def durations(header):
+    return {name: float(value) for name, value in re.findall(r"([\w-]+);dur=([\d.]+)", header)}
+
+
+def test_server_timing_breaks_down_the_request():
+    client, _ = make_client()
+    response = client.get("/slow")
+    header = response.headers["server-timing"]
+    assert [name for name, _ in re.findall(r"([\w-]+);dur=([\d.]+)", header)] == ["cache", "endpoint", "validate", "serialize", "total"]
+    phases = durations(header)
+    assert phases["cache"] >= 20
+    assert phases["endpoint"] >= phases["cache"]
+    assert phases["total"] >= phases["endpoint"]
+
+
+def test_no_header_unless_enabled():
+    client, _ = make_client(header=False, threshold_ms=10_000)
+    assert "server-timing" not in client.get("/slow").headers
+
+
+def test_slow_requests_are_logged_with_their_phases():
+    client, log = make_client(header=False, threshold_ms=10)
+    client.get("/slow", params={"a": 1})
+    [entry] = log.records
+    assert (entry["route"], entry["query"], entry["status"]) == ("/slow", "a=1", 200)
+    assert entry["total_ms"] >= 20 and entry["phases_ms"]["cache"] >= 20
+    assert json.loads(json.dumps(entry)) == entry
+
+
+def test_streams_are_timed_to_their_start():
+    client, log = make_client(header=False, threshold_ms=30)
+    assert client.get("/stream").text == "{}\n{}\n"
+    assert log.records == []
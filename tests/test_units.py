@@ -0,0 +1,38 @@
+from units import Units, convert_forecast, convert_weather
+
+WEATHER = {
+    "main": {"temp": 273.15, "feels_like": 283.15, "temp_min": 263.15, "temp_max": 293.15, "humidity": 50},
+    "wind": {"speed": 10.0, "deg": 90},
+}
+
+
+def test_standard_returns_the_payload_unchanged():
+    assert convert_weather(WEATHER, Units.standard) is WEATHER
+
+
+def test_metric_and_imperial_temperatures_and_speeds():
+    metric = convert_weather(WEATHER, Units.metric)
+    assert metric["main"]["temp"] == 0.0
+    assert metric["main"]["temp_max"] == 20.0
+    assert metric["wind"]["speed"] == 10.0
+    imperial = convert_weather(WEATHER, Units.imperial)
+    assert imperial["main"]["temp"] == 32.0
+    assert imperial["wind"]["speed"] == 22.37
+    assert imperial["main"]["humidity"] == 50
+
+
+def test_conversion_does_not_touch_the_cached_payload():
+    convert_weather(WEATHER, Units.metric)
+    assert WEATHER["main"]["temp"] == 273.15
+
+
+def test_forecast_columns_keep_missing_values():
+    forecast = {"list": [
+        {"main": {"temp": 273.15}, "wind": {"speed": 1.0, "gust": None}},
+        {"main": {"temp": 283.15}},
+    ]}
+    converted = convert_forecast(forecast, Units.metric)
+    assert [item["main"]["temp"] for item in converted["list"]] == [0.0, 10.0]
+    assert converted["list"][0]["wind"]["gust"] is None
+    assert "wind" not in converted["list"][1]
+    assert forecast["list"][0]["main"]["temp"] == 273.15
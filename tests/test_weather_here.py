@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def test_weather_here_combines_location_weather_and_forecast(upstream):
+    client = TestClient(app)
+    response = client.get("/api/weather/here", headers={"X-Forwarded-For": "198.51.100.7"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["location"]["city"] == "London"
+    assert body["weather"]["coord"] == {"lat": 51.5085, "lon": -0.1257}
+    assert body["forecast"]["city"]["coord"] == {"lat": 51.5085, "lon": -0.1257}
+    assert dict(upstream.calls) == {"location": 1, "weather": 1, "forecast": 1}
+
+
+def test_weather_here_reuses_cached_entries(upstream):
+    client = TestClient(app)
+    client.get("/api/weather/here", headers={"X-Forwarded-For": "198.51.100.7"})
+    daily = client.get("/api/weather/here", params={"daily": True, "units": "metric"}, headers={"X-Forwarded-For": "198.51.100.8"})
+    assert daily.json()["forecast"]["list"][0]["date"]
+    assert daily.json()["weather"]["main"]["temp"] < 100
+    assert dict(upstream.calls) == {"location": 2, "weather": 1, "forecast": 1}
+
+
+def test_weather_here_without_a_location(upstream):
+    upstream.payloads["location"] = {"status": "fail", "message": "private range"}
+    response = TestClient(app).get("/api/weather/here", headers={"X-Forwarded-For": "10.0.0.1"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "private range"
@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import math
+import multiprocessing
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+from cache import CacheEntry, TTLCache
+from grid import GRID_CONCURRENCY, GRID_RESOLUTIONS, GridSpec
+
+TILE_SIZE = 256
+TILE_CACHE_TTL = float(os.environ.get("TILE_CACHE_TTL", "600"))
+TILE_CACHE_SIZE = int(os.environ.get("TILE_CACHE_SIZE", "2000"))
+# Tiles with cells missing from the observation cache are reused this long, so they fill in as cells are fetched
+TILE_PARTIAL_TTL = float(os.environ.get("TILE_PARTIAL_TTL", "30"))
+# Missing cells fetched from upstream per render, nearest to the tile first; the rest stay transparent for now
+TILE_FETCH_CELLS = int(os.environ.get("TILE_FETCH_CELLS", "16"))
+# 0 renders in a thread instead of a process pool
+TILE_RENDER_WORKERS = int(os.environ.get("TILE_RENDER_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# The finest grid resolution whose padded cell count stays within this limit is used for a tile
+TILE_MAX_CELLS = int(os.environ.get("TILE_MAX_CELLS", "100"))
+MAX_ZOOM = 18
+MAX_LATITUDE = 85.0511
+
+# (value, (r, g, b, a)) colour stops, interpolated linearly
+Stops = Tuple[Tuple[float, Tuple[int, int, int, int]], ...]
+
+
+class TileLayer(NamedTuple):
+    source: str
+    value: Callable[[dict], Optional[float]]
+    stops: Stops
+
+
+def _next_pop(forecast: dict) -> Optional[float]:
+    items = forecast.get("list") or [{}]
+    return items[0].get("pop")
+
+
+LAYERS: Dict[str, TileLayer] = {
+    # Kelvin, -30 °C to 40 °C
+    "temperature": TileLayer(
+        "weather",
+        lambda data: (data.get("main") or {}).get("temp"),
+        (
+            (243.15, (94, 60, 153, 170)),
+            (263.15, (49, 130, 189, 170)),
+            (273.15, (107, 174, 214, 170)),
+            (283.15, (116, 196, 118, 170)),
+            (293.15, (254, 224, 139, 170)),
+            (303.15, (253, 141, 60, 170)),
+            (313.15, (215, 48, 39, 170)),
+        ),
+    ),
+    # Cloud cover percentage
+    "clouds": TileLayer(
+        "weather",
+        lambda data: (data.get("clouds") or {}).get("all"),
+        ((0, (255, 255, 255, 0)), (50, (230, 230, 235, 110)), (100, (190, 190, 200, 200))),
+    ),
+    # Probability of precipitation in the next forecast slot
+    "precipitation": TileLayer(
+        "forecast",
+        _next_pop,
+        ((0.0, (66, 146, 198, 0)), (0.2, (158, 202, 225, 70)), (0.6, (66, 146, 198, 150)), (1.0, (8, 48, 107, 210))),
+    ),
+}
+
+# Cached entry for a coordinate without fetching, and the coalescing fetch for one
+EntrySource = Tuple[Callable[[float, float], Optional[CacheEntry]], Callable[[float, float], Awaitable[CacheEntry]]]
+
+
+class RenderedTile(NamedTuple):
+    png: bytes
+    # Every grid cell of the tile had a cached observation
+    complete: bool
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """``west, south, east, north`` of an XYZ (Web Mercator) tile in degrees."""
+    n = 2 ** z
+
+    def latitude(row: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
+
+
+def tile_resolution(bounds: Tuple[float, float, float, float]) -> Optional[float]:
+    """
+    The finest grid resolution that covers the tile, plus a cell of padding,
+    in ``TILE_MAX_CELLS``; None when even the coarsest one does not fit.
+    """
+    west, south, east, north = bounds
+    for resolution in GRID_RESOLUTIONS:
+        cells = (math.ceil((north - south) / resolution) + 2) * (math.ceil((east - west) / resolution) + 2)
+        if cells <= TILE_MAX_CELLS:
+            return resolution
+    return None
+
+
+def _png(rgba: np.ndarray) -> bytes:
+    """Encode an ``(h, w, 4)`` uint8 array as PNG with the standard library only."""
+    height, width, _ = rgba.shape
+    # Filter type 0 (none) at the start of every scanline
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b"")
+
+
+def _axis(coords: np.ndarray, centres: np.ndarray, resolution: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Lower cell index, upper cell index and weight of the upper cell for every pixel coordinate
+    position = np.clip((coords - centres[0]) / resolution, 0, len(centres) - 1)
+    lower = np.minimum(np.floor(position).astype(np.intp), len(centres) - 1)
+    upper = np.minimum(lower + 1, len(centres) - 1)
+    return lower, upper, position - lower
+
+
+def render_tile(
+    z: int, x: int, y: int, lats: np.ndarray, lons: np.ndarray, values: np.ndarray, resolution: float, stops: Stops
+) -> bytes:
+    """
+    Render one tile from grid cell values (``len(lats) x len(lons)``, NaN
+    where unknown) by bilinear interpolation at every pixel. Runs in a
+    worker process, so it only takes plain, picklable arguments.
+    """
+    n = 2 ** z * TILE_SIZE
+    pixel = np.arange(TILE_SIZE) + 0.5
+    lon = (x * TILE_SIZE + pixel) / n * 360 - 180
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y * TILE_SIZE + pixel) / n))))
+
+    i0, i1, ti = _axis(lat, lats, resolution)
+    j0, j1, tj = _axis(lon, lons, resolution)
+    ti, tj = ti[:, None], tj[None, :]
+    corners = (
+        (values[i0[:, None], j0[None, :]], (1 - ti) * (1 - tj)),
+        (values[i0[:, None], j1[None, :]], (1 - ti) * tj),
+        (values[i1[:, None], j0[None, :]], ti * (1 - tj)),
+        (values[i1[:, None], j1[None, :]], ti * tj),
+    )
+    # Missing cells are left out and the remaining weights renormalised
+    total = np.zeros((TILE_SIZE, TILE_SIZE))
+    weight = np.zeros((TILE_SIZE, TILE_SIZE))
+    for corner, w in corners:
+        known = ~np.isnan(corner)
+        total += np.where(known, corner, 0.0) * w
+        weight += np.where(known, w, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        field = np.where(weight > 0, total / weight, np.nan)
+
+    points = np.array([value for value, _ in stops], dtype=np.float64)
+    colours = np.array([colour for _, colour in stops], dtype=np.float64)
+    rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    known = ~np.isnan(field)
+    for channel in range(4):
+        rgba[..., channel][known] = np.round(np.interp(field[known], points, colours[:, channel]))
+    return _png(rgba)
+
+
+class TileService:
+    """
+    Renders weather tiles from cached grid observations and keeps them in an
+    LRU cache. Concurrent requests for the same tile share one render.
+
+    A render fetches at most ``TILE_FETCH_CELLS`` missing cells, nearest to
+    the tile first, through the coalescing entry caches. The remaining cells
+    stay transparent, and such partial tiles are only kept for
+    ``TILE_PARTIAL_TTL`` seconds, so they fill in over later requests. Tiles
+    too large for any grid resolution (low zoom) are transparent.
+    """
+
+    def __init__(self, sources: Dict[str, EntrySource], workers: int = TILE_RENDER_WORKERS):
+        self.sources = sources
+        self.workers = workers
+        self.cache = TTLCache(
+            ttl=TILE_CACHE_TTL,
+            max_entries=TILE_CACHE_SIZE,
+            ttl_for=lambda tile: TILE_CACHE_TTL if tile.complete else min(TILE_PARTIAL_TTL, TILE_CACHE_TTL),
+        )
+        self.render_times: deque = deque(maxlen=1000)
+        self.renders = 0
+        self._executor: Optional[Executor] = None
+        # Shared by all renders, so a viewport of missing tiles cannot flood the upstream
+        self._fetch_slots = asyncio.Semaphore(GRID_CONCURRENCY)
+        self._blank: Optional[bytes] = None
+
+    def _pool(self) -> Optional[Executor]:
+        if self._executor is None and self.workers > 0:
+            # Forking copies the locks of running threads (loop lag monitor, watchdog) in whatever state they are in
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    async def _render(self, layer: str, z: int, x: int, y: int) -> RenderedTile:
+        spec_layer = LAYERS[layer]
+        bounds = tile_bounds(z, x, y)
+        resolution = tile_resolution(bounds)
+        if resolution is None:
+            if self._blank is None:
+                self._blank = _png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+            return RenderedTile(self._blank, True)
+        west, south, east, north = bounds
+        padded = (
+            max(west - resolution, -180.0),
+            max(south - resolution, -90.0),
+            min(east + resolution, 180.0),
+            min(north + resolution, 90.0),
+        )
+        spec = GridSpec(padded, resolution)
+        peek, fetch = self.sources[spec_layer.source]
+        cells = spec.cells()
+        entries = [peek(lat, lon) for lat, lon in cells]
+        centre = ((south + north) / 2, (west + east) / 2)
+        missing = sorted(
+            (i for i, entry in enumerate(entries) if entry is None),
+            key=lambda i: (cells[i][0] - centre[0]) ** 2 + (cells[i][1] - centre[1]) ** 2,
+        )
+
+        async def one(index: int):
+            async with self._fetch_slots:
+                try:
+                    entries[index] = await fetch(*cells[index])
+                except HTTPException:
+                    pass
+
+        await asyncio.gather(*(one(i) for i in missing[:TILE_FETCH_CELLS]))
+        values = np.array(
+            [
+                np.nan if entry is None or (v := entry.derive(("tile", layer), spec_layer.value)) is None else v
+                for entry in entries
+            ],
+            dtype=np.float64,
+        ).reshape(spec.shape)
+
+        args = (z, x, y, np.array(spec.lats), np.array(spec.lons), values, resolution, spec_layer.stops)
+        start = time.perf_counter()
+        pool = self._pool()
+        if pool is None:
+            png = await asyncio.to_thread(render_tile, *args)
+        else:
+            png = await asyncio.get_running_loop().run_in_executor(pool, render_tile, *args)
+        self.render_times.append(time.perf_counter() - start)
+        self.renders += 1
+        return RenderedTile(png, all(entry is not None for entry in entries))
+
+    async def tile(self, layer: str, z: int, x: int, y: int) -> CacheEntry:
+        if layer not in LAYERS:
+            raise HTTPException(status_code=404, detail=f"Unknown layer; expected one of {', '.join(LAYERS)}")
+        if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise HTTPException(status_code=404, detail="Tile out of range")
+        return await self.cache.get_or_fetch((layer, z, x, y), lambda: self._render(layer, z, x, y))
+
+    def response(self, request: Request, entry: CacheEntry) -> Response:
+        """
+        The tile PNG with an ``ETag``; ``304`` when the client already has it.
+        Partial tiles get no ``ETag``, so clients fetch them again once they expire.
+        """
+        tile: RenderedTile = entry.data
+        max_age = max(int(entry.expires_at - time.monotonic()), 0)
+        headers = {"Cache-Control": f"public, max-age={max_age}"}
+        if not tile.complete:
+            return Response(tile.png, media_type="image/png", headers=headers)
+        etag = headers["ETag"] = entry.derive("etag", lambda tile: f'"{hashlib.sha256(tile.png).hexdigest()[:20]}"')
+        if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(tile.png, media_type="image/png", headers=headers)
+
+    def stats(self) -> dict:
+        lookups = self.cache.hits + self.cache.misses
+        times = sorted(self.render_times)
+        return {
+            "cached_tiles": len(self.cache),
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "hit_ratio": round(self.cache.hits / lookups, 4) if lookups else None,
+            "renders": self.renders,
+            "render_ms_mean": round(sum(times) / len(times) * 1000, 2) if times else None,
+            "render_ms_p95": round(times[int(len(times) * 0.95)] * 1000, 2) if times else None,
+            "render_workers": self.workers,
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# "1" adds a Server-Timing header with the phase breakdown to every response
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+# Requests slower than this are logged with their phases (0 disables)
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "1000"))
+# JSON-lines file for the slow-request log; empty logs through the ``timing`` logger
+SLOW_REQUEST_LOG = os.environ.get("SLOW_REQUEST_LOG", "")
+SLOW_REQUEST_QUEUE_SIZE = int(os.environ.get("SLOW_REQUEST_QUEUE_SIZE", "1000"))
+
+# Header order; ``endpoint`` contains the cache and upstream phases of the request
+PHASES = ("cache", "coalesced-wait", "upstream-connect", "upstream-wait", "decode", "endpoint", "validate", "serialize")
+# httpcore trace events that bracket connection setup
+CONNECT_EVENTS = {"connection.connect_tcp", "connection.start_tls"}
+
+
+class RequestTimer:
+    """
+    Seconds spent per phase of one request. Concurrent lookups of a batch share
+    the request's timer, so their phases are summed.
+    """
+
+    __slots__ = ("phases", "done")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.done = False
+
+    def add(self, name: str, seconds: float) -> None:
+        # Tasks started during the request (e.g. subscription pollers) outlive it
+        if not self.done:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def header(self, total: float) -> str:
+        ordered = [name for name in PHASES if name in self.phases] + [name for name in self.phases if name not in PHASES]
+        metrics = [f"{name};dur={self.phases[name] * 1000:.2f}" for name in ordered]
+        return ", ".join(metrics + [f"total;dur={total * 1000:.2f}"])
+
+
+_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time the block as ``name`` when the current request is being timed."""
+    timer = _timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+class UpstreamTrace:
+    """
+    httpcore ``trace`` callback splitting one upstream call into connection
+    setup (TCP and TLS) and waiting for the response.
+    """
+
+    __slots__ = ("timer", "start", "connect", "_started")
+
+    def __init__(self, timer: RequestTimer):
+        self.timer = timer
+        self.start = time.perf_counter()
+        self.connect = 0.0
+        self._started = 0.0
+
+    @classmethod
+    def begin(cls) -> Optional["UpstreamTrace"]:
+        timer = _timer.get()
+        return cls(timer) if timer is not None else None
+
+    async def __call__(self, event: str, info: dict) -> None:
+        name, _, stage = event.rpartition(".")
+        if name in CONNECT_EVENTS:
+            if stage == "started":
+                self._started = time.perf_counter()
+            elif stage == "complete":
+                self.connect += time.perf_counter() - self._started
+
+    def finish(self) -> None:
+        elapsed = time.perf_counter() - self.start
+        if self.connect:
+            self.timer.add("upstream-connect", self.connect)
+        self.timer.add("upstream-wait", elapsed - self.connect)
+
+
+class TimedRoute(APIRoute):
+    """
+    Route that times its endpoint function; the rest of the handler (request
+    parsing, response model validation and encoding) is reported as ``validate``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        call = self.dependant.call
+        if call is not None and asyncio.iscoroutinefunction(call):
+            async def timed_call(**values):
+                with phase("endpoint"):
+                    return await call(**values)
+
+            self.dependant.call = timed_call
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timer = _timer.get()
+            if timer is None:
+                return await handler(request)
+            before = {name: timer.phases.get(name, 0.0) for name in ("endpoint", "serialize")}
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                inner = sum(timer.phases.get(name, 0.0) - value for name, value in before.items())
+                timer.add("validate", max(0.0, time.perf_counter() - start - inner))
+
+        return timed_handler
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose encoding is reported as ``serialize``."""
+
+    def render(self, content) -> bytes:
+        with phase("serialize"):
+            return super().render(content)
+
+
+class SlowRequestLog:
+    """
+    Slow-request records go through a bounded queue to a writer thread, so the
+    event loop never waits on disk or log handlers; records are dropped when
+    the writer falls behind.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, path: str = SLOW_REQUEST_LOG, queue_size: int = SLOW_REQUEST_QUEUE_SIZE):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self.logged = 0
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def record(self, entry: dict) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="slow-request-log", daemon=True)
+            self._writer.start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            line = json.dumps(entry, separators=(",", ":"))
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(line + "\n")
+            else:
+                logger.warning("slow request %s", line)
+            self.logged += 1
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "logged": self.logged,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until everything queued so far has been written (used on shutdown)."""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join(timeout)
+        self._writer = None
+
+
+slow_requests = SlowRequestLog()
+
+# Long-lived streams; their time to the response start is what is compared with the slow log threshold
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+class ServerTimingMiddleware:
+    """
+    Time each HTTP request by phase. With ``header`` the breakdown is sent as a
+    ``Server-Timing`` header (phases up to the response start); requests slower
+    than the slow log threshold are queued to it with the full breakdown.
+    For streaming responses (``STREAMING_TYPES``) the total stops at the
+    response start, since the stream itself stays open as long as the client
+    wants.
+    """
+
+    def __init__(self, app: ASGIApp, header: bool = SERVER_TIMING, slow_log: SlowRequestLog = slow_requests):
+        self.app = app
+        self.header = header
+        self.slow_log = slow_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (self.header or self.slow_log.enabled):
+            await self.app(scope, receive, send)
+            return
+        timer = RequestTimer()
+        token = _timer.set(timer)
+        start = time.perf_counter()
+        status = 500
+        streamed_at: Optional[float] = None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status, streamed_at
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if Headers(raw=message["headers"]).get("content-type", "").startswith(STREAMING_TYPES):
+                    streamed_at = time.perf_counter()
+                if self.header:
+                    MutableHeaders(raw=message["headers"]).append("Server-Timing", timer.header(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timer.reset(token)
+            timer.done = True
+            total_ms = ((streamed_at or time.perf_counter()) - start) * 1000
+            if self.slow_log.enabled and total_ms >= self.slow_log.threshold_ms:
+                route = scope.get("route")
+                self.slow_log.record({
+                    "time": round(time.time(), 3),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "route": getattr(route, "path", None),
+                    "status": status,
+                    "total_ms": round(total_ms, 2),
+                    "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in timer.phases.items()},
+                })
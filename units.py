@@ -0,0 +1,86 @@
+from enum import Enum
+from typing import List, Tuple
+
+import numpy as np
+
+
+class Units(str, Enum):
+    standard = "standard"
+    metric = "metric"
+    imperial = "imperial"
+
+
+# (scale, offset) applied as value * scale + offset to the upstream SI values
+TEMPERATURE = {
+    Units.standard: (1.0, 0.0),
+    Units.metric: (1.0, -273.15),
+    Units.imperial: (1.8, -459.67),
+}
+SPEED = {
+    Units.standard: (1.0, 0.0),
+    Units.metric: (1.0, 0.0),
+    Units.imperial: (2.236936, 0.0),
+}
+
+MAIN_TEMPERATURE_FIELDS = ("temp", "feels_like", "temp_min", "temp_max")
+DAILY_TEMPERATURE_FIELDS = ("temp_min", "temp_max", "temp_mean")
+WIND_SPEED_FIELDS = ("speed", "gust")
+DAILY_WIND_FIELDS = ("speed_mean", "speed_max", "gust_max")
+
+
+def _linear(values: List, factors: Tuple[float, float]) -> List:
+    """Convert a whole column in one NumPy pass; ``None`` values stay ``None``."""
+    scale, offset = factors
+    column = np.array(values, dtype=np.float64)
+    converted = np.round(column * scale + offset, 2)
+    return [None if v is None else c for v, c in zip(values, converted.tolist())]
+
+
+def _convert_columns(rows: List[dict], fields: Tuple[str, ...], factors: Tuple[float, float]) -> None:
+    """Convert ``fields`` of every row in place, one column at a time."""
+    for field in fields:
+        present = [row for row in rows if field in row]
+        for row, value in zip(present, _linear([row[field] for row in present], factors)):
+            row[field] = value
+
+
+def convert_weather(data: dict, units: Units) -> dict:
+    if units == Units.standard:
+        return data
+    converted = dict(data)
+    converted["main"] = dict(data["main"])
+    _convert_columns([converted["main"]], MAIN_TEMPERATURE_FIELDS, TEMPERATURE[units])
+    if data.get("wind"):
+        converted["wind"] = dict(data["wind"])
+        _convert_columns([converted["wind"]], WIND_SPEED_FIELDS, SPEED[units])
+    return converted
+
+
+def convert_forecast(data: dict, units: Units) -> dict:
+    if units == Units.standard:
+        return data
+    items = [dict(item) for item in data["list"]]
+    mains = []
+    winds = []
+    for item in items:
+        item["main"] = dict(item["main"])
+        mains.append(item["main"])
+        if item.get("wind"):
+            item["wind"] = dict(item["wind"])
+            winds.append(item["wind"])
+    _convert_columns(mains, MAIN_TEMPERATURE_FIELDS, TEMPERATURE[units])
+    _convert_columns(winds, WIND_SPEED_FIELDS, SPEED[units])
+    return {**data, "list": items}
+
+
+def convert_daily(data: dict, units: Units) -> dict:
+    if units == Units.standard:
+        return data
+    days = [dict(day) for day in data["list"]]
+    winds = []
+    for day in days:
+        day["wind"] = dict(day["wind"])
+        winds.append(day["wind"])
+    _convert_columns(days, DAILY_TEMPERATURE_FIELDS, TEMPERATURE[units])
+    _convert_columns(winds, DAILY_WIND_FIELDS, SPEED[units])
+    return {**data, "list": days}
@@ -0,0 +1,107 @@
+import json
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from starlette.responses import Response
+
+from aggregation import daily_summary
+from analytics import forecast_columns
+from cache import CacheEntry
+from interpolation import SECONDS_PER_HOUR, Interpolation, Interpolator, hourly_forecast
+from projection import compile_fields
+from units import Units, convert_daily, convert_forecast, convert_weather
+
+
+def interpolator(entry: CacheEntry, method: Interpolation = Interpolation.linear) -> Interpolator:
+    """The interpolator of a cached forecast, built once per entry and method."""
+    return entry.derive(
+        ("interpolator", method), lambda _: Interpolator(entry.derive("columns", forecast_columns), method)
+    )
+
+
+# How to derive each view from the upstream payload held by a cache entry
+VIEWS: Dict[str, Callable[[CacheEntry], dict]] = {
+    "weather": lambda entry: entry.data,
+    "forecast": lambda entry: entry.data,
+    "daily": lambda entry: entry.derive("daily", daily_summary),
+    "hourly": lambda entry: entry.derive("hourly", lambda data: hourly_forecast(data, interpolator(entry))),
+    "hourly-cubic": lambda entry: entry.derive(
+        "hourly-cubic", lambda data: hourly_forecast(data, interpolator(entry, Interpolation.cubic))
+    ),
+}
+
+CONVERTERS: Dict[str, Callable[[dict, Units], dict]] = {
+    "weather": convert_weather,
+    "forecast": convert_forecast,
+    "daily": convert_daily,
+    "hourly": convert_forecast,
+    "hourly-cubic": convert_forecast,
+}
+
+
+def view_data(entry: CacheEntry, view: str, units: Units = Units.standard) -> dict:
+    """
+    The view of a cached entry in ``units``.
+
+    Converted dicts are not memoized (the encoded bytes are), so a compactly
+    stored payload does not get a full-size dict copy kept next to it.
+    """
+    base = VIEWS[view](entry)
+    if units == Units.standard:
+        return base
+    return CONVERTERS[view](base, units)
+
+
+def _encoded(entry: CacheEntry, view: str, units: Units) -> bytes:
+    return entry.derive(
+        ("json", view, units),
+        lambda _: json.dumps(view_data(entry, view, units), separators=(",", ":")).encode("utf-8"),
+    )
+
+
+def encode(entry: CacheEntry, view: str, units: Optional[Units] = None, fields: Optional[str] = None) -> bytes:
+    """JSON bytes for a view of a cached entry; memoized unless projected."""
+    units = units or Units.standard
+    if fields:
+        data = compile_fields(fields)(view_data(entry, view, units))
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return _encoded(entry, view, units)
+
+
+def render(entry: CacheEntry, view: str, units: Optional[Units] = None, fields: Optional[str] = None) -> Any:
+    """
+    Build the response for a cached entry.
+
+    Without ``units`` or ``fields`` the raw payload is returned and validated
+    against the route's response model as before. Otherwise the converted
+    view is projected, or served from its memoized JSON encoding.
+    """
+    if units is None and not fields:
+        return VIEWS[view](entry)
+    return Response(encode(entry, view, units, fields), media_type="application/json")
+
+
+def hourly_view(method: Interpolation) -> str:
+    return "hourly" if method == Interpolation.linear else "hourly-cubic"
+
+
+def forecast_at(entry: CacheEntry, t: int, method: Interpolation = Interpolation.linear, units: Optional[Units] = None) -> dict:
+    """
+    The forecast interpolated at time ``t``.
+
+    Full hours are read from the entry's memoized hourly series; other times
+    are evaluated with the entry's memoized interpolator.
+    """
+    found = interpolator(entry, method)
+    if not found.covers(t):
+        if not len(found.dt):
+            raise HTTPException(status_code=404, detail="Forecast has no data")
+        raise HTTPException(status_code=400, detail=f"t must be between {found.start} and {found.end}")
+    hourly = VIEWS[hourly_view(method)](entry)["list"]
+    index = (t - hourly[0]["dt"]) // SECONDS_PER_HOUR if hourly else -1
+    if t % SECONDS_PER_HOUR == 0 and 0 <= index < len(hourly):
+        item = hourly[index]
+    else:
+        item = found.items([t])[0]
+    point = {**item, "method": found.method.value, "bracket": list(found.bracket(t))}
+    return convert_weather(point, units) if units else point